@@ -1,9 +1,31 @@
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
-from typing import Optional, List
+import asyncio
+import logging
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from pydantic import BaseModel, Field
+from typing import Annotated, Literal, Optional, List, Union
 import json
+from ..api.auth import get_current_user
+from ..core.ai_cache import ai_cache
+from ..core.ai_client import ai_client
+from ..core.ai_usage import Rollup, ai_usage
+from ..core.chunking import chunk_spacing, split_text
+from ..core.config import settings
+from ..core.serialization import TrustedRoute
 
-router = APIRouter(prefix="/ai", tags=["AI Features"])
+logger = logging.getLogger(__name__)
+
+async def require_ai_access(current_user: dict = Depends(get_current_user)) -> dict:
+    """Signed-in users only, and only once a paid provider is switched on"""
+    if not settings.ENABLE_AI_FEATURES and settings.AI_PROVIDER not in ("mock", "fake"):
+        raise HTTPException(status_code=503, detail="AI features are disabled")
+    return current_user
+
+router = APIRouter(
+    prefix="/ai", tags=["AI Features"], route_class=TrustedRoute,
+    dependencies=[Depends(require_ai_access)]
+)
 
 class AIContentRequest(BaseModel):
     prompt: str
@@ -26,118 +48,274 @@ class AIGrammarCheckResponse(BaseModel):
     errors: List[dict]
     suggestions: List[str]
 
-@router.post("/generate-content")
-async def generate_content(request: AIContentRequest):
-    """Generate content using AI"""
-    # Mock AI content generation
-    mock_content = {
-        "article": f"بناءً على طلبك '{request.prompt}'، إليك مقال شامل:\n\n{request.prompt} هو موضوع مهم جداً في عصرنا الحالي. هذا الموضوع له تأثير كبير على حياتنا اليومية...",
-        "title": f"دليل شامل حول {request.prompt}",
-        "summary": f"ملخص: {request.prompt} هو مفهوم أساسي يتطلب فهماً عميقاً...",
-        "outline": f"مخطط المقال:\n1. مقدمة عن {request.prompt}\n2. الأهمية والفوائد\n3. التطبيقات العملية\n4. الخلاصة والتوصيات"
-    }
-    
-    generated_content = mock_content.get(request.content_type, f"محتوى حول {request.prompt}")
+class AIBatchContent(AIContentRequest):
+    type: Literal["generate_content"]
+
+class AIBatchTranslation(AITranslationRequest):
+    type: Literal["translate"]
+
+class AIBatchGrammarCheck(AIGrammarCheckRequest):
+    type: Literal["grammar_check"]
+
+class AIBatchRequest(BaseModel):
+    items: List[Annotated[
+        Union[AIBatchContent, AIBatchTranslation, AIBatchGrammarCheck],
+        Field(discriminator="type")
+    ]] = Field(..., min_length=1, max_length=settings.AI_BATCH_MAX_ITEMS)
+
+async def run_ai(feature: str, payload: dict, pool: Optional[asyncio.Semaphore] = None) -> dict:
+    if pool is None:
+        return await ai_client.run(feature, payload)
+    async with pool:
+        return await ai_client.run(feature, payload)
+
+async def run_chunked(feature: str, payload: dict, pool: Optional[asyncio.Semaphore] = None) -> List[tuple]:
+    """Run feature over payload["text"] in provider-sized chunks: [(chunk, result)]"""
+    if len(payload["text"]) > settings.AI_MAX_TEXT_CHARS:
+        raise HTTPException(status_code=400, detail=f"Text exceeds {settings.AI_MAX_TEXT_CHARS} characters")
+    chunks = split_text(payload["text"], settings.AI_MAX_INPUT_CHARS)
+    results = await asyncio.gather(*(run_ai(feature, dict(payload, text=chunk), pool) for chunk in chunks))
+    return list(zip(chunks, results))
+
+def rejoin(parts: List[tuple], field: str) -> str:
+    """Chunk results put back together with the original spacing between chunks"""
+    text = ""
+    for chunk, result in parts:
+        leading, trailing = chunk_spacing(chunk)
+        text += leading + result[field].strip() + trailing
+    return text
+
+async def content_generation(request: AIContentRequest, pool: Optional[asyncio.Semaphore] = None) -> dict:
+    if len(request.prompt) > settings.AI_MAX_INPUT_CHARS:
+        raise HTTPException(status_code=400, detail=f"Prompt exceeds {settings.AI_MAX_INPUT_CHARS} characters")
+    result = await run_ai("content_generation", request.model_dump(exclude={"type"}), pool)
     
     return {
-        "generated_content": generated_content,
+        "generated_content": result["generated_content"],
         "content_type": request.content_type,
         "language": request.language,
         "is_ai_generated": True,
-        "model_used": "mock-ai-model",
-        "tokens_used": len(generated_content.split()),
-        "processing_time": 1500  # milliseconds
+        "model_used": result["model_used"],
+        "tokens_used": result["tokens_used"],
+        "processing_time": result["processing_time"],  # milliseconds
+        "cached": result["cached"]
     }
 
-@router.post("/translate")
-async def translate_text(request: AITranslationRequest):
-    """Translate text using AI"""
-    # Mock translation
-    translations = {
-        ("ar", "en"): f"Translation of '{request.text}' to English: This is a translated text about the topic.",
-        ("en", "ar"): f"ترجمة '{request.text}' إلى العربية: هذا نص مترجم حول الموضوع.",
-        ("ar", "fr"): f"Traduction de '{request.text}' en français: Ceci est un texte traduit sur le sujet.",
-        ("en", "fr"): f"Traduction de '{request.text}' en français: Ceci est un texte traduit sur le sujet."
-    }
-    
-    key = (request.source_language, request.target_language)
-    translated_text = translations.get(key, f"Translated: {request.text}")
+async def translation(request: AITranslationRequest, pool: Optional[asyncio.Semaphore] = None) -> dict:
+    parts = await run_chunked("translation", request.model_dump(exclude={"type"}), pool)
+    results = [result for _, result in parts]
+    confidences = [result["confidence"] for result in results if result["confidence"] is not None]
     
     return {
         "original_text": request.text,
-        "translated_text": translated_text,
+        "translated_text": rejoin(parts, "translated_text"),
         "source_language": request.source_language,
         "target_language": request.target_language,
-        "confidence": 0.95,
+        "confidence": min(confidences) if confidences else None,
         "is_ai_generated": True,
-        "model_used": "mock-translation-model",
-        "processing_time": 800
+        "model_used": results[0]["model_used"],
+        "processing_time": max(result["processing_time"] for result in results),
+        "cached": all(result["cached"] for result in results)
     }
 
-@router.post("/grammar-check", response_model=AIGrammarCheckResponse)
-async def check_grammar(request: AIGrammarCheckRequest):
-    """Check grammar and spelling"""
-    # Mock grammar check
-    corrected_text = request.text.replace("الذكاء الاصطناعي", "الذكاء الاصطناعي")  # Mock correction
+async def grammar_check(request: AIGrammarCheckRequest, pool: Optional[asyncio.Semaphore] = None) -> AIGrammarCheckResponse:
+    parts = await run_chunked("grammar_check", request.model_dump(exclude={"type"}), pool)
+    errors, suggestions, offset = [], [], 0
+    for chunk, result in parts:
+        for error in result["errors"]:
+            # Positions are relative to the chunk the provider saw
+            if isinstance(error.get("position"), int):
+                error = dict(error, position=error["position"] + offset)
+            errors.append(error)
+        suggestions.extend(item for item in result["suggestions"] if item not in suggestions)
+        offset += len(chunk)
     
     return AIGrammarCheckResponse(
         original_text=request.text,
-        corrected_text=corrected_text,
-        errors=[
-            {
-                "type": "spelling",
-                "position": 10,
-                "suggestion": "الذكاء الاصطناعي",
-                "confidence": 0.9
-            }
-        ],
-        suggestions=[
-            "تأكد من استخدام علامات الترقيم بشكل صحيح",
-            "استخدم مصطلحات أكثر دقة في هذا السياق"
-        ]
+        corrected_text=rejoin(parts, "corrected_text"),
+        errors=errors,
+        suggestions=suggestions
+    )
+
+@router.post("/generate-content")
+async def generate_content(request: AIContentRequest):
+    """Generate content using AI"""
+    return await content_generation(request)
+
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@router.post("/generate-content/stream")
+async def stream_content(request: AIContentRequest):
+    """Generate content as Server-Sent Events.
+
+    "token" events carry text as the provider produces it, then a "done"
+    event carries the full text, tokens_used, first_token_time and
+    processing_time; an "error" event ends a stream the provider broke
+    off. Disconnecting aborts the upstream generation.
+    """
+    events = ai_client.stream("content_generation", request.model_dump())
+    # Waiting for the first token here turns busy/provider errors into plain HTTP errors
+    first = await events.__anext__()
+
+    async def body():
+        event, value = first
+        while True:
+            if event == "token":
+                yield sse_event("token", {"text": value})
+            elif event == "error":
+                yield sse_event("error", {"detail": value})
+            else:
+                yield sse_event("done", {
+                    "generated_content": value["generated_content"],
+                    "content_type": request.content_type,
+                    "language": request.language,
+                    "is_ai_generated": True,
+                    "model_used": value["model_used"],
+                    "tokens_used": value["tokens_used"],
+                    "first_token_time": value["first_token_time"],  # milliseconds
+                    "processing_time": value["processing_time"],
+                    "cached": value["cached"]
+                })
+            try:
+                event, value = await events.__anext__()
+            except StopAsyncIteration:
+                return
+
+    return StreamingResponse(
+        body(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        # Runs even when the client disconnects, releasing the slot and the upstream call
+        background=BackgroundTask(events.aclose)
     )
 
+@router.post("/translate")
+async def translate_text(request: AITranslationRequest):
+    """Translate text using AI (long texts in provider-sized chunks)"""
+    return await translation(request)
+
+@router.post("/grammar-check", response_model=AIGrammarCheckResponse)
+async def check_grammar(request: AIGrammarCheckRequest):
+    """Check grammar and spelling"""
+    return await grammar_check(request)
+
+BATCH_RUNNERS = {
+    "generate_content": content_generation,
+    "translate": translation,
+    "grammar_check": grammar_check,
+}
+
+def item_chars(item) -> int:
+    return len(item.prompt if item.type == "generate_content" else item.text)
+
+def item_limit(item) -> int:
+    return settings.AI_MAX_INPUT_CHARS if item.type == "generate_content" else settings.AI_MAX_TEXT_CHARS
+
+@router.post("/batch")
+async def run_batch(batch: AIBatchRequest):
+    """Run many translate / grammar_check / generate_content items in one request.
+
+    Items run concurrently, at most AI_BATCH_CONCURRENCY provider calls at
+    a time; identical items run once. Items past AI_BATCH_MAX_CHARS of
+    input in total fail without being sent. One NDJSON line per item is
+    streamed back in input order as soon as it and the items before it are
+    done, with status "ok" and the single endpoint's result, or "error".
+    """
+    pool = asyncio.Semaphore(settings.AI_BATCH_CONCURRENCY)
+    tasks = {}
+    order = []
+    budget = settings.AI_BATCH_MAX_CHARS
+    for item in batch.items:
+        key = json.dumps(item.model_dump(), sort_keys=True, ensure_ascii=False)
+        if key not in tasks:
+            chars = item_chars(item)
+            # Items over their own limit fail without a provider call, so they use no budget
+            if chars <= item_limit(item):
+                if chars > budget:
+                    order.append((item.type, f"Batch exceeds {settings.AI_BATCH_MAX_CHARS} characters of input"))
+                    continue
+                budget -= chars
+            tasks[key] = asyncio.create_task(BATCH_RUNNERS[item.type](item, pool))
+        order.append((item.type, tasks[key]))
+
+    async def results():
+        try:
+            for index, (item_type, task) in enumerate(order):
+                if isinstance(task, str):
+                    yield json.dumps({"index": index, "type": item_type, "status": "error", "detail": task}) + "\n"
+                    continue
+                try:
+                    result = await task
+                    if isinstance(result, BaseModel):
+                        result = result.model_dump()
+                    line = {"index": index, "type": item_type, "status": "ok", "result": result}
+                except HTTPException as e:
+                    line = {"index": index, "type": item_type, "status": "error", "detail": e.detail}
+                except Exception:
+                    logger.exception("AI batch item %d failed", index)
+                    line = {"index": index, "type": item_type, "status": "error", "detail": "AI request failed"}
+                yield json.dumps(line, ensure_ascii=False) + "\n"
+        finally:
+            # The client went away: stop the items nobody will read
+            for task in tasks.values():
+                task.cancel()
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
 @router.post("/generate-image")
 async def generate_image(request: dict):
     """Generate image using AI"""
-    # Mock image generation
-    return {
-        "image_url": "https://via.placeholder.com/800x600/667eea/ffffff?text=AI+Generated+Image",
+    payload = {
         "prompt": request.get("prompt", "AI generated image"),
         "style": request.get("style", "realistic"),
-        "size": request.get("size", "800x600"),
+        "size": request.get("size", "1024x1024")
+    }
+    result = await ai_client.run("image_generation", payload)
+    
+    return {
+        "image_url": result["image_url"],
+        **payload,
         "is_ai_generated": True,
-        "model_used": "mock-image-model",
-        "processing_time": 5000
+        "model_used": result["model_used"],
+        "processing_time": result["processing_time"]
     }
 
 @router.post("/speech-to-text")
 async def speech_to_text(request: dict):
-    """Convert speech to text"""
-    # Mock speech to text
+    """Convert speech to text (file_path of an uploaded audio file)"""
+    result = await ai_client.run("speech_to_text", {
+        "file_path": request.get("file_path"),
+        "duration": request.get("duration", 30)  # seconds
+    })
+    
     return {
-        "transcript": "هذا نص محول من الصوت إلى النص باستخدام الذكاء الاصطناعي",
-        "confidence": 0.92,
-        "language": "ar",
-        "duration": request.get("duration", 30),  # seconds
+        "transcript": result["transcript"],
+        "confidence": result["confidence"],
+        "language": result["language"],
+        "duration": result["duration"],
         "is_ai_generated": True,
-        "model_used": "mock-speech-model",
-        "processing_time": 2000
+        "model_used": result["model_used"],
+        "processing_time": result["processing_time"]
     }
 
 @router.post("/text-to-speech")
 async def text_to_speech(request: dict):
     """Convert text to speech"""
-    # Mock text to speech
-    return {
-        "audio_url": "https://example.com/generated-audio.mp3",
+    payload = {
         "text": request.get("text", "نص للتحويل إلى صوت"),
-        "voice": request.get("voice", "arabic-female"),
+        "voice": request.get("voice", "arabic-female")
+    }
+    result = await ai_client.run("text_to_speech", payload)
+    
+    return {
+        "audio_url": result["audio_url"],
+        **payload,
         "language": "ar",
-        "duration": 15,  # seconds
+        "duration": result["duration"],  # seconds
         "is_ai_generated": True,
-        "model_used": "mock-tts-model",
-        "processing_time": 3000
+        "model_used": result["model_used"],
+        "processing_time": result["processing_time"]
     }
 
 @router.get("/suggestions")
@@ -178,20 +356,40 @@ async def get_ai_suggestions(
     }
 
 @router.get("/analytics")
-async def get_ai_analytics():
-    """Get AI usage analytics"""
-    # Mock analytics
+async def get_ai_analytics(period: Literal["hour", "day", "today", "week", "month"] = "day"):
+    """Get AI usage analytics for the last hour, day, week or month, or since midnight UTC.
+
+    Read from this worker's per-minute/hour/day rollups; latencies are in
+    milliseconds and include time spent waiting for a provider slot.
+    """
+    features = ai_usage.totals(period)
+    total = Rollup()
+    for rollup in features.values():
+        total.merge(rollup)
+    requests = lambda feature: features[feature].calls if feature in features else 0
+    latency = total.latency.summary()
     return {
-        "total_ai_requests": 1250,
-        "content_generation_requests": 450,
-        "translation_requests": 300,
-        "grammar_check_requests": 200,
-        "image_generation_requests": 150,
-        "speech_requests": 100,
-        "text_to_speech_requests": 50,
-        "total_tokens_used": 50000,
-        "total_cost": 25.50,
-        "most_used_feature": "content_generation",
-        "average_processing_time": 2000,  # milliseconds
-        "success_rate": 0.98
+        "period": period,
+        "total_ai_requests": total.calls,
+        "content_generation_requests": requests("content_generation"),
+        "translation_requests": requests("translation"),
+        "grammar_check_requests": requests("grammar_check"),
+        "image_generation_requests": requests("image_generation"),
+        "speech_requests": requests("speech_to_text"),
+        "text_to_speech_requests": requests("text_to_speech"),
+        "total_tokens_used": total.tokens,
+        "total_cost": round(total.cost, 4),
+        "most_used_feature": max(features, key=requests) if features else None,
+        "average_processing_time": latency["mean"],
+        "success_rate": total.to_dict()["success_rate"],
+        "latency_ms": latency,
+        "features": {feature: rollup.to_dict() for feature, rollup in sorted(features.items())},
+        "series": ai_usage.series(period),
+        "logging": {
+            "enabled": ai_usage.enabled,
+            "pending": ai_usage.pending,
+            "flushed": ai_usage.flushed,
+            "dropped": ai_usage.dropped
+        },
+        "cache": ai_cache.stats()
     }
\ No newline at end of file
@@ -3,10 +3,18 @@ from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from datetime import datetime, timedelta
 from typing import Optional
 import jwt
+import uuid
+from sqlalchemy.ext.asyncio import AsyncSession
 from ..schemas.user import UserCreate, UserLogin, UserResponse, Token
 from ..core.config import settings
+from ..core.database import get_db
+from ..core.passwords import dummy_hash, hash_password, is_hashed, verify_password
+from ..core.revocation import revocation_list
+from ..core.serialization import TrustedRoute
+from ..core.token_cache import token_cache
+from ..repositories.users import MemoryUserRepository, SqlUserRepository
 
-router = APIRouter(prefix="/auth", tags=["Authentication"])
+router = APIRouter(prefix="/auth", tags=["Authentication"], route_class=TrustedRoute)
 security = HTTPBearer()
 
 # Mock user database (in production, use real database)
@@ -15,7 +23,7 @@ mock_users_db = {
         "id": 1,
         "username": "admin",
         "email": "admin@blog.com",
-        "password": "admin123",  # In production, use hashed passwords
+        "password": "admin123",  # Plaintext seed, hashed at startup
         "first_name": "Admin",
         "last_name": "User",
         "role": "admin",
@@ -25,6 +33,19 @@ mock_users_db = {
         "updated_at": datetime.now()
     }
 }
+memory_user_repository = MemoryUserRepository(mock_users_db)
+
+async def hash_seed_passwords():
+    """Hash the built-in users' plaintext passwords before they are used or seeded"""
+    for user in mock_users_db.values():
+        if not is_hashed(user["password"]):
+            user["password"] = await hash_password(user["password"])
+
+def get_user_repository(db: Optional[AsyncSession] = Depends(get_db)):
+    """Use the database when configured, otherwise the in-memory users"""
+    if db is None:
+        return memory_user_repository
+    return SqlUserRepository(db)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -33,42 +54,73 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     else:
         expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "jti": uuid.uuid4().hex})
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
-def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
+def credentials_exception() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+def decode_token(token: str) -> dict:
+    """Verify a token's signature and expiry and return its claims"""
     try:
-        payload = jwt.decode(credentials.credentials, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Could not validate credentials",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
-        return email
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
     except jwt.PyJWTError:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Could not validate credentials",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+        raise credentials_exception()
+    if payload.get("sub") is None:
+        raise credentials_exception()
+    return payload
+
+async def check_not_revoked(claims: dict):
+    # Tokens issued before revocation support carry no jti
+    jti = claims.get("jti")
+    if jti and await revocation_list.is_revoked(jti):
+        raise credentials_exception()
+
+async def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    cached = token_cache.get(credentials.credentials)
+    claims = cached.claims if cached is not None else decode_token(credentials.credentials)
+    await check_not_revoked(claims)
+    return claims["sub"]
 
-def get_current_user(email: str = Depends(verify_token)):
-    user = mock_users_db.get(email)
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    users = Depends(get_user_repository)
+):
+    token = credentials.credentials
+    cached = token_cache.get(token)
+    if cached is not None:
+        # Another worker may have revoked it since it was cached
+        await check_not_revoked(cached.claims)
+        return cached.user
+    
+    claims = decode_token(token)
+    await check_not_revoked(claims)
+    user = await users.get_by_email(claims["sub"])
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User not found",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    
+    if not user["is_active"]:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Inactive user"
+        )
+    
+    token_cache.set(token, claims, user)
     return user
 
 @router.post("/register", response_model=UserResponse)
-async def register(user: UserCreate):
+async def register(user: UserCreate, users = Depends(get_user_repository)):
     """Register a new user"""
-    if user.email in mock_users_db:
+    if await users.get_by_email(user.email):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
@@ -76,10 +128,9 @@ async def register(user: UserCreate):
     
     # Create new user
     new_user = {
-        "id": len(mock_users_db) + 1,
         "username": user.username,
         "email": user.email,
-        "password": user.password,  # In production, hash this
+        "password": await hash_password(user.password),
         "first_name": user.first_name,
         "last_name": user.last_name,
         "bio": user.bio,
@@ -90,7 +141,7 @@ async def register(user: UserCreate):
         "updated_at": datetime.now()
     }
     
-    mock_users_db[user.email] = new_user
+    new_user = await users.create(new_user)
     
     # Return user without password
     user_response = new_user.copy()
@@ -98,17 +149,26 @@ async def register(user: UserCreate):
     return user_response
 
 @router.post("/login", response_model=Token)
-async def login(user_credentials: UserLogin):
+async def login(user_credentials: UserLogin, users = Depends(get_user_repository)):
     """Login user and return access token"""
-    user = mock_users_db.get(user_credentials.email)
+    user = await users.get_by_email(user_credentials.email)
     
-    if not user or user["password"] != user_credentials.password:
+    valid, new_hash = False, None
+    if user:
+        valid, new_hash = await verify_password(user_credentials.password, user["password"])
+    else:
+        await verify_password(user_credentials.password, await dummy_hash())
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    # Hashing parameters changed since this hash was made
+    if new_hash:
+        await users.update(user["id"], {"password": new_hash})
+    
     if not user["is_active"]:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -130,8 +190,15 @@ async def get_current_user_info(current_user: dict = Depends(get_current_user)):
     return user_response
 
 @router.post("/logout")
-async def logout():
-    """Logout user (in production, you might want to blacklist the token)"""
+async def logout(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    current_user: dict = Depends(get_current_user)
+):
+    """Logout user by revoking the access token until it expires"""
+    claims = decode_token(credentials.credentials)
+    if claims.get("jti"):
+        await revocation_list.revoke(claims["jti"], float(claims["exp"]))
+    token_cache.discard(credentials.credentials)
     return {"message": "Successfully logged out"}
 
 @router.post("/refresh", response_model=Token)
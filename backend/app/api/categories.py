@@ -1,10 +1,18 @@
-from fastapi import APIRouter, HTTPException, Depends
-from typing import List
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response
+from typing import List, Optional
 from datetime import datetime
-from ..schemas.category import CategoryCreate, CategoryUpdate, CategoryResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..schemas.category import CategoryCreate, CategoryUpdate, CategoryResponse, CategoryCounts
+from ..schemas.post import PostResponse
 from ..api.auth import get_current_user
+from ..core.cache import response_cache, category_tag, category_posts_tag, post_list_tags
+from ..core.conditional import check_not_modified, version_etag
+from ..core.database import get_db
+from ..core.serialization import TrustedRoute
+from ..repositories.categories import MemoryCategoryRepository, SqlCategoryRepository
+from .posts import get_post_repository
 
-router = APIRouter(prefix="/categories", tags=["Categories"])
+router = APIRouter(prefix="/categories", tags=["Categories"], route_class=TrustedRoute)
 
 # Mock categories database
 mock_categories_db = [
@@ -69,39 +77,79 @@ mock_categories_db = [
         "updated_at": datetime.now()
     }
 ]
+memory_category_repository = MemoryCategoryRepository(mock_categories_db)
+
+def get_category_repository(db: Optional[AsyncSession] = Depends(get_db)):
+    """Use the database when configured, otherwise the in-memory categories"""
+    if db is None:
+        return memory_category_repository
+    return SqlCategoryRepository(db)
+
+async def validate_parent(categories, parent_id: Optional[int], category_id: Optional[int] = None):
+    """Reject unknown parents and moves that would create a cycle"""
+    if parent_id is None:
+        return
+    if not await categories.get(parent_id):
+        raise HTTPException(status_code=400, detail="Parent category not found")
+    if category_id is not None and await categories.is_within(parent_id, category_id):
+        raise HTTPException(status_code=400, detail="Category cannot be moved under itself")
 
 @router.get("/", response_model=List[CategoryResponse])
-async def get_categories():
+async def get_categories(categories = Depends(get_category_repository)):
     """Get all active categories"""
-    return [cat for cat in mock_categories_db if cat["is_active"]]
+    return await response_cache.respond(
+        response_cache.key("categories"),
+        List[CategoryResponse],
+        categories.list_active,
+        tags=lambda page: ["categories", *(category_tag(cat["id"]) for cat in page)]
+    )
 
 @router.get("/{category_id}", response_model=CategoryResponse)
-async def get_category(category_id: int):
+async def get_category(
+    category_id: int,
+    request: Request,
+    response: Response,
+    categories = Depends(get_category_repository)
+):
     """Get a specific category by ID"""
-    category = next((cat for cat in mock_categories_db if cat["id"] == category_id), None)
+    category = await categories.get(category_id)
     if not category:
         raise HTTPException(status_code=404, detail="Category not found")
-    return category
+    
+    etag = version_etag("category", category_id, category["updated_at"])
+    return check_not_modified(request, response, etag, category["updated_at"]) or category
 
 @router.get("/slug/{slug}", response_model=CategoryResponse)
-async def get_category_by_slug(slug: str):
+async def get_category_by_slug(
+    slug: str,
+    request: Request,
+    response: Response,
+    categories = Depends(get_category_repository)
+):
     """Get a specific category by slug"""
-    category = next((cat for cat in mock_categories_db if cat["slug"] == slug), None)
+    category = await categories.get_by_slug(slug)
     if not category:
         raise HTTPException(status_code=404, detail="Category not found")
-    return category
+    
+    etag = version_etag("category", category["id"], category["updated_at"])
+    return check_not_modified(request, response, etag, category["updated_at"]) or category
 
 @router.post("/", response_model=CategoryResponse)
-async def create_category(category: CategoryCreate, current_user: dict = Depends(get_current_user)):
+async def create_category(
+    category: CategoryCreate,
+    current_user: dict = Depends(get_current_user),
+    categories = Depends(get_category_repository)
+):
     """Create a new category (Admin only)"""
     if current_user["role"] not in ["admin", "editor"]:
         raise HTTPException(status_code=403, detail="Not enough permissions")
     
+    await validate_parent(categories, category.parent_id)
+    
     # Generate slug from name
     slug = category.name.lower().replace(" ", "-").replace("أ", "a").replace("ب", "b")
     
     new_category = {
-        "id": len(mock_categories_db) + 1,
         "name": category.name,
         "slug": slug,
         "description": category.description,
@@ -113,62 +161,135 @@ async def create_category(category: CategoryCreate, current_user: dict = Depends
         "updated_at": datetime.now()
     }
     
-    mock_categories_db.append(new_category)
+    new_category = await categories.create(new_category)
+    # Ancestors' cached subtree listings must start tracking the new category
+    ancestors = await categories.ancestors(new_category["id"])
+    await response_cache.invalidate("categories", *(category_posts_tag(c["id"]) for c in ancestors))
     return new_category
 
 @router.put("/{category_id}", response_model=CategoryResponse)
 async def update_category(
     category_id: int, 
     category_update: CategoryUpdate, 
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    categories = Depends(get_category_repository)
 ):
     """Update an existing category (Admin only)"""
     if current_user["role"] not in ["admin", "editor"]:
         raise HTTPException(status_code=403, detail="Not enough permissions")
     
-    category = next((cat for cat in mock_categories_db if cat["id"] == category_id), None)
+    category = await categories.get(category_id)
     if not category:
         raise HTTPException(status_code=404, detail="Category not found")
     
     # Update fields
     update_data = category_update.dict(exclude_unset=True)
-    for field, value in update_data.items():
-        if field in category:
-            category[field] = value
-    
-    category["updated_at"] = datetime.now()
+    changes = {field: value for field, value in update_data.items() if field in category}
+    changes["updated_at"] = datetime.now()
     
     # Update slug if name changed
-    if "name" in update_data:
-        category["slug"] = category["name"].lower().replace(" ", "-").replace("أ", "a").replace("ب", "b")
+    if "name" in changes:
+        changes["slug"] = changes["name"].lower().replace(" ", "-").replace("أ", "a").replace("ب", "b")
+    
+    tags = ["categories", category_tag(category_id)]
+    moved = "parent_id" in changes and changes["parent_id"] != category["parent_id"]
+    if moved:
+        await validate_parent(categories, changes["parent_id"], category_id)
+        # Subtree listings of both the old and the new ancestors change
+        tags += [category_posts_tag(c["id"]) for c in await categories.ancestors(category_id)]
     
+    category = await categories.update(category_id, changes)
+    if moved:
+        tags += [category_posts_tag(c["id"]) for c in await categories.ancestors(category_id)]
+    await response_cache.invalidate(*tags)
     return category
 
 @router.delete("/{category_id}")
-async def delete_category(category_id: int, current_user: dict = Depends(get_current_user)):
+async def delete_category(
+    category_id: int,
+    current_user: dict = Depends(get_current_user),
+    categories = Depends(get_category_repository)
+):
     """Delete a category (Admin only)"""
     if current_user["role"] != "admin":
         raise HTTPException(status_code=403, detail="Not enough permissions")
     
-    category = next((cat for cat in mock_categories_db if cat["id"] == category_id), None)
+    category = await categories.get(category_id)
     if not category:
         raise HTTPException(status_code=404, detail="Category not found")
     
     # Check if category has posts (in real app, check database)
     # For now, just deactivate instead of delete
-    category["is_active"] = False
-    category["updated_at"] = datetime.now()
+    await categories.update(category_id, {"is_active": False, "updated_at": datetime.now()})
+    await response_cache.invalidate("categories", category_tag(category_id))
     
     return {"message": "Category deactivated successfully"}
 
 @router.get("/{category_id}/posts")
-async def get_category_posts(category_id: int):
-    """Get all posts in a specific category"""
-    from .posts import mock_posts_db
+async def get_category_posts(
+    category_id: int,
+    include_descendants: bool = Query(True, description="Include posts from subcategories"),
+    categories = Depends(get_category_repository),
+    posts = Depends(get_post_repository)
+):
+    """Get all posts in a specific category and its subcategories"""
+    cache_key = response_cache.key(
+        "categories:posts", category_id=category_id, include_descendants=include_descendants
+    )
+    cached = await response_cache.get(cache_key)
+    if cached:
+        return cached.response()
+    
+    category = await categories.get(category_id)
+    if not category:
+        raise HTTPException(status_code=404, detail="Category not found")
+    
+    category_ids = await categories.descendant_ids(category_id) if include_descendants else [category_id]
+    category_posts = await posts.list(status="published", category_ids=category_ids)
+    return await response_cache.store(
+        cache_key, List[PostResponse], category_posts,
+        tags=[
+            category_tag(category_id),
+            *(category_posts_tag(c) for c in category_ids),
+            *post_list_tags(category_posts)
+        ]
+    )
+
+@router.get("/{category_id}/breadcrumbs", response_model=List[CategoryResponse])
+async def get_category_breadcrumbs(category_id: int, categories = Depends(get_category_repository)):
+    """Get the path from the root category down to this one"""
+    category = await categories.get(category_id)
+    if not category:
+        raise HTTPException(status_code=404, detail="Category not found")
+    
+    return [*await categories.ancestors(category_id), category]
+
+@router.get("/{category_id}/counts", response_model=CategoryCounts)
+async def get_category_counts(
+    category_id: int,
+    categories = Depends(get_category_repository),
+    posts = Depends(get_post_repository)
+):
+    """Get published post counts for a category and its whole subtree"""
+    cache_key = response_cache.key("categories:counts", category_id=category_id)
+    cached = await response_cache.get(cache_key)
+    if cached:
+        return cached.response()
     
-    category = next((cat for cat in mock_categories_db if cat["id"] == category_id), None)
+    category = await categories.get(category_id)
     if not category:
         raise HTTPException(status_code=404, detail="Category not found")
     
-    posts = [post for post in mock_posts_db if post["category_id"] == category_id and post["status"] == "published"]
-    return posts
+    # Counted on a miss only: publishing, unpublishing or deleting a post
+    # anywhere in the subtree invalidates its category's posts tag
+    category_ids = await categories.descendant_ids(category_id)
+    counts = await posts.published_counts(category_ids)
+    return await response_cache.store(
+        cache_key, CategoryCounts,
+        {
+            "category_id": category_id,
+            "post_count": counts.get(category_id, 0),
+            "total_post_count": sum(counts.values())
+        },
+        tags=[category_tag(category_id), *(category_posts_tag(c) for c in category_ids)]
+    )
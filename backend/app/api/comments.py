@@ -1,10 +1,22 @@
-from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response
 from typing import List, Optional
+from collections import Counter
 from datetime import datetime
-from ..schemas.comment import CommentCreate, CommentUpdate, CommentResponse
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..schemas.comment import CommentCreate, CommentUpdate, CommentResponse, CommentTreeResponse
 from ..api.auth import get_current_user
+from ..core.bulk import NdjsonStreamingResponse, ndjson_batches, row_result, validation_message
+from ..core.cache import response_cache, post_tag
+from ..core.config import settings
+from ..core.database import get_db
+from ..core.pagination import decode_cursor, set_next_cursor
+from ..core.serialization import TrustedRoute
+from ..repositories.comments import MemoryCommentRepository, SqlCommentRepository
+from .posts import get_post_repository
 
-router = APIRouter(prefix="/comments", tags=["Comments"])
+router = APIRouter(prefix="/comments", tags=["Comments"], route_class=TrustedRoute)
+post_comments_router = APIRouter(prefix="/posts", tags=["Comments"], route_class=TrustedRoute)
 
 # Mock comments database
 mock_comments_db = [
@@ -42,68 +54,224 @@ mock_comments_db = [
         "updated_at": datetime.now()
     }
 ]
+memory_comment_repository = MemoryCommentRepository(mock_comments_db)
+
+def get_comment_repository(db: Optional[AsyncSession] = Depends(get_db)):
+    """Use the database when configured, otherwise the in-memory comments"""
+    if db is None:
+        return memory_comment_repository
+    return SqlCommentRepository(db)
+
+def build_comment(comment: CommentCreate, author: dict) -> dict:
+    """New comment record from validated input"""
+    now = datetime.now()
+    return {
+        "post_id": comment.post_id,
+        "user_id": author["id"],
+        "parent_id": comment.parent_id,
+        "content": comment.content,
+        "is_approved": author["role"] in ["admin", "editor"],  # Auto-approve for admins/editors
+        "is_ai_generated": False,
+        "created_at": now,
+        "updated_at": now
+    }
 
 @router.get("/", response_model=List[CommentResponse])
 async def get_comments(
+    response: Response,
     post_id: Optional[int] = Query(None),
+    user_id: Optional[int] = Query(None),
     skip: int = Query(0, ge=0),
     limit: int = Query(10, ge=1, le=100),
-    approved_only: bool = Query(True)
+    after: Optional[str] = Query(None, description="Cursor from the X-Next-Cursor header"),
+    approved_only: bool = Query(True),
+    comments = Depends(get_comment_repository)
 ):
     """Get comments with optional filtering"""
-    comments = mock_comments_db.copy()
-    
-    # Apply filters
-    if post_id:
-        comments = [c for c in comments if c["post_id"] == post_id]
-    
-    if approved_only:
-        comments = [c for c in comments if c["is_approved"]]
-    
-    # Apply pagination
-    return comments[skip:skip + limit]
+    page = await comments.list(
+        post_id=post_id,
+        user_id=user_id,
+        approved_only=approved_only,
+        skip=skip,
+        limit=limit,
+        after=decode_cursor(after)
+    )
+    set_next_cursor(response, page, limit)
+    return page
+
+@post_comments_router.get("/{post_id}/comments/tree", response_model=CommentTreeResponse)
+async def get_comment_tree(
+    post_id: int,
+    parent_id: Optional[int] = Query(None, description="Start below this comment (load more replies)"),
+    depth: int = Query(3, ge=1, le=10),
+    limit: int = Query(20, ge=1, le=100),
+    replies_limit: int = Query(5, ge=1, le=100),
+    after: Optional[str] = Query(None, description="next_cursor or replies_cursor from a previous page"),
+    approved_only: bool = Query(True),
+    comments = Depends(get_comment_repository)
+):
+    """Get a post's comments as a tree, paginated per level"""
+    nodes, next_cursor = await comments.thread(
+        post_id,
+        parent_id=parent_id,
+        depth=depth,
+        limit=limit,
+        replies_limit=replies_limit,
+        after=decode_cursor(after),
+        approved_only=approved_only
+    )
+    return {"comments": nodes, "next_cursor": next_cursor}
 
 @router.get("/{comment_id}", response_model=CommentResponse)
-async def get_comment(comment_id: int):
+async def get_comment(comment_id: int, comments = Depends(get_comment_repository)):
     """Get a specific comment by ID"""
-    comment = next((c for c in mock_comments_db if c["id"] == comment_id), None)
+    comment = await comments.get(comment_id)
     if not comment:
         raise HTTPException(status_code=404, detail="Comment not found")
     return comment
 
 @router.post("/", response_model=CommentResponse)
-async def create_comment(comment: CommentCreate, current_user: dict = Depends(get_current_user)):
+async def create_comment(
+    comment: CommentCreate,
+    current_user: dict = Depends(get_current_user),
+    comments = Depends(get_comment_repository),
+    posts = Depends(get_post_repository)
+):
     """Create a new comment"""
-    new_comment = {
-        "id": len(mock_comments_db) + 1,
-        "post_id": comment.post_id,
-        "user_id": current_user["id"],
-        "parent_id": comment.parent_id,
-        "content": comment.content,
-        "is_approved": current_user["role"] in ["admin", "editor"],  # Auto-approve for admins/editors
-        "is_ai_generated": False,
-        "created_at": datetime.now(),
-        "updated_at": datetime.now()
-    }
-    
-    mock_comments_db.append(new_comment)
+    new_comment = await comments.create(build_comment(comment, current_user))
     
     # Update post comment count
-    from .posts import mock_posts_db
-    post = next((p for p in mock_posts_db if p["id"] == comment.post_id), None)
-    if post:
-        post["comment_count"] += 1
+    await posts.increment(comment.post_id, "comment_count")
+    await response_cache.invalidate(post_tag(comment.post_id))
     
     return new_comment
 
+async def check_upserts(records: List[dict], current_user: dict, comments) -> List[Optional[str]]:
+    """Why each bulk record may not be written, or None if it may.
+
+    Updates need the comment's author or an admin, and a parent_id must
+    name an existing comment on the same post that is not the comment
+    itself or one of its replies (counting re-parents earlier in the batch).
+    """
+    known = await comments.get_many(
+        [record["id"] for record in records if record["id"] is not None]
+        + [record["parent_id"] for record in records if record["parent_id"] is not None]
+    )
+    planned_parents = {}
+
+    async def lookup(comment_id: int) -> Optional[dict]:
+        if comment_id not in known:
+            known[comment_id] = await comments.get(comment_id)
+        return known[comment_id]
+
+    async def parent_of(comment_id: int) -> Optional[int]:
+        if comment_id in planned_parents:
+            return planned_parents[comment_id]
+        comment = await lookup(comment_id)
+        return comment["parent_id"] if comment else None
+
+    errors = []
+    for record in records:
+        target = known.get(record["id"]) if record["id"] is not None else None
+        error = None
+        if target and target["user_id"] != current_user["id"] and current_user["role"] != "admin":
+            error = "Not enough permissions"
+        elif record["parent_id"] is not None:
+            parent = await lookup(record["parent_id"])
+            post_id = target["post_id"] if target else record["post_id"]
+            if parent is None:
+                error = "Parent comment not found"
+            elif parent["post_id"] != post_id:
+                error = "Parent comment belongs to another post"
+            elif target:
+                ancestor, seen = record["parent_id"], set()
+                while ancestor is not None and ancestor not in seen:
+                    if ancestor == target["id"]:
+                        error = "A comment cannot be a reply to itself or its replies"
+                        break
+                    seen.add(ancestor)
+                    ancestor = await parent_of(ancestor)
+        if error is None and target:
+            planned_parents[target["id"]] = record["parent_id"]
+        errors.append(error)
+    return errors
+
+@router.post("/bulk")
+async def bulk_upsert_comments(
+    request: Request,
+    current_user: dict = Depends(get_current_user),
+    comments = Depends(get_comment_repository),
+    posts = Depends(get_post_repository)
+):
+    """Create or update comments from an NDJSON body (Admin/Editor only)
+
+    Each line is a CommentCreate object; lines with the "id" of an existing
+    comment update it. One result line is streamed back per input line.
+    Only admins can update comments written by someone else.
+    """
+    if current_user["role"] not in ["admin", "editor"]:
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+
+    async def results():
+        async for batch in ndjson_batches(request, settings.IMPORT_BATCH_SIZE):
+            output = []
+            records, lines = [], []
+            for row in batch:
+                if row.error:
+                    output.append((row.line, row_result(row.line, "error", detail=row.error)))
+                    continue
+                try:
+                    comment = CommentCreate.model_validate(row.data)
+                except ValidationError as e:
+                    output.append((row.line, row_result(row.line, "error", detail=validation_message(e))))
+                    continue
+                comment_id = row.data.get("id")
+                if comment_id is not None and (not isinstance(comment_id, int) or isinstance(comment_id, bool)):
+                    output.append((row.line, row_result(row.line, "error", detail="id: must be an integer")))
+                    continue
+                records.append(dict(build_comment(comment, current_user), id=comment_id))
+                lines.append(row.line)
+
+            if records:
+                allowed = []
+                for line, record, error in zip(lines, records, await check_upserts(records, current_user, comments)):
+                    if error:
+                        output.append((line, row_result(line, "error", detail=error)))
+                    else:
+                        allowed.append((line, record))
+                lines = [line for line, _ in allowed]
+                records = [record for _, record in allowed]
+
+            if records:
+                # One comment_count update per post per batch
+                new_per_post = Counter()
+                written_posts = set()
+                for line, (comment, created) in zip(lines, await comments.upsert_many(records)):
+                    written_posts.add(comment["post_id"])
+                    if created:
+                        new_per_post[comment["post_id"]] += 1
+                    output.append((line, row_result(
+                        line, "created" if created else "updated", id=comment["id"], post_id=comment["post_id"]
+                    )))
+                for post_id, count in new_per_post.items():
+                    await posts.increment(post_id, "comment_count", count)
+                await response_cache.invalidate(*(post_tag(post_id) for post_id in written_posts))
+
+            # Results in input order
+            output.sort(key=lambda item: item[0])
+            yield b"".join(result for _, result in output)
+
+    return NdjsonStreamingResponse(results())
+
 @router.put("/{comment_id}", response_model=CommentResponse)
 async def update_comment(
     comment_id: int, 
     comment_update: CommentUpdate, 
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    comments = Depends(get_comment_repository)
 ):
     """Update a comment"""
-    comment = next((c for c in mock_comments_db if c["id"] == comment_id), None)
+    comment = await comments.get(comment_id)
     if not comment:
         raise HTTPException(status_code=404, detail="Comment not found")
     
@@ -113,18 +281,20 @@ async def update_comment(
     
     # Update fields
     update_data = comment_update.dict(exclude_unset=True)
-    for field, value in update_data.items():
-        if field in comment:
-            comment[field] = value
+    changes = {field: value for field, value in update_data.items() if field in comment}
+    changes["updated_at"] = datetime.now()
     
-    comment["updated_at"] = datetime.now()
-    
-    return comment
+    return await comments.update(comment_id, changes)
 
 @router.delete("/{comment_id}")
-async def delete_comment(comment_id: int, current_user: dict = Depends(get_current_user)):
-    """Delete a comment"""
-    comment = next((c for c in mock_comments_db if c["id"] == comment_id), None)
+async def delete_comment(
+    comment_id: int,
+    current_user: dict = Depends(get_current_user),
+    comments = Depends(get_comment_repository),
+    posts = Depends(get_post_repository)
+):
+    """Delete a comment and its replies"""
+    comment = await comments.get(comment_id)
     if not comment:
         raise HTTPException(status_code=404, detail="Comment not found")
     
@@ -132,51 +302,65 @@ async def delete_comment(comment_id: int, current_user: dict = Depends(get_curre
     if comment["user_id"] != current_user["id"] and current_user["role"] not in ["admin", "editor"]:
         raise HTTPException(status_code=403, detail="Not enough permissions")
     
-    mock_comments_db.remove(comment)
+    # Replies go with the comment, as the parent_id foreign key cascades
+    deleted = await comments.delete(comment_id)
     
     # Update post comment count
-    from .posts import mock_posts_db
-    post = next((p for p in mock_posts_db if p["id"] == comment["post_id"]), None)
-    if post:
-        post["comment_count"] = max(0, post["comment_count"] - 1)
+    await posts.increment(comment["post_id"], "comment_count", -deleted)
+    await response_cache.invalidate(post_tag(comment["post_id"]))
     
     return {"message": "Comment deleted successfully"}
 
 @router.post("/{comment_id}/approve")
-async def approve_comment(comment_id: int, current_user: dict = Depends(get_current_user)):
+async def approve_comment(
+    comment_id: int,
+    current_user: dict = Depends(get_current_user),
+    comments = Depends(get_comment_repository)
+):
     """Approve a comment (Admin/Editor only)"""
     if current_user["role"] not in ["admin", "editor"]:
         raise HTTPException(status_code=403, detail="Not enough permissions")
     
-    comment = next((c for c in mock_comments_db if c["id"] == comment_id), None)
+    comment = await comments.get(comment_id)
     if not comment:
         raise HTTPException(status_code=404, detail="Comment not found")
     
-    comment["is_approved"] = True
-    comment["updated_at"] = datetime.now()
+    await comments.update(comment_id, {"is_approved": True, "updated_at": datetime.now()})
     
     return {"message": "Comment approved successfully"}
 
 @router.post("/{comment_id}/reject")
-async def reject_comment(comment_id: int, current_user: dict = Depends(get_current_user)):
+async def reject_comment(
+    comment_id: int,
+    current_user: dict = Depends(get_current_user),
+    comments = Depends(get_comment_repository)
+):
     """Reject a comment (Admin/Editor only)"""
     if current_user["role"] not in ["admin", "editor"]:
         raise HTTPException(status_code=403, detail="Not enough permissions")
     
-    comment = next((c for c in mock_comments_db if c["id"] == comment_id), None)
+    comment = await comments.get(comment_id)
     if not comment:
         raise HTTPException(status_code=404, detail="Comment not found")
     
-    comment["is_approved"] = False
-    comment["updated_at"] = datetime.now()
+    await comments.update(comment_id, {"is_approved": False, "updated_at": datetime.now()})
     
     return {"message": "Comment rejected successfully"}
 
 @router.get("/pending/", response_model=List[CommentResponse])
-async def get_pending_comments(current_user: dict = Depends(get_current_user)):
-    """Get pending comments (Admin/Editor only)"""
+async def get_pending_comments(
+    response: Response,
+    post_id: Optional[int] = Query(None),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=200),
+    after: Optional[str] = Query(None, description="Cursor from the X-Next-Cursor header"),
+    current_user: dict = Depends(get_current_user),
+    comments = Depends(get_comment_repository)
+):
+    """Get pending comments, oldest first (Admin/Editor only)"""
     if current_user["role"] not in ["admin", "editor"]:
         raise HTTPException(status_code=403, detail="Not enough permissions")
     
-    pending_comments = [c for c in mock_comments_db if not c["is_approved"]]
-    return pending_comments
+    page = await comments.pending(post_id=post_id, skip=skip, limit=limit, after=decode_cursor(after))
+    set_next_cursor(response, page, limit)
+    return page
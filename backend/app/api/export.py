@@ -0,0 +1,131 @@
+import csv
+import io
+import json
+from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi.responses import StreamingResponse
+from typing import Any, AsyncIterator, Callable, List, Literal, Optional, Type
+from datetime import datetime
+from pydantic import BaseModel, TypeAdapter
+from ..schemas.comment import CommentResponse
+from ..schemas.post import PostResponse
+from ..schemas.user import UserResponse
+from ..api.auth import get_current_user, get_user_repository
+from ..core.config import settings
+from ..core.pagination import iterate_pages
+from ..core.serialization import TrustedRoute
+from .comments import get_comment_repository
+from .posts import get_post_repository
+
+router = APIRouter(prefix="/export", tags=["Export"], route_class=TrustedRoute)
+
+ExportFormat = Literal["ndjson", "csv"]
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+def require_admin(current_user: dict = Depends(get_current_user)) -> dict:
+    if current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    return current_user
+
+def csv_value(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+async def encode_ndjson(batches: AsyncIterator[List[dict]], model: Type[BaseModel]) -> AsyncIterator[bytes]:
+    adapter = TypeAdapter(model)
+    async for batch in batches:
+        yield b"".join(adapter.dump_json(adapter.validate_python(record)) + b"\n" for record in batch)
+
+async def encode_csv(batches: AsyncIterator[List[dict]], model: Type[BaseModel]) -> AsyncIterator[bytes]:
+    adapter = TypeAdapter(model)
+    fields = list(model.model_fields)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+
+    async for batch in batches:
+        for record in batch:
+            row = adapter.dump_python(adapter.validate_python(record), mode="json")
+            writer.writerow([csv_value(row[field]) for field in fields])
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+
+    # Header only, for an empty export
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+def export_response(
+    name: str,
+    fetch: Callable,
+    model: Type[BaseModel],
+    format: str,
+    keyset: bool = True,
+    **filters
+) -> StreamingResponse:
+    """Stream a repository listing batch by batch as NDJSON or CSV"""
+    batches = iterate_pages(fetch, batch_size=settings.EXPORT_BATCH_SIZE, keyset=keyset, **filters)
+    encode = encode_csv if format == "csv" else encode_ndjson
+    return StreamingResponse(
+        encode(batches, model),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{name}.{format}"'}
+    )
+
+@router.get("/posts")
+async def export_posts(
+    format: ExportFormat = Query("ndjson"),
+    since: Optional[datetime] = Query(None, description="Only rows updated at or after this time"),
+    status: Optional[str] = Query(None),
+    category_id: Optional[int] = Query(None),
+    featured: Optional[bool] = Query(None),
+    search: Optional[str] = Query(None),
+    current_user: dict = Depends(require_admin),
+    posts = Depends(get_post_repository)
+):
+    """Export posts (Admin only)"""
+    return export_response(
+        "posts", posts.list, PostResponse, format,
+        # Ranked search results have no keyset order
+        keyset=not search,
+        status=status or None,
+        category_id=category_id or None,
+        featured=featured,
+        search=search,
+        updated_since=since
+    )
+
+@router.get("/comments")
+async def export_comments(
+    format: ExportFormat = Query("ndjson"),
+    since: Optional[datetime] = Query(None, description="Only rows updated at or after this time"),
+    post_id: Optional[int] = Query(None),
+    approved_only: bool = Query(False),
+    current_user: dict = Depends(require_admin),
+    comments = Depends(get_comment_repository)
+):
+    """Export comments (Admin only)"""
+    return export_response(
+        "comments", comments.list, CommentResponse, format,
+        post_id=post_id,
+        approved_only=approved_only,
+        updated_since=since
+    )
+
+@router.get("/users")
+async def export_users(
+    format: ExportFormat = Query("ndjson"),
+    since: Optional[datetime] = Query(None, description="Only rows updated at or after this time"),
+    role: Optional[str] = Query(None),
+    current_user: dict = Depends(require_admin),
+    users = Depends(get_user_repository)
+):
+    """Export users without password hashes (Admin only)"""
+    return export_response(
+        "users", users.list, UserResponse, format,
+        role=role,
+        updated_since=since
+    )
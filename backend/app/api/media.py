@@ -0,0 +1,88 @@
+import os
+from fastapi import APIRouter, HTTPException, Depends, Request
+from typing import Optional
+from datetime import datetime
+import aiofiles.os
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..schemas.media import MediaFileResponse
+from ..api.auth import get_current_user
+from ..core import database, images
+from ..core.config import settings
+from ..core.database import get_db
+from ..core.serialization import TrustedRoute
+from ..core.uploads import file_type_of, media_path, receive_upload
+from ..repositories.media import MemoryMediaRepository, SqlMediaRepository
+
+router = APIRouter(prefix="/media", tags=["Media"], route_class=TrustedRoute)
+
+ALLOWED_EXTENSIONS = frozenset(
+    settings.ALLOWED_IMAGE_TYPES + settings.ALLOWED_VIDEO_TYPES + settings.ALLOWED_AUDIO_TYPES
+)
+
+TMP_DIR = os.path.join(settings.UPLOAD_DIR, "tmp")
+
+memory_media_repository = MemoryMediaRepository()
+
+def get_media_repository(db: Optional[AsyncSession] = Depends(get_db)):
+    """Use the database when configured, otherwise the in-memory media files"""
+    if db is None:
+        return memory_media_repository
+    return SqlMediaRepository(db)
+
+async def record_derivatives(media_id: int, changes: dict):
+    """Store a finished derivative job; runs after the upload request is gone"""
+    if database.SessionLocal is None:
+        await memory_media_repository.update(media_id, changes)
+        return
+    async with database.SessionLocal() as session:
+        await SqlMediaRepository(session).update(media_id, changes)
+
+@router.post("/upload", response_model=MediaFileResponse)
+async def upload_media(
+    request: Request,
+    current_user: dict = Depends(get_current_user),
+    media = Depends(get_media_repository)
+):
+    """Upload an image, video or audio file (multipart field "file")"""
+    received, fields = await receive_upload(request, TMP_DIR, ALLOWED_EXTENSIONS, settings.MAX_FILE_SIZE)
+    try:
+        existing = await media.get_by_hash(received.sha256)
+        if existing:
+            return existing
+
+        file_type = file_type_of(received.extension)
+        path = media_path(file_type, received.sha256, received.extension)
+        await aiofiles.os.replace(received.path, os.path.join(settings.UPLOAD_DIR, path))
+    finally:
+        if await aiofiles.os.path.exists(received.path):
+            await aiofiles.os.remove(received.path)
+
+    record = await media.create({
+        "filename": os.path.basename(path),
+        "original_filename": received.filename,
+        "file_path": path,
+        "file_type": file_type,
+        "mime_type": received.content_type or "application/octet-stream",
+        "file_size": received.size,
+        "content_hash": received.sha256,
+        "alt_text": fields.get("alt_text") or None,
+        "caption": fields.get("caption") or None,
+        "variants": None,
+        "uploaded_by": current_user["id"],
+        "is_ai_generated": False,
+        "created_at": datetime.now()
+    })
+
+    if file_type == "image" and record["variants"] is None:
+        media_id = record["id"]
+        images.schedule_image(path, lambda changes: record_derivatives(media_id, changes))
+
+    return record
+
+@router.get("/{media_id}", response_model=MediaFileResponse)
+async def get_media(media_id: int, media = Depends(get_media_repository)):
+    """Get a media file's metadata and URLs"""
+    record = await media.get(media_id)
+    if not record:
+        raise HTTPException(status_code=404, detail="Media file not found")
+    return record
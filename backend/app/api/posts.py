@@ -1,13 +1,24 @@
-from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response
 from typing import List, Optional
 from datetime import datetime
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
 from ..schemas.post import PostCreate, PostUpdate, PostResponse, PostListResponse
 from ..api.auth import get_current_user
+from ..core.bulk import NdjsonStreamingResponse, ndjson_batches, row_result, validation_message
+from ..core.cache import response_cache, post_tag, post_list_tags, category_posts_tag
+from ..core.conditional import check_not_modified, version_etag
+from ..core.config import settings
+from ..core.database import get_db
+from ..core.pagination import decode_cursor, set_next_cursor
+from ..core.serialization import TrustedRoute
+from ..repositories.posts import MemoryPostRepository, SqlPostRepository
+from ..stores.posts import PostStore
 
-router = APIRouter(prefix="/posts", tags=["Posts"])
+router = APIRouter(prefix="/posts", tags=["Posts"], route_class=TrustedRoute)
 
 # Mock posts database
-mock_posts_db = [
+post_store = PostStore([
     {
         "id": 1,
         "title": "مقدمة في الذكاء الاصطناعي وتطبيقاته",
@@ -80,106 +91,211 @@ mock_posts_db = [
         "created_at": datetime.now(),
         "updated_at": datetime.now()
     }
-]
+])
+memory_post_repository = MemoryPostRepository(post_store)
+
+def get_post_repository(db: Optional[AsyncSession] = Depends(get_db)):
+    """Use the database when configured, otherwise the in-memory store"""
+    if db is None:
+        return memory_post_repository
+    return SqlPostRepository(db)
+
+def post_cache_tags(post: dict) -> List[str]:
+    """Tags of the cached responses a post appears in (or joins once published)"""
+    tags = [post_tag(post["id"])]
+    if post["status"] == "published":
+        tags += ["posts:recent", category_posts_tag(post["category_id"])]
+        if post["is_featured"]:
+            tags.append("posts:featured")
+    return tags
+
+def slugify(title: str) -> str:
+    return title.lower().replace(" ", "-").replace("أ", "a").replace("ب", "b")
+
+def build_post(post: PostCreate, slug: str, author_id: int) -> dict:
+    """New draft post record from validated input"""
+    now = datetime.now()
+    return {
+        "title": post.title,
+        "slug": slug,
+        "content": post.content,
+        "excerpt": post.excerpt,
+        "status": "draft",
+        "post_type": "text",
+        "author_id": author_id,
+        "category_id": post.category_id,
+        "tags": post.tags or [],
+        "featured_image": None,
+        "view_count": 0,
+        "like_count": 0,
+        "comment_count": 0,
+        "share_count": 0,
+        "is_featured": post.is_featured,
+        "is_ai_generated": False,
+        "meta_description": post.meta_description,
+        "meta_keywords": post.meta_keywords,
+        "published_at": None,
+        "created_at": now,
+        "updated_at": now
+    }
 
 @router.get("/", response_model=List[PostListResponse])
 async def get_posts(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(10, ge=1, le=100),
+    after: Optional[str] = Query(None, description="Cursor from the X-Next-Cursor header"),
     status: Optional[str] = Query(None),
     category_id: Optional[int] = Query(None),
     featured: Optional[bool] = Query(None),
-    search: Optional[str] = Query(None)
+    search: Optional[str] = Query(None),
+    posts = Depends(get_post_repository)
 ):
     """Get all posts with optional filtering"""
-    posts = mock_posts_db.copy()
-    
-    # Apply filters
-    if status:
-        posts = [p for p in posts if p["status"] == status]
-    
-    if category_id:
-        posts = [p for p in posts if p["category_id"] == category_id]
-    
-    if featured is not None:
-        posts = [p for p in posts if p["is_featured"] == featured]
-    
-    if search:
-        search_lower = search.lower()
-        posts = [p for p in posts if 
-                search_lower in p["title"].lower() or 
-                search_lower in p["content"].lower() or
-                search_lower in p["excerpt"].lower()]
+    page = await posts.list(
+        status=status or None,
+        category_id=category_id or None,
+        featured=featured,
+        search=search,
+        skip=skip,
+        limit=limit,
+        after=decode_cursor(after)
+    )
     
-    # Apply pagination
-    return posts[skip:skip + limit]
+    # Search results are ranked by relevance and only paginate with skip
+    if not search:
+        set_next_cursor(response, page, limit)
+    return page
 
 @router.get("/{post_id}", response_model=PostResponse)
-async def get_post(post_id: int):
+async def get_post(
+    post_id: int,
+    request: Request,
+    response: Response,
+    posts = Depends(get_post_repository)
+):
     """Get a specific post by ID"""
-    post = next((p for p in mock_posts_db if p["id"] == post_id), None)
+    post = await posts.get(post_id)
     if not post:
         raise HTTPException(status_code=404, detail="Post not found")
     
     # Increment view count
-    post["view_count"] += 1
+    post["view_count"] = await posts.increment(post_id, "view_count")
     
-    return post
+    # Weak validator: counters change on every view without touching updated_at
+    etag = version_etag("post", post_id, post["updated_at"], weak=True)
+    return check_not_modified(request, response, etag, post["updated_at"]) or post
 
 @router.get("/slug/{slug}", response_model=PostResponse)
-async def get_post_by_slug(slug: str):
+async def get_post_by_slug(slug: str, posts = Depends(get_post_repository)):
     """Get a specific post by slug"""
-    post = next((p for p in mock_posts_db if p["slug"] == slug), None)
+    cache_key = response_cache.key("posts:slug", slug=slug)
+    cached = await response_cache.get(cache_key)
+    if cached:
+        # Still count the view; cached counters may lag by up to CACHE_TTL
+        await posts.increment(cached.meta["post_id"], "view_count")
+        return cached.response()
+    
+    post = await posts.get_by_slug(slug)
     if not post:
         raise HTTPException(status_code=404, detail="Post not found")
     
     # Increment view count
-    post["view_count"] += 1
+    post["view_count"] = await posts.increment(post["id"], "view_count")
     
-    return post
+    return await response_cache.store(
+        cache_key, PostResponse, post,
+        tags=[post_tag(post["id"])],
+        meta={"post_id": post["id"]}
+    )
 
 @router.post("/", response_model=PostResponse)
-async def create_post(post: PostCreate, current_user: dict = Depends(get_current_user)):
+async def create_post(
+    post: PostCreate,
+    current_user: dict = Depends(get_current_user),
+    posts = Depends(get_post_repository)
+):
     """Create a new post"""
     # Generate slug from title
-    slug = post.title.lower().replace(" ", "-").replace("أ", "a").replace("ب", "b")
+    slug = slugify(post.title)
+    if await posts.slug_taken(slug):
+        raise HTTPException(status_code=400, detail="Post with this slug already exists")
     
-    new_post = {
-        "id": len(mock_posts_db) + 1,
-        "title": post.title,
-        "slug": slug,
-        "content": post.content,
-        "excerpt": post.excerpt,
-        "status": "draft",
-        "post_type": "text",
-        "author_id": current_user["id"],
-        "category_id": post.category_id,
-        "tags": post.tags or [],
-        "featured_image": None,
-        "view_count": 0,
-        "like_count": 0,
-        "comment_count": 0,
-        "share_count": 0,
-        "is_featured": post.is_featured,
-        "is_ai_generated": False,
-        "meta_description": post.meta_description,
-        "meta_keywords": post.meta_keywords,
-        "published_at": None,
-        "created_at": datetime.now(),
-        "updated_at": datetime.now()
-    }
+    new_post = build_post(post, slug, current_user["id"])
     
-    mock_posts_db.append(new_post)
+    new_post = await posts.create(new_post)
+    await response_cache.invalidate(*post_cache_tags(new_post))
     return new_post
 
+@router.post("/bulk")
+async def bulk_upsert_posts(
+    request: Request,
+    current_user: dict = Depends(get_current_user),
+    posts = Depends(get_post_repository)
+):
+    """Create or update posts from an NDJSON body, matched by slug (Admin/Editor only)
+
+    Each line is a PostCreate object, optionally with a "slug"; one result
+    line is streamed back per input line. Like PUT, only admins can update
+    posts written by someone else.
+    """
+    if current_user["role"] not in ["admin", "editor"]:
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+
+    async def results():
+        async for batch in ndjson_batches(request, settings.IMPORT_BATCH_SIZE):
+            output = []
+            records, lines = [], []
+            for row in batch:
+                if row.error:
+                    output.append((row.line, row_result(row.line, "error", detail=row.error)))
+                    continue
+                try:
+                    post = PostCreate.model_validate(row.data)
+                except ValidationError as e:
+                    output.append((row.line, row_result(row.line, "error", detail=validation_message(e))))
+                    continue
+                slug = row.data.get("slug") or slugify(post.title)
+                records.append(build_post(post, str(slug), current_user["id"]))
+                lines.append(row.line)
+
+            if records and current_user["role"] != "admin":
+                authors = await posts.authors_by_slug([record["slug"] for record in records])
+                allowed = []
+                for line, record in zip(lines, records):
+                    if authors.get(record["slug"], current_user["id"]) != current_user["id"]:
+                        output.append((line, row_result(line, "error", detail="Not enough permissions")))
+                    else:
+                        allowed.append((line, record))
+                lines = [line for line, _ in allowed]
+                records = [record for _, record in allowed]
+
+            if records:
+                stale_tags = set()
+                for line, (post, previous) in zip(lines, await posts.upsert_many(records)):
+                    stale_tags.update(post_cache_tags(post))
+                    if previous:
+                        stale_tags.update(post_cache_tags(previous))
+                    output.append((line, row_result(
+                        line, "updated" if previous else "created", id=post["id"], slug=post["slug"]
+                    )))
+                await response_cache.invalidate(*stale_tags)
+
+            # Results in input order
+            output.sort(key=lambda item: item[0])
+            yield b"".join(result for _, result in output)
+
+    return NdjsonStreamingResponse(results())
+
 @router.put("/{post_id}", response_model=PostResponse)
 async def update_post(
     post_id: int, 
     post_update: PostUpdate, 
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    posts = Depends(get_post_repository)
 ):
     """Update an existing post"""
-    post = next((p for p in mock_posts_db if p["id"] == post_id), None)
+    post = await posts.get(post_id)
     if not post:
         raise HTTPException(status_code=404, detail="Post not found")
     
@@ -187,24 +303,36 @@ async def update_post(
     if post["author_id"] != current_user["id"] and current_user["role"] != "admin":
         raise HTTPException(status_code=403, detail="Not enough permissions")
     
+    # Responses the post leaves and joins both go stale
+    stale_tags = post_cache_tags(post)
+    
     # Update fields
     update_data = post_update.dict(exclude_unset=True)
-    for field, value in update_data.items():
-        if field in post:
-            post[field] = value
+    changes = {field: value for field, value in update_data.items() if field in post}
+    changes["updated_at"] = datetime.now()
     
-    post["updated_at"] = datetime.now()
+    # Stamp the publish date the first time a post goes live
+    if changes.get("status") == "published" and not post["published_at"]:
+        changes["published_at"] = datetime.now()
     
     # Update slug if title changed
-    if "title" in update_data:
-        post["slug"] = post["title"].lower().replace(" ", "-").replace("أ", "a").replace("ب", "b")
+    if "title" in changes:
+        changes["slug"] = slugify(changes["title"])
+        if await posts.slug_taken(changes["slug"], exclude_id=post_id):
+            raise HTTPException(status_code=400, detail="Post with this slug already exists")
     
+    post = await posts.update(post_id, changes)
+    await response_cache.invalidate(*stale_tags, *post_cache_tags(post))
     return post
 
 @router.delete("/{post_id}")
-async def delete_post(post_id: int, current_user: dict = Depends(get_current_user)):
+async def delete_post(
+    post_id: int,
+    current_user: dict = Depends(get_current_user),
+    posts = Depends(get_post_repository)
+):
     """Delete a post"""
-    post = next((p for p in mock_posts_db if p["id"] == post_id), None)
+    post = await posts.get(post_id)
     if not post:
         raise HTTPException(status_code=404, detail="Post not found")
     
@@ -212,38 +340,60 @@ async def delete_post(post_id: int, current_user: dict = Depends(get_current_use
     if post["author_id"] != current_user["id"] and current_user["role"] != "admin":
         raise HTTPException(status_code=403, detail="Not enough permissions")
     
-    mock_posts_db.remove(post)
+    await posts.delete(post_id)
+    await response_cache.invalidate(*post_cache_tags(post))
     return {"message": "Post deleted successfully"}
 
 @router.post("/{post_id}/like")
-async def like_post(post_id: int, current_user: dict = Depends(get_current_user)):
+async def like_post(
+    post_id: int,
+    current_user: dict = Depends(get_current_user),
+    posts = Depends(get_post_repository)
+):
     """Like a post"""
-    post = next((p for p in mock_posts_db if p["id"] == post_id), None)
-    if not post:
+    like_count = await posts.increment(post_id, "like_count")
+    if like_count is None:
         raise HTTPException(status_code=404, detail="Post not found")
     
-    post["like_count"] += 1
-    return {"message": "Post liked successfully", "like_count": post["like_count"]}
+    return {"message": "Post liked successfully", "like_count": like_count}
 
 @router.post("/{post_id}/share")
-async def share_post(post_id: int, current_user: dict = Depends(get_current_user)):
+async def share_post(
+    post_id: int,
+    current_user: dict = Depends(get_current_user),
+    posts = Depends(get_post_repository)
+):
     """Share a post"""
-    post = next((p for p in mock_posts_db if p["id"] == post_id), None)
-    if not post:
+    share_count = await posts.increment(post_id, "share_count")
+    if share_count is None:
         raise HTTPException(status_code=404, detail="Post not found")
     
-    post["share_count"] += 1
-    return {"message": "Post shared successfully", "share_count": post["share_count"]}
+    return {"message": "Post shared successfully", "share_count": share_count}
 
 @router.get("/featured/", response_model=List[PostListResponse])
-async def get_featured_posts(limit: int = Query(5, ge=1, le=20)):
-    """Get featured posts"""
-    featured_posts = [p for p in mock_posts_db if p["is_featured"] and p["status"] == "published"]
-    return featured_posts[:limit]
+async def get_featured_posts(
+    limit: int = Query(5, ge=1, le=20),
+    posts = Depends(get_post_repository)
+):
+    """Get the most recently published featured posts"""
+    return await response_cache.respond(
+        response_cache.key("posts:featured", limit=limit),
+        List[PostListResponse],
+        lambda: posts.recent(limit, featured=True),
+        tags=lambda page: ["posts:featured", *post_list_tags(page)]
+    )
 
 @router.get("/recent/", response_model=List[PostListResponse])
-async def get_recent_posts(limit: int = Query(10, ge=1, le=50)):
-    """Get recent published posts"""
-    recent_posts = [p for p in mock_posts_db if p["status"] == "published"]
-    recent_posts.sort(key=lambda x: x["published_at"], reverse=True)
-    return recent_posts[:limit]
+async def get_recent_posts(
+    limit: int = Query(10, ge=1, le=50),
+    category_id: Optional[int] = Query(None),
+    author_id: Optional[int] = Query(None),
+    posts = Depends(get_post_repository)
+):
+    """Get recent published posts, optionally per category or author"""
+    return await response_cache.respond(
+        response_cache.key("posts:recent", limit=limit, category_id=category_id, author_id=author_id),
+        List[PostListResponse],
+        lambda: posts.recent(limit, category_id=category_id, author_id=author_id),
+        tags=lambda page: ["posts:recent", *post_list_tags(page)]
+    )
@@ -1,9 +1,14 @@
-from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
 from typing import List, Optional
+from datetime import datetime
 from ..schemas.user import UserResponse, UserUpdate
-from ..api.auth import get_current_user
+from ..api.auth import get_current_user, get_user_repository
+from ..core.pagination import decode_cursor, set_next_cursor
+from ..core.passwords import hash_password
+from ..core.serialization import TrustedRoute
+from ..core.token_cache import token_cache
 
-router = APIRouter(prefix="/users", tags=["Users"])
+router = APIRouter(prefix="/users", tags=["Users"], route_class=TrustedRoute)
 
 @router.get("/me", response_model=UserResponse)
 async def get_my_profile(current_user: dict = Depends(get_current_user)):
@@ -15,64 +20,57 @@ async def get_my_profile(current_user: dict = Depends(get_current_user)):
 @router.put("/me", response_model=UserResponse)
 async def update_my_profile(
     user_update: UserUpdate, 
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    users = Depends(get_user_repository)
 ):
     """Update current user's profile"""
-    from ..api.auth import mock_users_db
-    
     # Update fields
     update_data = user_update.dict(exclude_unset=True)
-    for field, value in update_data.items():
-        if field in current_user and value is not None:
-            current_user[field] = value
-    
-    current_user["updated_at"] = datetime.now()
+    changes = {field: value for field, value in update_data.items()
+               if field in current_user and value is not None}
+    changes["updated_at"] = datetime.now()
+    if "password" in changes:
+        changes["password"] = await hash_password(changes["password"])
     
-    # Update in mock database
-    mock_users_db[current_user["email"]] = current_user
+    user = await users.update(current_user["id"], changes)
+    token_cache.invalidate_user(user["id"])
     
-    user_response = current_user.copy()
+    user_response = user.copy()
     del user_response["password"]
     return user_response
 
 @router.get("/", response_model=List[UserResponse])
 async def get_users(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(10, ge=1, le=100),
+    after: Optional[str] = Query(None, description="Cursor from the X-Next-Cursor header"),
     role: Optional[str] = Query(None),
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    users = Depends(get_user_repository)
 ):
     """Get all users (Admin only)"""
     if current_user["role"] != "admin":
         raise HTTPException(status_code=403, detail="Not enough permissions")
     
-    from ..api.auth import mock_users_db
-    
-    users = list(mock_users_db.values())
-    
-    # Apply role filter
-    if role:
-        users = [user for user in users if user["role"] == role]
-    
-    # Apply pagination
-    users = users[skip:skip + limit]
+    # Apply role filter and pagination
+    page = await users.list(role=role, skip=skip, limit=limit, after=decode_cursor(after))
+    set_next_cursor(response, page, limit)
     
     # Remove passwords from response
-    for user in users:
-        if "password" in user:
-            del user["password"]
-    
-    return users
+    return [{k: v for k, v in user.items() if k != "password"} for user in page]
 
 @router.get("/{user_id}", response_model=UserResponse)
-async def get_user(user_id: int, current_user: dict = Depends(get_current_user)):
+async def get_user(
+    user_id: int,
+    current_user: dict = Depends(get_current_user),
+    users = Depends(get_user_repository)
+):
     """Get a specific user by ID"""
     if current_user["role"] != "admin" and current_user["id"] != user_id:
         raise HTTPException(status_code=403, detail="Not enough permissions")
     
-    from ..api.auth import mock_users_db
-    
-    user = next((u for u in mock_users_db.values() if u["id"] == user_id), None)
+    user = await users.get(user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -84,35 +82,38 @@ async def get_user(user_id: int, current_user: dict = Depends(get_current_user))
 async def update_user(
     user_id: int, 
     user_update: UserUpdate, 
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    users = Depends(get_user_repository)
 ):
     """Update a user (Admin only or own profile)"""
     if current_user["role"] != "admin" and current_user["id"] != user_id:
         raise HTTPException(status_code=403, detail="Not enough permissions")
     
-    from ..api.auth import mock_users_db
-    
-    user = next((u for u in mock_users_db.values() if u["id"] == user_id), None)
+    user = await users.get(user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
     # Update fields
     update_data = user_update.dict(exclude_unset=True)
-    for field, value in update_data.items():
-        if field in user and value is not None:
-            user[field] = value
-    
-    user["updated_at"] = datetime.now()
+    changes = {field: value for field, value in update_data.items()
+               if field in user and value is not None}
+    changes["updated_at"] = datetime.now()
+    if "password" in changes:
+        changes["password"] = await hash_password(changes["password"])
     
-    # Update in mock database
-    mock_users_db[user["email"]] = user
+    user = await users.update(user_id, changes)
+    token_cache.invalidate_user(user_id)
     
     user_response = user.copy()
     del user_response["password"]
     return user_response
 
 @router.delete("/{user_id}")
-async def delete_user(user_id: int, current_user: dict = Depends(get_current_user)):
+async def delete_user(
+    user_id: int,
+    current_user: dict = Depends(get_current_user),
+    users = Depends(get_user_repository)
+):
     """Delete a user (Admin only)"""
     if current_user["role"] != "admin":
         raise HTTPException(status_code=403, detail="Not enough permissions")
@@ -120,36 +121,41 @@ async def delete_user(user_id: int, current_user: dict = Depends(get_current_use
     if current_user["id"] == user_id:
         raise HTTPException(status_code=400, detail="Cannot delete your own account")
     
-    from ..api.auth import mock_users_db
-    
-    user = next((u for u in mock_users_db.values() if u["id"] == user_id), None)
+    user = await users.get(user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
     # In production, you might want to soft delete
-    del mock_users_db[user["email"]]
+    await users.delete(user_id)
+    token_cache.invalidate_user(user_id)
     
     return {"message": "User deleted successfully"}
 
 @router.post("/{user_id}/activate")
-async def activate_user(user_id: int, current_user: dict = Depends(get_current_user)):
+async def activate_user(
+    user_id: int,
+    current_user: dict = Depends(get_current_user),
+    users = Depends(get_user_repository)
+):
     """Activate a user (Admin only)"""
     if current_user["role"] != "admin":
         raise HTTPException(status_code=403, detail="Not enough permissions")
     
-    from ..api.auth import mock_users_db
-    
-    user = next((u for u in mock_users_db.values() if u["id"] == user_id), None)
+    user = await users.get(user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    user["is_active"] = True
-    user["updated_at"] = datetime.now()
+    await users.update(user_id, {"is_active": True, "updated_at": datetime.now()})
+    token_cache.invalidate_user(user_id)
     
     return {"message": "User activated successfully"}
 
 @router.post("/{user_id}/deactivate")
-async def deactivate_user(user_id: int, current_user: dict = Depends(get_current_user)):
+async def deactivate_user(
+    user_id: int,
+    current_user: dict = Depends(get_current_user),
+    users = Depends(get_user_repository)
+):
     """Deactivate a user (Admin only)"""
     if current_user["role"] != "admin":
         raise HTTPException(status_code=403, detail="Not enough permissions")
@@ -157,13 +163,11 @@ async def deactivate_user(user_id: int, current_user: dict = Depends(get_current
     if current_user["id"] == user_id:
         raise HTTPException(status_code=400, detail="Cannot deactivate your own account")
     
-    from ..api.auth import mock_users_db
-    
-    user = next((u for u in mock_users_db.values() if u["id"] == user_id), None)
+    user = await users.get(user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    user["is_active"] = False
-    user["updated_at"] = datetime.now()
+    await users.update(user_id, {"is_active": False, "updated_at": datetime.now()})
+    token_cache.invalidate_user(user_id)
     
     return {"message": "User deactivated successfully"}
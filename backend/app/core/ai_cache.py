@@ -0,0 +1,218 @@
+import asyncio
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import Counter, OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from .config import settings
+
+# Short code-like fields compared case-insensitively
+CODE_FIELDS = ("language", "source_language", "target_language", "content_type")
+
+# Features whose results point into the input (error positions, corrected
+# text), so only byte-identical input may share a result
+EXACT_TEXT_FEATURES = frozenset({"grammar_check"})
+
+_SPACES = re.compile(r"[ \t\u00a0]+")
+
+def normalize_text(text: str) -> str:
+    """NFC, unified line endings, runs of spaces collapsed, ends trimmed"""
+    text = unicodedata.normalize("NFC", text).replace("\r\n", "\n").replace("\r", "\n")
+    return "\n".join(_SPACES.sub(" ", line).strip() for line in text.split("\n")).strip()
+
+def normalize_payload(payload: dict, exact_text: bool = False) -> dict:
+    """Payload with texts normalized (unless exact_text) and codes lowercased"""
+    normalized = {}
+    for name, value in payload.items():
+        if isinstance(value, str):
+            if name in CODE_FIELDS:
+                value = normalize_text(value).lower()
+            elif not exact_text:
+                value = normalize_text(value)
+        normalized[name] = value
+    return normalized
+
+def cache_key(feature: str, model: str, payload: dict) -> str:
+    payload = normalize_payload(payload, exact_text=feature in EXACT_TEXT_FEATURES)
+    body = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(f"{feature}\n{model}\n{body}".encode()).hexdigest()
+
+class MemoryTier:
+    """LRU of key -> (expires_at, result)"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, dict]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[dict]:
+        item = self._entries.get(key)
+        if item is None:
+            return None
+        if item[0] <= time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return item[1]
+
+    def set(self, key: str, result: dict, expires_at: float):
+        self._entries[key] = (expires_at, result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+class SqliteTier:
+    """On-disk tier; survives restarts and is shared by workers on one host.
+
+    Queries are sub-millisecond, so they run on the default thread pool
+    rather than a dedicated connection thread that could hold up exit.
+    """
+
+    # Expired rows are swept after this many writes
+    SWEEP_EVERY = 1000
+
+    def __init__(self, path: str):
+        self.path = path
+        self._db: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._writes = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            db = sqlite3.connect(self.path, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS ai_cache ("
+                "key TEXT PRIMARY KEY, feature TEXT NOT NULL, result TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            db.execute("DELETE FROM ai_cache WHERE expires_at <= ?", (time.time(),))
+            db.commit()
+            self._db = db
+        return self._db
+
+    def _get(self, key: str) -> Optional[Tuple[float, dict]]:
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT result, expires_at FROM ai_cache WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None or row[1] <= time.time():
+            return None
+        return row[1], json.loads(row[0])
+
+    def _set(self, key: str, feature: str, result: str, expires_at: float):
+        with self._lock:
+            db = self._connect()
+            db.execute(
+                "INSERT OR REPLACE INTO ai_cache (key, feature, result, expires_at) VALUES (?, ?, ?, ?)",
+                (key, feature, result, expires_at)
+            )
+            self._writes += 1
+            if self._writes % self.SWEEP_EVERY == 0:
+                db.execute("DELETE FROM ai_cache WHERE expires_at <= ?", (time.time(),))
+            db.commit()
+
+    def _clear(self):
+        with self._lock:
+            db = self._connect()
+            db.execute("DELETE FROM ai_cache")
+            db.commit()
+
+    def _close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    async def get(self, key: str) -> Optional[Tuple[float, dict]]:
+        return await asyncio.to_thread(self._get, key)
+
+    async def set(self, key: str, feature: str, result: dict, expires_at: float):
+        await asyncio.to_thread(self._set, key, feature, json.dumps(result, ensure_ascii=False), expires_at)
+
+    async def clear(self):
+        await asyncio.to_thread(self._clear)
+
+    async def close(self):
+        await asyncio.to_thread(self._close)
+
+class AIResultCache:
+    """Content-addressed cache of AI results, memory LRU in front of SQLite.
+
+    Keys hash the feature, the model and the normalized input, so editors
+    re-running a paragraph get the stored answer. Only features with a
+    TTL in AI_CACHE_TTLS are cached; generated media is not. Hits record
+    the tokens, provider time and cost they saved.
+    """
+
+    def __init__(self):
+        self.memory = MemoryTier(settings.AI_CACHE_MAX_ENTRIES)
+        self.disk = SqliteTier(settings.AI_CACHE_PATH) if settings.AI_CACHE_PATH else None
+        self.counters: Counter = Counter()
+
+    def cacheable(self, feature: str) -> bool:
+        return settings.AI_CACHE and settings.AI_CACHE_TTLS.get(feature, 0) > 0
+
+    async def get(self, feature: str, key: str) -> Optional[dict]:
+        result = self.memory.get(key)
+        tier = "memory"
+        if result is None and self.disk is not None:
+            item = await self.disk.get(key)
+            if item is not None:
+                expires_at, result = item
+                self.memory.set(key, result, expires_at)
+                tier = "disk"
+        if result is None:
+            self.counters[feature, "misses"] += 1
+            return None
+
+        self.counters[feature, "hits"] += 1
+        self.counters[feature, f"{tier}_hits"] += 1
+        self.counters[feature, "tokens_saved"] += result.get("tokens_used") or 0
+        self.counters[feature, "time_saved_ms"] += result.get("processing_time") or 0
+        return result
+
+    async def set(self, feature: str, key: str, result: dict):
+        expires_at = time.time() + settings.AI_CACHE_TTLS[feature]
+        self.memory.set(key, result, expires_at)
+        if self.disk is not None:
+            await self.disk.set(key, feature, result, expires_at)
+
+    async def clear(self):
+        self.memory.clear()
+        if self.disk is not None:
+            await self.disk.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        features = {}
+        for (feature, name), value in self.counters.items():
+            features.setdefault(feature, Counter())[name] = value
+        hits = sum(counts["hits"] for counts in features.values())
+        misses = sum(counts["misses"] for counts in features.values())
+        tokens_saved = sum(counts["tokens_saved"] for counts in features.values())
+        return {
+            "enabled": settings.AI_CACHE,
+            "memory_entries": len(self.memory),
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / (hits + misses), 4) if hits + misses else 0.0,
+            "tokens_saved": tokens_saved,
+            "time_saved_ms": sum(counts["time_saved_ms"] for counts in features.values()),
+            "cost_saved": round(tokens_saved / 1000 * settings.AI_COST_PER_1K_TOKENS, 4),
+            "features": {feature: dict(counts) for feature, counts in features.items()}
+        }
+
+    async def close(self):
+        if self.disk is not None:
+            await self.disk.close()
+
+ai_cache = AIResultCache()
@@ -0,0 +1,574 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import random
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional, Tuple
+import aiofiles
+import httpx
+from fastapi import HTTPException
+from .ai_cache import ai_cache, cache_key
+from .ai_usage import ai_usage
+from .config import settings
+from .uploads import media_path
+
+logger = logging.getLogger(__name__)
+
+# Feature names, as stored in ai_interactions.interaction_type
+FEATURES = (
+    "content_generation", "translation", "grammar_check",
+    "image_generation", "speech_to_text", "text_to_speech",
+)
+
+# Provider answers worth retrying; anything else 4xx is our request's fault
+RETRY_STATUSES = frozenset({408, 409, 429, 500, 502, 503, 504})
+
+# Features that can stream their text, and the result field holding it
+STREAMED_TEXT = {"content_generation": "generated_content"}
+
+Send = Callable[..., Awaitable[httpx.Response]]
+
+# ("token", text) while a streamed feature runs, then ("done", result);
+# ("error", detail) if the provider fails after the first token
+StreamEvent = Tuple[str, object]
+
+def invalid_response() -> HTTPException:
+    return HTTPException(status_code=502, detail="AI provider returned an invalid response")
+
+def string_field(value: Any) -> str:
+    """A string field of a provider body; anything else (e.g. null) is malformed"""
+    if not isinstance(value, str):
+        raise TypeError(f"expected a string, got {type(value).__name__}")
+    return value
+
+def read_json(response: httpx.Response, read: Callable[[Any], dict]) -> dict:
+    """read() applied to the JSON body; a body without the expected shape is a 502"""
+    try:
+        return read(response.json())
+    except (ValueError, KeyError, IndexError, TypeError, AttributeError):
+        logger.warning("AI provider returned an unexpected body from %s", response.request.url)
+        raise invalid_response()
+
+class MockAIBackend:
+    """Canned answers, for running without a provider account"""
+
+    name = "mock"
+
+    def model_for(self, feature: str) -> str:
+        return "mock"
+
+    async def run(self, feature: str, payload: dict, send: Send) -> dict:
+        return getattr(self, feature)(payload)
+
+    async def stream(self, feature: str, payload: dict, send: Send) -> AsyncIterator[StreamEvent]:
+        result = getattr(self, feature)(payload)
+        words = result.pop(STREAMED_TEXT[feature]).split(" ")
+        for index, word in enumerate(words):
+            yield "token", word if index == 0 else " " + word
+            await asyncio.sleep(0)
+        yield "done", result
+
+    def content_generation(self, payload: dict) -> dict:
+        prompt = payload["prompt"]
+        mock_content = {
+            "article": f"بناءً على طلبك '{prompt}'، إليك مقال شامل:\n\n{prompt} هو موضوع مهم جداً في عصرنا الحالي. هذا الموضوع له تأثير كبير على حياتنا اليومية...",
+            "title": f"دليل شامل حول {prompt}",
+            "summary": f"ملخص: {prompt} هو مفهوم أساسي يتطلب فهماً عميقاً...",
+            "outline": f"مخطط المقال:\n1. مقدمة عن {prompt}\n2. الأهمية والفوائد\n3. التطبيقات العملية\n4. الخلاصة والتوصيات"
+        }
+        generated_content = mock_content.get(payload["content_type"], f"محتوى حول {prompt}")
+        return {
+            "generated_content": generated_content,
+            "model_used": "mock-ai-model",
+            "tokens_used": len(generated_content.split())
+        }
+
+    def translation(self, payload: dict) -> dict:
+        text = payload["text"]
+        translations = {
+            ("ar", "en"): f"Translation of '{text}' to English: This is a translated text about the topic.",
+            ("en", "ar"): f"ترجمة '{text}' إلى العربية: هذا نص مترجم حول الموضوع.",
+            ("ar", "fr"): f"Traduction de '{text}' en français: Ceci est un texte traduit sur le sujet.",
+            ("en", "fr"): f"Traduction de '{text}' en français: Ceci est un texte traduit sur le sujet."
+        }
+        key = (payload["source_language"], payload["target_language"])
+        return {
+            "translated_text": translations.get(key, f"Translated: {text}"),
+            "confidence": 0.95,
+            "model_used": "mock-translation-model",
+            "tokens_used": 0
+        }
+
+    def grammar_check(self, payload: dict) -> dict:
+        return {
+            "corrected_text": payload["text"],
+            "errors": [
+                {
+                    "type": "spelling",
+                    "position": 10,
+                    "suggestion": "الذكاء الاصطناعي",
+                    "confidence": 0.9
+                }
+            ],
+            "suggestions": [
+                "تأكد من استخدام علامات الترقيم بشكل صحيح",
+                "استخدم مصطلحات أكثر دقة في هذا السياق"
+            ],
+            "model_used": "mock-grammar-model",
+            "tokens_used": 0
+        }
+
+    def image_generation(self, payload: dict) -> dict:
+        return {
+            "image_url": "https://via.placeholder.com/800x600/667eea/ffffff?text=AI+Generated+Image",
+            "model_used": "mock-image-model",
+            "tokens_used": 0
+        }
+
+    def speech_to_text(self, payload: dict) -> dict:
+        return {
+            "transcript": "هذا نص محول من الصوت إلى النص باستخدام الذكاء الاصطناعي",
+            "confidence": 0.92,
+            "language": "ar",
+            "duration": payload.get("duration", 30),
+            "model_used": "mock-speech-model",
+            "tokens_used": 0
+        }
+
+    def text_to_speech(self, payload: dict) -> dict:
+        return {
+            "audio_url": "https://example.com/generated-audio.mp3",
+            "duration": 15,
+            "model_used": "mock-tts-model",
+            "tokens_used": 0
+        }
+
+class OpenAIBackend:
+    """OpenAI-compatible HTTP API (also what ai_fake serves)"""
+
+    name = "openai"
+
+    VOICES = ("alloy", "echo", "fable", "onyx", "nova", "shimmer")
+
+    def model_for(self, feature: str) -> str:
+        return {
+            "image_generation": settings.AI_IMAGE_MODEL,
+            "speech_to_text": settings.AI_TRANSCRIBE_MODEL,
+            "text_to_speech": settings.AI_TTS_MODEL,
+        }.get(feature, settings.AI_CHAT_MODEL)
+
+    async def run(self, feature: str, payload: dict, send: Send) -> dict:
+        return await getattr(self, feature)(payload, send)
+
+    async def _chat(self, send: Send, messages: list, **options) -> dict:
+        response = await send("POST", "/chat/completions", json={
+            "model": settings.AI_CHAT_MODEL,
+            "messages": messages,
+            **options
+        })
+        return read_json(response, lambda data: {
+            "content": string_field(data["choices"][0]["message"]["content"]),
+            "model_used": data.get("model", settings.AI_CHAT_MODEL),
+            "tokens_used": data.get("usage", {}).get("total_tokens", 0)
+        })
+
+    @staticmethod
+    def _content_request(payload: dict) -> Tuple[list, dict]:
+        instructions = f"You write blog content. Write a {payload['content_type']} in the language '{payload['language']}'."
+        options = {}
+        if payload.get("max_length"):
+            instructions += f" Use at most {payload['max_length']} words."
+            options["max_tokens"] = payload["max_length"] * 3
+        messages = [
+            {"role": "system", "content": instructions},
+            {"role": "user", "content": payload["prompt"]}
+        ]
+        return messages, options
+
+    async def content_generation(self, payload: dict, send: Send) -> dict:
+        messages, options = self._content_request(payload)
+        reply = await self._chat(send, messages, **options)
+        return {"generated_content": reply.pop("content"), **reply}
+
+    async def stream(self, feature: str, payload: dict, send: Send) -> AsyncIterator[StreamEvent]:
+        """Chat completion with stream=true, relayed chunk by chunk (content generation only)"""
+        messages, options = self._content_request(payload)
+        response = await send("POST", "/chat/completions", stream=True, json={
+            "model": settings.AI_CHAT_MODEL,
+            "messages": messages,
+            "stream": True,
+            "stream_options": {"include_usage": True},
+            **options
+        })
+        model_used, tokens_used, chunks = settings.AI_CHAT_MODEL, None, 0
+        try:
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+                try:
+                    chunk = json.loads(data)
+                except ValueError:
+                    chunk = None
+                if not isinstance(chunk, dict):
+                    # Reported like any other provider failure, so the client ends the stream with an error
+                    raise httpx.DecodingError(f"Malformed stream chunk: {data[:200]!r}", request=response.request)
+                model_used = chunk.get("model", model_used)
+                if chunk.get("usage"):
+                    tokens_used = chunk["usage"].get("total_tokens")
+                for choice in chunk.get("choices", []):
+                    text = (choice.get("delta") or {}).get("content")
+                    if text:
+                        chunks += 1
+                        yield "token", text
+        finally:
+            # Closing an unfinished response drops the connection, aborting the generation
+            await response.aclose()
+        # Providers that omit usage in streams send about one token per chunk
+        yield "done", {"model_used": model_used, "tokens_used": tokens_used if tokens_used is not None else chunks}
+
+    async def translation(self, payload: dict, send: Send) -> dict:
+        reply = await self._chat(send, [
+            {"role": "system", "content": (
+                f"Translate the user's text from '{payload['source_language']}' to "
+                f"'{payload['target_language']}'. Reply with the translation only."
+            )},
+            {"role": "user", "content": payload["text"]}
+        ], temperature=0)
+        return {"translated_text": reply.pop("content"), "confidence": None, **reply}
+
+    async def grammar_check(self, payload: dict, send: Send) -> dict:
+        reply = await self._chat(send, [
+            {"role": "system", "content": (
+                f"You proofread text in the language '{payload['language']}'. Reply with a JSON object with "
+                "the keys corrected_text (string), errors (list of objects with type, position, suggestion "
+                "and confidence) and suggestions (list of strings)."
+            )},
+            {"role": "user", "content": payload["text"]}
+        ], temperature=0, response_format={"type": "json_object"})
+        try:
+            result = json.loads(reply.pop("content"))
+            return {
+                "corrected_text": str(result["corrected_text"]),
+                "errors": list(result.get("errors", [])),
+                "suggestions": [str(item) for item in result.get("suggestions", [])],
+                **reply
+            }
+        except (ValueError, KeyError, TypeError):
+            raise invalid_response()
+
+    async def image_generation(self, payload: dict, send: Send) -> dict:
+        response = await send("POST", "/images/generations", json={
+            "model": settings.AI_IMAGE_MODEL,
+            "prompt": payload["prompt"],
+            "size": payload["size"],
+            "n": 1
+        })
+        return read_json(response, lambda data: {
+            "image_url": string_field(data["data"][0]["url"]),
+            "model_used": settings.AI_IMAGE_MODEL,
+            "tokens_used": 0
+        })
+
+    async def speech_to_text(self, payload: dict, send: Send) -> dict:
+        file_path = payload.get("file_path")
+        if not file_path or os.path.isabs(file_path) or os.path.normpath(file_path).startswith(".."):
+            raise HTTPException(status_code=400, detail="file_path must point to an uploaded audio file")
+        full_path = os.path.join(settings.UPLOAD_DIR, os.path.normpath(file_path))
+        try:
+            async with aiofiles.open(full_path, "rb") as file:
+                audio = await file.read()
+        except FileNotFoundError:
+            raise HTTPException(status_code=404, detail="Audio file not found")
+
+        response = await send(
+            "POST", "/audio/transcriptions",
+            files={"file": (os.path.basename(full_path), audio)},
+            data={"model": settings.AI_TRANSCRIBE_MODEL, "response_format": "verbose_json"}
+        )
+        return read_json(response, lambda data: {
+            "transcript": string_field(data["text"]),
+            "confidence": None,
+            "language": data.get("language"),
+            "duration": data.get("duration"),
+            "model_used": settings.AI_TRANSCRIBE_MODEL,
+            "tokens_used": 0
+        })
+
+    async def text_to_speech(self, payload: dict, send: Send) -> dict:
+        voice = payload["voice"] if payload["voice"] in self.VOICES else settings.AI_TTS_VOICE
+        response = await send("POST", "/audio/speech", json={
+            "model": settings.AI_TTS_MODEL,
+            "input": payload["text"],
+            "voice": voice,
+            "response_format": "mp3"
+        })
+        # Stored content-addressed like uploads, so /uploads serves it immutable
+        audio = response.content
+        path = media_path("audio", hashlib.sha256(audio).hexdigest(), "mp3")
+        async with aiofiles.open(os.path.join(settings.UPLOAD_DIR, path), "wb") as file:
+            await file.write(audio)
+        return {
+            "audio_url": f"/uploads/{path}",
+            "duration": None,
+            "model_used": settings.AI_TTS_MODEL,
+            "tokens_used": 0
+        }
+
+def make_backend(provider: str):
+    if provider == "mock":
+        return MockAIBackend()
+    if provider in ("openai", "fake"):
+        return OpenAIBackend()
+    raise ValueError(f"Unknown AI provider '{provider}'")
+
+class AIClient:
+    """Shared client for AI provider calls.
+
+    One pooled httpx.AsyncClient serves every request, so AI traffic can
+    hold at most AI_MAX_CONNECTIONS sockets. Each feature has its own
+    semaphore (AI_CONCURRENCY); a request that cannot get a slot within
+    AI_QUEUE_TIMEOUT fails with 503 instead of piling up. Identical
+    requests already in flight are coalesced and share one provider call.
+    Timeouts, connection errors, 429 and 5xx answers are retried up to
+    AI_MAX_RETRIES times with full-jitter exponential backoff. Every call
+    is accounted in ai_usage.
+    """
+
+    def __init__(self, backend=None, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.backend = backend or make_backend(settings.AI_PROVIDER)
+        self.transport = transport
+        self._http: Optional[httpx.AsyncClient] = None
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._in_flight: Dict[str, asyncio.Task] = {}
+
+    def _client(self) -> httpx.AsyncClient:
+        if self._http is None:
+            transport = self.transport
+            base_url = settings.AI_BASE_URL
+            if transport is None and settings.AI_PROVIDER == "fake":
+                from .ai_fake import app as fake_app
+                transport = httpx.ASGITransport(app=fake_app)
+                base_url = "http://ai-fake/v1"
+            self._http = httpx.AsyncClient(
+                base_url=base_url,
+                transport=transport,
+                headers={"Authorization": f"Bearer {settings.OPENAI_API_KEY or ''}"},
+                timeout=httpx.Timeout(settings.AI_TIMEOUT, connect=settings.AI_CONNECT_TIMEOUT),
+                limits=httpx.Limits(
+                    max_connections=settings.AI_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.AI_MAX_KEEPALIVE_CONNECTIONS
+                )
+            )
+        return self._http
+
+    def _semaphore(self, feature: str) -> asyncio.Semaphore:
+        semaphore = self._semaphores.get(feature)
+        if semaphore is None:
+            limit = settings.AI_CONCURRENCY.get(feature, settings.AI_DEFAULT_CONCURRENCY)
+            semaphore = self._semaphores[feature] = asyncio.Semaphore(limit)
+        return semaphore
+
+    @staticmethod
+    def flight_key(feature: str, payload: dict) -> str:
+        body = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(f"{feature}\n{body}".encode()).hexdigest()
+
+    @staticmethod
+    def backoff(attempt: int, retry_after: Optional[str] = None) -> float:
+        """Full-jitter exponential delay, or the provider's Retry-After (both capped)"""
+        if retry_after:
+            try:
+                return min(float(retry_after), settings.AI_RETRY_MAX_DELAY)
+            except ValueError:
+                pass
+        return random.uniform(0, min(settings.AI_RETRY_MAX_DELAY, settings.AI_RETRY_BASE_DELAY * 2 ** attempt))
+
+    async def send(self, method: str, url: str, stream: bool = False, **kwargs) -> httpx.Response:
+        """Provider request with retries; raises 502/504 when they run out.
+
+        With stream=True the body is left unread (only the status is
+        checked, so retries happen before any output) and the caller must
+        close the response.
+        """
+        client = self._client()
+        for attempt in range(settings.AI_MAX_RETRIES + 1):
+            last = attempt == settings.AI_MAX_RETRIES
+            try:
+                response = await client.send(client.build_request(method, url, **kwargs), stream=stream)
+            except httpx.TimeoutException:
+                if last:
+                    raise HTTPException(status_code=504, detail="AI provider timed out")
+                delay = self.backoff(attempt)
+            except httpx.TransportError:
+                if last:
+                    raise HTTPException(status_code=502, detail="AI provider is unreachable")
+                delay = self.backoff(attempt)
+            else:
+                if response.status_code < 400:
+                    return response
+                if stream:
+                    await response.aclose()
+                if response.status_code not in RETRY_STATUSES or last:
+                    logger.warning("AI provider answered %s for %s %s", response.status_code, method, url)
+                    raise HTTPException(status_code=502, detail="AI provider error")
+                delay = self.backoff(attempt, response.headers.get("retry-after"))
+            await asyncio.sleep(delay)
+
+    async def _acquire(self, feature: str) -> asyncio.Semaphore:
+        """The feature's slot, or 503 if none frees up within AI_QUEUE_TIMEOUT"""
+        semaphore = self._semaphore(feature)
+        try:
+            await asyncio.wait_for(semaphore.acquire(), settings.AI_QUEUE_TIMEOUT)
+        except asyncio.TimeoutError:
+            raise HTTPException(
+                status_code=503,
+                detail="AI service is busy, try again later",
+                headers={"Retry-After": str(max(1, round(settings.AI_QUEUE_TIMEOUT)))}
+            )
+        return semaphore
+
+    async def _store(self, feature: str, stored_key: Optional[str], result: dict):
+        if stored_key is None:
+            return
+        try:
+            await ai_cache.set(feature, stored_key, result)
+        except Exception:
+            logger.exception("Could not store %s result in the AI cache", feature)
+
+    def _cache_key(self, feature: str, payload: dict) -> Optional[str]:
+        if not ai_cache.cacheable(feature):
+            return None
+        return cache_key(feature, f"{self.backend.name}:{self.backend.model_for(feature)}", payload)
+
+    async def _call(self, feature: str, payload: dict, stored_key: Optional[str]) -> dict:
+        queued = time.perf_counter()
+        try:
+            semaphore = await self._acquire(feature)
+            try:
+                started = time.perf_counter()
+                result = await self.backend.run(feature, payload, self.send)
+                result["processing_time"] = round((time.perf_counter() - started) * 1000)
+            finally:
+                semaphore.release()
+        except Exception:
+            ai_usage.record(feature, self.backend.model_for(feature), (time.perf_counter() - queued) * 1000, success=False)
+            raise
+        # Accounted here rather than per caller, so a call whose callers left still counts once
+        ai_usage.record(feature, result.get("model_used"), (time.perf_counter() - queued) * 1000, result.get("tokens_used"))
+        await self._store(feature, stored_key, result)
+        return result
+
+    def _land(self, key: str, task: asyncio.Task):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        if not task.cancelled():
+            # Retrieved here so a call whose callers all left doesn't warn
+            task.exception()
+
+    async def run(self, feature: str, payload: dict) -> dict:
+        """Run an AI feature, from the result cache or shared with identical in-flight calls.
+
+        cached is true for anything that did not cost this caller a
+        provider call: result cache hits and joins of an in-flight call.
+        """
+        started = time.perf_counter()
+        stored_key = self._cache_key(feature, payload)
+        if stored_key is not None:
+            cached = await ai_cache.get(feature, stored_key)
+            if cached is not None:
+                # processing_time is this lookup; the stored one was what the hit saved
+                lookup_time = round((time.perf_counter() - started) * 1000, 3)
+                ai_usage.record(feature, cached.get("model_used"), lookup_time, cached=True)
+                return dict(cached, cached=True, processing_time=lookup_time)
+
+        key = self.flight_key(feature, payload)
+        task = self._in_flight.get(key)
+        joined = task is not None
+        if task is None:
+            task = asyncio.create_task(self._call(feature, payload, stored_key))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done: self._land(key, done))
+        # Shielded: one caller going away must not cancel the others' call
+        result = await asyncio.shield(task)
+        if joined:
+            # Answered by another caller's provider call: cached, in the ledger and the response alike
+            ai_usage.record(feature, result.get("model_used"), (time.perf_counter() - started) * 1000, cached=True)
+        return dict(result, cached=joined)
+
+    async def stream(self, feature: str, payload: dict) -> AsyncIterator[StreamEvent]:
+        """Run a text feature as ("token", text) events ending in ("done", result).
+
+        The feature's slot is held until the stream ends. Closing the
+        generator (the client went away) closes the provider response,
+        which aborts the generation upstream. The result carries the full
+        text, tokens_used, first_token_time and processing_time (ms) and is
+        cached like run()'s; cached text arrives as a single token.
+        """
+        text_field = STREAMED_TEXT[feature]
+        started = time.perf_counter()
+        elapsed = lambda: round((time.perf_counter() - started) * 1000, 3)
+        stored_key = self._cache_key(feature, payload)
+        if stored_key is not None:
+            cached = await ai_cache.get(feature, stored_key)
+            if cached is not None:
+                ai_usage.record(feature, cached.get("model_used"), elapsed(), cached=True)
+                yield "token", cached[text_field]
+                yield "done", dict(cached, cached=True, first_token_time=elapsed(), processing_time=elapsed())
+                return
+
+        try:
+            semaphore = await self._acquire(feature)
+        except HTTPException:
+            ai_usage.record(feature, self.backend.model_for(feature), elapsed(), success=False)
+            raise
+        events = self.backend.stream(feature, payload, self.send)
+        parts, result, first_token_time = [], None, None
+        try:
+            async for kind, value in events:
+                if kind == "token":
+                    if first_token_time is None:
+                        first_token_time = elapsed()
+                    parts.append(value)
+                    yield kind, value
+                else:
+                    result = value
+        except httpx.HTTPError:
+            logger.warning("AI provider stream for %s broke off after %d chunks", feature, len(parts))
+            if not parts:
+                raise HTTPException(status_code=502, detail="AI provider stream was interrupted")
+            yield "error", "AI provider stream was interrupted"
+            return
+        finally:
+            try:
+                # Explicitly, so an abandoned stream closes its provider response now
+                await events.aclose()
+            finally:
+                semaphore.release()
+                if result is None:
+                    # Broken off or abandoned; billed for about one token per chunk sent
+                    ai_usage.record(feature, self.backend.model_for(feature), elapsed(), len(parts), success=False)
+
+        result = dict(result, **{text_field: "".join(parts)}, processing_time=round(elapsed()))
+        ai_usage.record(feature, result["model_used"], elapsed(), result["tokens_used"])
+        await self._store(feature, stored_key, result)
+        logger.info(
+            "Streamed %s: %s tokens, first token after %s ms, %s ms in total",
+            feature, result["tokens_used"], first_token_time, result["processing_time"]
+        )
+        yield "done", dict(result, cached=False, first_token_time=first_token_time)
+
+    async def stop(self):
+        """Let in-flight calls finish, then close the connection pool"""
+        if self._in_flight:
+            await asyncio.gather(*self._in_flight.values(), return_exceptions=True)
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+        await ai_cache.close()
+
+ai_client = AIClient()
@@ -0,0 +1,113 @@
+"""Local stand-in for an OpenAI-compatible provider.
+
+Used in-process by AI_PROVIDER=fake, or run as a server and pointed at
+with AI_PROVIDER=openai and AI_BASE_URL=http://127.0.0.1:8001/v1:
+
+    uvicorn app.core.ai_fake:app --port 8001
+
+Answers are deterministic and derived from the request. AI_FAKE_LATENCY
+adds a delay to every call and AI_FAKE_ERROR_RATE makes that share of
+calls fail with 503 or 429, to exercise the client's limits and retries.
+Streamed chat completions send one word per AI_FAKE_TOKEN_INTERVAL.
+"""
+import asyncio
+import hashlib
+import json
+import random
+from collections import Counter
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from .config import settings
+
+app = FastAPI(title="Fake AI provider", docs_url=None, redoc_url=None)
+
+# Calls received per endpoint, including the failed ones
+calls: Counter = Counter()
+
+def _tokens(text: str) -> int:
+    return len(text.split())
+
+@app.middleware("http")
+async def simulate(request: Request, call_next):
+    calls[request.url.path] += 1
+    if settings.AI_FAKE_LATENCY:
+        await asyncio.sleep(settings.AI_FAKE_LATENCY)
+    if random.random() < settings.AI_FAKE_ERROR_RATE:
+        if random.random() < 0.5:
+            return JSONResponse({"error": {"message": "Rate limited"}}, status_code=429, headers={"Retry-After": "0"})
+        return JSONResponse({"error": {"message": "Overloaded"}}, status_code=503)
+    return await call_next(request)
+
+def _chat_stream(body: dict, content: str, usage: dict):
+    """SSE chunks of content, one word each, AI_FAKE_TOKEN_INTERVAL apart"""
+    model = body.get("model", "fake-model")
+
+    def chunk(delta: dict, finish_reason=None) -> str:
+        return "data: " + json.dumps({
+            "id": "chatcmpl-fake",
+            "object": "chat.completion.chunk",
+            "model": model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+        }, ensure_ascii=False) + "\n\n"
+
+    async def events():
+        try:
+            yield chunk({"role": "assistant"})
+            for index, word in enumerate(content.split(" ")):
+                await asyncio.sleep(settings.AI_FAKE_TOKEN_INTERVAL)
+                yield chunk({"content": word if index == 0 else " " + word})
+            yield chunk({}, "stop")
+            if body.get("stream_options", {}).get("include_usage"):
+                yield "data: " + json.dumps({"model": model, "choices": [], "usage": usage}) + "\n\n"
+            yield "data: [DONE]\n\n"
+        except asyncio.CancelledError:
+            calls["aborted_streams"] += 1
+            raise
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    prompt = body["messages"][-1]["content"]
+    if body.get("response_format", {}).get("type") == "json_object":
+        content = json.dumps({"corrected_text": prompt, "errors": [], "suggestions": []}, ensure_ascii=False)
+    else:
+        # Padded to about a tenth of max_tokens so streams have something to stream
+        content = " ".join([f"Fake reply to: {prompt}"] + [f"word{i}" for i in range(body.get("max_tokens", 0) // 10)])
+    prompt_tokens = sum(_tokens(message["content"]) for message in body["messages"])
+    usage = {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": _tokens(content),
+        "total_tokens": prompt_tokens + _tokens(content)
+    }
+    if body.get("stream"):
+        return _chat_stream(body, content, usage)
+    return {
+        "id": "chatcmpl-fake",
+        "object": "chat.completion",
+        "model": body.get("model", "fake-model"),
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": usage
+    }
+
+@app.post("/v1/images/generations")
+async def image_generations(request: Request):
+    body = await request.json()
+    digest = hashlib.sha256(body["prompt"].encode()).hexdigest()[:16]
+    return {"data": [{"url": f"https://fake-ai.invalid/images/{digest}.png"}]}
+
+@app.post("/v1/audio/transcriptions")
+async def audio_transcriptions(request: Request):
+    form = await request.form()
+    audio = await form["file"].read()
+    return {"text": f"Fake transcript of {len(audio)} bytes", "language": "arabic", "duration": len(audio) / 16000}
+
+@app.post("/v1/audio/speech")
+async def audio_speech(request: Request):
+    body = await request.json()
+    return Response(content=b"ID3" + body["input"].encode(), media_type="audio/mpeg")
+
+@app.get("/v1/calls")
+async def get_calls():
+    return dict(calls)
@@ -0,0 +1,272 @@
+import asyncio
+import logging
+import math
+import time
+from collections import Counter, deque
+from datetime import datetime, timezone
+from itertools import islice
+from typing import Any, Awaitable, Callable, Deque, Dict, List, NamedTuple, Optional
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+class UsageRecord(NamedTuple):
+    """One AI call, as written to ai_interactions"""
+    feature: str
+    model: Optional[str]
+    latency_ms: float
+    tokens: int
+    cost: float
+    success: bool
+    cached: bool
+    created_at: float  # unix time
+
+Sink = Callable[[List[UsageRecord]], Awaitable[None]]
+
+class LatencyHistogram:
+    """HDR-style log-linear histogram of latencies, recorded in microseconds.
+
+    Values below 32 us get a bucket each; above that every power of two
+    is split into 16 buckets, so a percentile is within about 3% of the
+    true value while the histogram stays a few dozen counters.
+    """
+
+    SUB_BITS = 5
+
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts: Counter = Counter()
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    @classmethod
+    def _index(cls, value: int) -> int:
+        if value < 1 << cls.SUB_BITS:
+            return value
+        shift = value.bit_length() - cls.SUB_BITS
+        return (shift << cls.SUB_BITS) | (value >> shift)
+
+    @classmethod
+    def _midpoint(cls, index: int) -> float:
+        shift, mantissa = index >> cls.SUB_BITS, index & ((1 << cls.SUB_BITS) - 1)
+        if shift == 0:
+            return mantissa
+        return (mantissa << shift) + ((1 << shift) - 1) / 2
+
+    def record(self, latency_ms: float):
+        value = max(0, int(latency_ms * 1000))
+        self.counts[self._index(value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def merge(self, other: "LatencyHistogram"):
+        self.counts.update(other.counts)
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def percentile(self, percent: float) -> float:
+        """Latency in ms that percent of the calls did not exceed"""
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(percent / 100 * self.count))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return round(min(self._midpoint(index), self.max) / 1000, 3)
+        return round(self.max / 1000, 3)
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "mean": round(self.total / self.count / 1000, 3) if self.count else 0.0,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+            "max": round(self.max / 1000, 3)
+        }
+
+class Rollup:
+    """Totals for one feature over one time bucket"""
+
+    __slots__ = ("calls", "errors", "cached", "tokens", "cost", "latency")
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.cached = 0
+        self.tokens = 0
+        self.cost = 0.0
+        self.latency = LatencyHistogram()
+
+    def add(self, record: UsageRecord):
+        self.calls += 1
+        self.errors += not record.success
+        self.cached += record.cached
+        self.tokens += record.tokens
+        self.cost += record.cost
+        self.latency.record(record.latency_ms)
+
+    def merge(self, other: "Rollup"):
+        self.calls += other.calls
+        self.errors += other.errors
+        self.cached += other.cached
+        self.tokens += other.tokens
+        self.cost += other.cost
+        self.latency.merge(other.latency)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "requests": self.calls,
+            "errors": self.errors,
+            "cached": self.cached,
+            "tokens_used": self.tokens,
+            "cost": round(self.cost, 4),
+            "success_rate": round(1 - self.errors / self.calls, 4) if self.calls else 1.0,
+            "latency_ms": self.latency.summary()
+        }
+
+# Rollup resolutions: bucket width in seconds and buckets kept
+RESOLUTIONS = {"minute": (60, 120), "hour": (3600, 48), "day": (86400, 30)}
+
+# Reporting periods: the resolution they are read from and how many buckets
+PERIODS = {"hour": ("minute", 60), "day": ("hour", 24), "today": ("day", 1), "week": ("day", 7), "month": ("day", 30)}
+
+class AIUsageLedger:
+    """Accounting for AI calls, aggregated in memory and logged in batches.
+
+    record() runs on the event loop and only updates per-minute, per-hour
+    and per-day rollups (call counts, errors, tokens, cost and a latency
+    histogram per feature) and appends to a bounded ring of unflushed
+    calls, so it needs no lock and never touches the database. A
+    background task writes the ring to ai_interactions every flush
+    interval. Each worker process keeps its own rollups, covering the
+    calls it served since it started; ai_interactions holds every call.
+    """
+
+    def __init__(self, flush_interval: float = 5.0, buffer_size: int = 50000, batch_size: int = 500):
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.rollups: Dict[str, Dict[int, Dict[str, Rollup]]] = {name: {} for name in RESOLUTIONS}
+        self._pending: Deque[UsageRecord] = deque(maxlen=buffer_size)
+        self.dropped = 0
+        self.flushed = 0
+        self._sink: Optional[Sink] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self._sink is not None
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    @staticmethod
+    def cost(feature: str, tokens: int) -> float:
+        return tokens / 1000 * settings.AI_COST_PER_1K_TOKENS + settings.AI_COST_PER_CALL.get(feature, 0.0)
+
+    def record(
+        self, feature: str, model: Optional[str], latency_ms: float,
+        tokens: int = 0, success: bool = True, cached: bool = False
+    ):
+        """Account for one call; cached calls cost nothing"""
+        tokens = tokens or 0
+        cost = 0.0 if cached or (not success and not tokens) else self.cost(feature, tokens)
+        usage = UsageRecord(feature, model, latency_ms, tokens, cost, success, cached, time.time())
+
+        for name, (width, keep) in RESOLUTIONS.items():
+            buckets = self.rollups[name]
+            start = int(usage.created_at // width * width)
+            features = buckets.get(start)
+            if features is None:
+                features = buckets[start] = {}
+                # Buckets are created in time order, so the first is the oldest
+                while len(buckets) > keep:
+                    del buckets[next(iter(buckets))]
+            rollup = features.get(feature)
+            if rollup is None:
+                rollup = features[feature] = Rollup()
+            rollup.add(usage)
+
+        if self._sink is not None:
+            if len(self._pending) == self._pending.maxlen:
+                self.dropped += 1
+            self._pending.append(usage)
+
+    def _buckets(self, period: str) -> List[tuple]:
+        """(start, {feature: Rollup}) for the period's buckets, oldest first"""
+        resolution, count = PERIODS[period]
+        width = RESOLUTIONS[resolution][0]
+        since = int(time.time() // width * width) - (count - 1) * width
+        return [(start, features) for start, features in self.rollups[resolution].items() if start >= since]
+
+    def totals(self, period: str = "day") -> Dict[str, Rollup]:
+        """Per-feature rollups merged over the period"""
+        merged: Dict[str, Rollup] = {}
+        for _, features in self._buckets(period):
+            for feature, rollup in features.items():
+                merged.setdefault(feature, Rollup()).merge(rollup)
+        return merged
+
+    def series(self, period: str = "day") -> List[Dict[str, Any]]:
+        """One point per non-empty bucket, all features combined"""
+        points = []
+        for start, features in self._buckets(period):
+            combined = Rollup()
+            for rollup in features.values():
+                combined.merge(rollup)
+            points.append({
+                "start": datetime.fromtimestamp(start, timezone.utc).isoformat(),
+                "requests": combined.calls,
+                "errors": combined.errors,
+                "tokens_used": combined.tokens,
+                "cost": round(combined.cost, 4),
+                "p90_ms": combined.latency.percentile(90)
+            })
+        return points
+
+    async def flush(self):
+        """Write unflushed calls through the sink, batch_size rows at a time"""
+        while self._sink is not None and self._pending:
+            batch = list(islice(self._pending, self.batch_size))
+            dropped = self.dropped
+            try:
+                await self._sink(batch)
+            except Exception:
+                logger.exception("AI usage flush failed, keeping %d calls for the next attempt", len(self._pending))
+                return
+            # Calls pushed out of a full ring while writing were from the front of
+            # this batch: they were written, so they are not dropped after all
+            written_out = min(len(batch), self.dropped - dropped)
+            self.dropped -= written_out
+            for _ in range(len(batch) - written_out):
+                self._pending.popleft()
+            self.flushed += len(batch)
+
+    async def start(self, sink: Sink):
+        self._sink = sink
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+        self._sink = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+# Accounting for this worker process
+ai_usage = AIUsageLedger(settings.AI_USAGE_FLUSH_INTERVAL, settings.AI_USAGE_BUFFER_SIZE, settings.AI_USAGE_BATCH_SIZE)
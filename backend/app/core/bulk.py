@@ -0,0 +1,69 @@
+import json
+from typing import Any, AsyncIterator, List, NamedTuple, Optional
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+
+class NdjsonRow(NamedTuple):
+    line: int
+    data: Any
+    error: Optional[str] = None
+
+async def ndjson_batches(request: Request, batch_size: int) -> AsyncIterator[List[NdjsonRow]]:
+    """Parse an NDJSON request body incrementally, batch_size rows at a time.
+
+    Only the current batch and one partial line are held in memory, so
+    bodies of any size can be imported. Unparseable lines come back with
+    error set instead of aborting the import.
+    """
+    buffer = b""
+    line_no = 0
+    batch: List[NdjsonRow] = []
+
+    async def lines():
+        nonlocal buffer
+        async for chunk in request.stream():
+            buffer += chunk
+            *complete, buffer = buffer.split(b"\n")
+            for line in complete:
+                yield line
+        if buffer:
+            yield buffer
+
+    async for line in lines():
+        line_no += 1
+        if not line.strip():
+            continue
+        try:
+            batch.append(NdjsonRow(line_no, json.loads(line)))
+        except ValueError as e:
+            batch.append(NdjsonRow(line_no, None, f"Invalid JSON: {e}"))
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+
+    if batch:
+        yield batch
+
+def row_result(line: int, status: str, **fields) -> bytes:
+    return json.dumps({"line": line, "status": status, **fields}, ensure_ascii=False).encode() + b"\n"
+
+def validation_message(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in e['loc']) or 'body'}: {e['msg']}" for e in error.errors()
+    )
+
+class NdjsonStreamingResponse(StreamingResponse):
+    """StreamingResponse that may keep reading the request body while it streams.
+
+    Starlette's version consumes receive() to watch for a disconnect, which
+    would swallow request body chunks; here a disconnect surfaces as
+    ClientDisconnect from request.stream() instead.
+    """
+
+    media_type = "application/x-ndjson"
+
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
@@ -0,0 +1,303 @@
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, NamedTuple, Optional, Set, Union
+from urllib.parse import urlencode
+from fastapi import Response
+from pydantic import TypeAdapter
+from .compression import compress, request_encoding
+from .conditional import body_etag, encoded_etag, http_date, last_modified_of
+from .config import settings
+
+class CacheEntry(NamedTuple):
+    body: bytes
+    meta: dict
+    # Compressed copies of body by content coding, filled in on demand
+    encoded: Optional[Dict[str, bytes]] = None
+
+    def headers(self, status: str, encoding: Optional[str] = None) -> Dict[str, str]:
+        headers = {"X-Cache": status, "ETag": self.meta["etag"]}
+        if encoding is not None:
+            headers["ETag"] = encoded_etag(headers["ETag"], encoding)
+            headers["Content-Encoding"] = encoding
+            headers["Vary"] = "Accept-Encoding"
+        if self.meta.get("last_modified"):
+            headers["Last-Modified"] = self.meta["last_modified"]
+        return headers
+
+    def response(self, status: str = "HIT") -> Response:
+        """The cached body, precompressed when the request negotiated an encoding we hold"""
+        encoding = request_encoding.get()
+        if encoding is not None and self.encoded and encoding in self.encoded:
+            return Response(
+                content=self.encoded[encoding],
+                media_type="application/json",
+                headers=self.headers(status, encoding)
+            )
+        return Response(content=self.body, media_type="application/json", headers=self.headers(status))
+
+class MemoryCacheBackend:
+    """In-process LRU cache with per-entry TTL and a tag -> keys index"""
+
+    def __init__(self, max_entries: int = 1000):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._tags: Dict[str, Set[str]] = {}
+
+    async def get(self, key: str) -> Optional[CacheEntry]:
+        item = self._entries.get(key)
+        if item is None:
+            return None
+        entry, expires_at, tags = item
+        if expires_at <= time.monotonic():
+            self._drop(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    async def set_encoded(self, key: str, entry: CacheEntry, encoding: str, body: bytes):
+        # Entries are shared objects; updating this one updates the cache
+        entry.encoded[encoding] = body
+
+    async def set(self, key: str, entry: CacheEntry, ttl: int, tags: Iterable[str]):
+        if key in self._entries:
+            self._drop(key)
+        tags = frozenset(tags)
+        self._entries[key] = (entry, time.monotonic() + ttl, tags)
+        for tag in tags:
+            self._tags.setdefault(tag, set()).add(key)
+
+        while len(self._entries) > self.max_entries:
+            self._drop(next(iter(self._entries)))
+
+    async def invalidate(self, tags: Iterable[str]):
+        for tag in tags:
+            for key in list(self._tags.get(tag, ())):
+                self._drop(key)
+
+    async def clear(self):
+        self._entries.clear()
+        self._tags.clear()
+
+    def _drop(self, key: str):
+        _, _, tags = self._entries.pop(key)
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+class RedisCacheBackend:
+    """Cache shared by all workers through any Redis-protocol server.
+
+    Entries are hashes (body, meta) with a TTL; each tag is a set of keys.
+    LRU eviction is left to the server (maxmemory-policy allkeys-lru).
+    Takes any redis.asyncio-compatible client, e.g. fakeredis in tests.
+    """
+
+    def __init__(self, client, prefix: str = "blog:cache:"):
+        self.client = client
+        self.prefix = prefix
+
+    async def get(self, key: str) -> Optional[CacheEntry]:
+        item = await self.client.hgetall(self.prefix + key)
+        if b"body" not in item:
+            return None
+        encoded = {
+            field[len(b"body:"):].decode(): value for field, value in item.items() if field.startswith(b"body:")
+        }
+        return CacheEntry(item[b"body"], json.loads(item[b"meta"]), encoded)
+
+    async def set_encoded(self, key: str, entry: CacheEntry, encoding: str, body: bytes):
+        """Add a compressed copy to an entry that is still cached.
+
+        The entry is WATCHed, so an invalidation between the existence
+        check and the write aborts and retries rather than recreating a
+        hash that holds only the compressed body.
+        """
+        redis_key = self.prefix + key
+
+        async def write(pipe):
+            exists = await pipe.exists(redis_key)
+            pipe.multi()
+            if exists:
+                pipe.hset(redis_key, f"body:{encoding}", body)
+
+        await self.client.transaction(write, redis_key)
+        entry.encoded[encoding] = body
+
+    async def set(self, key: str, entry: CacheEntry, ttl: int, tags: Iterable[str]):
+        """Store an entry and add it to its tag sets.
+
+        Each tag set must outlive its longest-lived entry. Rather than
+        EXPIRE's NX/GT flags (Redis 7+), the tag TTLs are read after
+        WATCHing the tag keys and only raised ones are written, so this
+        works on any server version; a concurrent write retries.
+        """
+        redis_key = self.prefix + key
+        tag_keys = [f"{self.prefix}tag:{tag}" for tag in tags]
+
+        async def write(pipe):
+            current = []
+            if tag_keys:
+                # Read on another connection: pipe is watching, so a change still aborts the write
+                async with self.client.pipeline(transaction=False) as reads:
+                    for tag_key in tag_keys:
+                        reads.ttl(tag_key)
+                    current = await reads.execute()
+            pipe.multi()
+            pipe.delete(redis_key)
+            pipe.hset(redis_key, mapping={
+                "body": entry.body,
+                "meta": json.dumps(entry.meta),
+                **{f"body:{encoding}": body for encoding, body in (entry.encoded or {}).items()}
+            })
+            pipe.expire(redis_key, ttl)
+            for tag_key, tag_ttl in zip(tag_keys, current):
+                pipe.sadd(tag_key, redis_key)
+                # -2: a new set, -1: no TTL yet
+                if tag_ttl < ttl:
+                    pipe.expire(tag_key, ttl)
+
+        await self.client.transaction(write, *tag_keys)
+
+    async def invalidate(self, tags: Iterable[str]):
+        """Delete every entry under the tags, and the tag sets.
+
+        The tag sets are WATCHed while their members are read, so an entry
+        tagged between SUNION and DEL retries the invalidation instead of
+        surviving it with its tag set gone.
+        """
+        tag_keys = [f"{self.prefix}tag:{tag}" for tag in tags]
+        if not tag_keys:
+            return
+
+        async def write(pipe):
+            keys = await pipe.sunion(tag_keys)
+            pipe.multi()
+            pipe.delete(*keys, *tag_keys)
+
+        await self.client.transaction(write, *tag_keys)
+
+    async def clear(self):
+        async for key in self.client.scan_iter(match=self.prefix + "*"):
+            await self.client.delete(key)
+
+class ResponseCache:
+    """Caches serialized JSON response bodies for read endpoints.
+
+    Entries are keyed by route and query and tagged with the ids of the
+    posts/categories they contain; mutation handlers invalidate by tag.
+    """
+
+    def __init__(self, backend=None, ttl: int = 60):
+        self.backend = backend
+        self.ttl = ttl
+        self._adapters: Dict[Any, TypeAdapter] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend is not None
+
+    @staticmethod
+    def key(route: str, **params) -> str:
+        query = urlencode(sorted((k, v) for k, v in params.items() if v is not None))
+        return f"{route}?{query}"
+
+    async def get(self, key: str) -> Optional[CacheEntry]:
+        if self.backend is None:
+            return None
+        entry = await self.backend.get(key)
+        if entry is not None:
+            encoding = self._missing_encoding(entry)
+            if encoding is not None:
+                body = compress(entry.body, encoding, settings.COMPRESSION_CACHED_PROFILE)
+                await self.backend.set_encoded(key, entry, encoding, body)
+        return entry
+
+    @staticmethod
+    def _missing_encoding(entry: CacheEntry) -> Optional[str]:
+        """The request's encoding, if the entry should but doesn't yet hold it.
+
+        Each entry is compressed at most once per encoding (at the cached
+        profile's higher level) instead of on every response.
+        """
+        encoding = request_encoding.get()
+        if encoding is None or encoding in entry.encoded or len(entry.body) < settings.COMPRESSION_MIN_SIZE:
+            return None
+        return encoding
+
+    async def store(
+        self,
+        key: str,
+        model: Any,
+        data: Any,
+        tags: Iterable[str] = (),
+        meta: Optional[dict] = None,
+        ttl: Optional[int] = None
+    ) -> Response:
+        """Serialize data through its response model, cache it and return the response"""
+        adapter = self._adapters.get(model)
+        if adapter is None:
+            adapter = self._adapters[model] = TypeAdapter(model)
+        body = adapter.dump_json(adapter.validate_python(data))
+
+        # Validators are computed once here so hits can be revalidated for free
+        last_modified = last_modified_of(data)
+        meta = dict(meta or {}, etag=body_etag(body))
+        if last_modified:
+            meta["last_modified"] = http_date(last_modified)
+        entry = CacheEntry(body, meta, {})
+
+        if self.backend is not None:
+            encoding = self._missing_encoding(entry)
+            if encoding is not None:
+                entry.encoded[encoding] = compress(body, encoding, settings.COMPRESSION_CACHED_PROFILE)
+            await self.backend.set(key, entry, ttl or self.ttl, tags)
+        return entry.response("MISS")
+
+    async def respond(
+        self,
+        key: str,
+        model: Any,
+        load: Callable[[], Awaitable[Any]],
+        tags: Union[Iterable[str], Callable[[Any], Iterable[str]]] = (),
+        ttl: Optional[int] = None
+    ) -> Response:
+        """Return the cached body for key, or load, cache and return it"""
+        entry = await self.get(key)
+        if entry is not None:
+            return entry.response()
+
+        data = await load()
+        if callable(tags):
+            tags = tags(data)
+        return await self.store(key, model, data, tags=tags, ttl=ttl)
+
+    async def invalidate(self, *tags: str):
+        if self.backend is not None and tags:
+            await self.backend.invalidate(tags)
+
+def create_backend():
+    if settings.CACHE_BACKEND == "memory":
+        return MemoryCacheBackend(settings.CACHE_MAX_ENTRIES)
+    if settings.CACHE_BACKEND == "redis":
+        import redis.asyncio as redis
+        return RedisCacheBackend(redis.from_url(settings.REDIS_URL))
+    return None
+
+def post_tag(post_id: int) -> str:
+    return f"post:{post_id}"
+
+def category_tag(category_id: Optional[int]) -> str:
+    return f"category:{category_id}"
+
+def category_posts_tag(category_id: Optional[int]) -> str:
+    return f"category:{category_id}:posts"
+
+def post_list_tags(posts: List[dict]) -> List[str]:
+    return [post_tag(post["id"]) for post in posts]
+
+# Shared cache for this worker process
+response_cache = ResponseCache(create_backend(), settings.CACHE_TTL)
@@ -0,0 +1,45 @@
+import re
+from typing import Iterator, List, Tuple
+
+# Preferred split points, coarsest first: paragraphs, sentences, words
+BOUNDARIES = (
+    re.compile(r"(?<=\n\n)"),
+    re.compile(r"(?<=[.!?؟。])(?=\s)"),
+    re.compile(r"(?<=\s)(?=\S)"),
+)
+
+def _pieces(text: str, limit: int, level: int = 0) -> Iterator[str]:
+    if len(text) <= limit:
+        yield text
+    elif level == len(BOUNDARIES):
+        for start in range(0, len(text), limit):
+            yield text[start:start + limit]
+    else:
+        for piece in BOUNDARIES[level].split(text):
+            if piece:
+                yield from _pieces(piece, limit, level + 1)
+
+def split_text(text: str, limit: int) -> List[str]:
+    """Split text into chunks of at most limit characters.
+
+    Chunks end at paragraph breaks where possible, then sentence ends, then
+    spaces, and concatenate back to exactly text.
+    """
+    chunks: List[str] = []
+    current = ""
+    for piece in _pieces(text, limit):
+        if current and len(current) + len(piece) > limit:
+            chunks.append(current)
+            current = ""
+        current += piece
+    if current or not chunks:
+        chunks.append(current)
+    return chunks
+
+def chunk_spacing(chunk: str) -> Tuple[str, str]:
+    """The leading and trailing whitespace a chunk's rewritten text should keep"""
+    stripped = chunk.strip()
+    if not stripped:
+        return chunk, ""
+    start = chunk.index(stripped)
+    return chunk[:start], chunk[start + len(stripped):]
@@ -0,0 +1,216 @@
+import zlib
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+from starlette.datastructures import Headers, MutableHeaders
+from .conditional import encoded_etag
+from .config import settings
+
+try:
+    import brotli
+except ImportError:  # optional: pip install brotli
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # optional: pip install zstandard
+    zstandard = None
+
+# Compression levels per profile; "high" is for bodies compressed once and cached
+PROFILES: Dict[str, Dict[str, int]] = {
+    "fast": {"gzip": 1, "br": 1, "zstd": 1},
+    "default": {"gzip": 6, "br": 4, "zstd": 3},
+    "high": {"gzip": 9, "br": 9, "zstd": 12},
+}
+
+COMPRESSIBLE_TYPES = (
+    "application/json", "application/x-ndjson", "application/javascript",
+    "application/xml", "image/svg+xml", "text/",
+)
+
+# Streams that must reach the client event by event
+UNCOMPRESSIBLE_TYPES = ("text/event-stream",)
+
+# Encoding negotiated for the current request, for precompressed cache bodies
+request_encoding: ContextVar[Optional[str]] = ContextVar("request_encoding", default=None)
+
+def available_encodings() -> List[str]:
+    """Configured encodings whose codec is installed, in server preference order"""
+    installed = {"gzip": True, "br": brotli is not None, "zstd": zstandard is not None}
+    return [encoding for encoding in settings.COMPRESSION_ENCODINGS if installed.get(encoding)]
+
+def accepted_codings(headers: Headers) -> Dict[str, float]:
+    """Accept-Encoding as coding -> q-value"""
+    codings = {}
+    for item in headers.get("accept-encoding", "").split(","):
+        coding, *params = [part.strip() for part in item.split(";")]
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        codings[coding.lower()] = quality
+    return codings
+
+def negotiate(headers: Headers, encodings: List[str]) -> Optional[str]:
+    """The best encoding the client accepts, ties broken by server preference"""
+    codings = accepted_codings(headers)
+    wildcard = codings.get("*", 0.0)
+    best, best_quality = None, 0.0
+    for encoding in encodings:
+        quality = codings.get(encoding, wildcard)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+def is_compressible(content_type: str) -> bool:
+    content_type = content_type.lower()
+    return content_type.startswith(COMPRESSIBLE_TYPES) and not content_type.startswith(UNCOMPRESSIBLE_TYPES)
+
+def compress(body: bytes, encoding: str, profile: str = "default") -> bytes:
+    level = PROFILES[profile][encoding]
+    if encoding == "gzip":
+        compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+        return compressor.compress(body) + compressor.flush()
+    if encoding == "br":
+        return brotli.compress(body, quality=level)
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=level).compress(body)
+    raise ValueError(f"Unknown encoding '{encoding}'")
+
+class StreamCompressor:
+    """Incremental compressor; every chunk is flushed so streams stay live"""
+
+    def __init__(self, encoding: str, profile: str = "default"):
+        level = PROFILES[profile][encoding]
+        self.encoding = encoding
+        if encoding == "gzip":
+            self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+        elif encoding == "br":
+            self._compressor = brotli.Compressor(quality=level)
+        elif encoding == "zstd":
+            self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+        else:
+            raise ValueError(f"Unknown encoding '{encoding}'")
+
+    def chunk(self, data: bytes) -> bytes:
+        if self.encoding == "gzip":
+            return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+        if self.encoding == "br":
+            return self._compressor.process(data) + self._compressor.flush()
+        return self._compressor.compress(data) + self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        if self.encoding == "gzip":
+            return self._compressor.flush()
+        if self.encoding == "br":
+            return self._compressor.finish()
+        return self._compressor.flush()
+
+def route_profile(path: str) -> str:
+    """Longest COMPRESSION_ROUTES prefix matching path, else the default profile"""
+    matches = [prefix for prefix in settings.COMPRESSION_ROUTES if path.startswith(prefix)]
+    if not matches:
+        return settings.COMPRESSION_PROFILE
+    return settings.COMPRESSION_ROUTES[max(matches, key=len)]
+
+class CompressionMiddleware:
+    """Compresses response bodies with the best encoding the client accepts.
+
+    Bodies below COMPRESSION_MIN_SIZE, non-text types, byte-range capable
+    responses and bodies that are already encoded (e.g. precompressed
+    cache entries) pass through. Streamed bodies are compressed chunk by
+    chunk with a flush after each, so NDJSON exports stay incremental.
+    The negotiated encoding is published in request_encoding so the
+    response cache can serve a body it compressed once.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.encodings = available_encodings()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_headers = Headers(scope=scope)
+        encoding = negotiate(request_headers, self.encodings)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        profile = route_profile(scope["path"])
+        start: Optional[dict] = None
+        compressor: Optional[StreamCompressor] = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start, compressor, passthrough
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                if message["status"] == 304 and "etag" in headers:
+                    # Revalidated a compressed copy: answer with the ETag the client holds
+                    held = encoded_etag(headers["etag"], encoding)
+                    if held in request_headers.get("if-none-match", ""):
+                        headers["ETag"] = held
+                if not is_compressible(headers.get("content-type", "")):
+                    passthrough = True
+                else:
+                    headers.add_vary_header("Accept-Encoding")
+                    passthrough = (
+                        message["status"] != 200
+                        or "content-encoding" in headers
+                        or "content-range" in headers
+                        or headers.get("accept-ranges", "none") != "none"
+                    )
+                if passthrough:
+                    await send(message)
+                else:
+                    start = message
+                return
+
+            if passthrough or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if start is not None:
+                headers = MutableHeaders(scope=start)
+                if not more_body and len(body) < settings.COMPRESSION_MIN_SIZE:
+                    passthrough = True
+                    await send(start)
+                    await send(message)
+                    return
+                headers["Content-Encoding"] = encoding
+                if "etag" in headers:
+                    headers["ETag"] = encoded_etag(headers["etag"], encoding)
+                if more_body:
+                    del headers["Content-Length"]
+                    compressor = StreamCompressor(encoding, profile)
+                else:
+                    body = compress(body, encoding, profile)
+                    headers["Content-Length"] = str(len(body))
+                    await send(start)
+                    await send({"type": "http.response.body", "body": body})
+                    start = None
+                    passthrough = True
+                    return
+                await send(start)
+                start = None
+
+            data = compressor.chunk(body) if body else b""
+            if not more_body:
+                data += compressor.finish()
+            if data or not more_body:
+                await send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+        token = request_encoding.set(encoding)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            request_encoding.reset(token)
@@ -0,0 +1,161 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+from fastapi import Request, Response
+from starlette.datastructures import Headers, MutableHeaders
+from .config import settings
+
+def body_etag(body: bytes) -> str:
+    """Strong ETag from a hash of the serialized body"""
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+def version_etag(kind: str, resource_id: int, updated_at: Optional[datetime], weak: bool = False) -> str:
+    """ETag from a resource's id and updated_at, available before serializing"""
+    version = int(updated_at.timestamp() * 1_000_000) if updated_at else 0
+    etag = f'"{kind}-{resource_id}-{version}"'
+    return "W/" + etag if weak else etag
+
+def http_date(value: datetime) -> str:
+    # Naive datetimes are local time, as produced by datetime.now()
+    return format_datetime(value.astimezone(timezone.utc).replace(microsecond=0), usegmt=True)
+
+def last_modified_of(data) -> Optional[datetime]:
+    """Latest updated_at of a record or list of records, if they carry one"""
+    records = data if isinstance(data, list) else [data]
+    stamps = [r.get("updated_at") for r in records if isinstance(r, dict)]
+    stamps = [s for s in stamps if isinstance(s, datetime)]
+    return max(stamps) if stamps else None
+
+# Content codings that may be appended to an ETag ("abc" -> "abc-gzip")
+ETAG_ENCODINGS = ("gzip", "br", "zstd")
+
+def encoded_etag(etag: str, encoding: str) -> str:
+    """ETag of a compressed representation; differs from the identity one"""
+    return etag[:-1] + f'-{encoding}"' if etag.endswith('"') else etag
+
+def _opaque(etag: str) -> str:
+    # Weak comparison, and any encoding of a representation matches the others
+    etag = etag.strip()
+    if etag.startswith("W/"):
+        etag = etag[2:]
+    for encoding in ETAG_ENCODINGS:
+        if etag.endswith(f'-{encoding}"'):
+            return etag[:-len(encoding) - 2] + '"'
+    return etag
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    opaque = _opaque(etag)
+    return any(_opaque(candidate) == opaque for candidate in if_none_match.split(","))
+
+def is_not_modified(request_headers: Headers, etag: Optional[str], last_modified: Optional[str]) -> bool:
+    """Evaluate If-None-Match, falling back to If-Modified-Since"""
+    if_none_match = request_headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag is not None and _etag_matches(if_none_match, etag)
+
+    if_modified_since = request_headers.get("if-modified-since")
+    if if_modified_since and last_modified:
+        try:
+            return parsedate_to_datetime(last_modified) <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+    return False
+
+def cache_control_for(request_headers: Headers) -> str:
+    if "authorization" in request_headers:
+        return settings.CACHE_CONTROL_PRIVATE
+    return settings.CACHE_CONTROL
+
+def check_not_modified(
+    request: Request,
+    response: Response,
+    etag: str,
+    last_modified: Optional[datetime] = None
+) -> Optional[Response]:
+    """Set validators on the response; return a 304 if the client's copy is current.
+
+    Lets a handler answer a conditional GET before serializing anything.
+    """
+    response.headers["ETag"] = etag
+    lm = http_date(last_modified) if last_modified else None
+    if lm:
+        response.headers["Last-Modified"] = lm
+
+    if not settings.CONDITIONAL_GET or not is_not_modified(request.headers, etag, lm):
+        return None
+
+    headers = {"ETag": etag, "Cache-Control": cache_control_for(request.headers)}
+    if lm:
+        headers["Last-Modified"] = lm
+    return Response(status_code=304, headers=headers)
+
+# Headers that describe the body and must not be sent with a 304
+BODY_HEADERS = {b"content-length", b"content-type", b"content-encoding"}
+
+class ConditionalGetMiddleware:
+    """Adds ETag and Cache-Control to GET responses and answers 304 when possible.
+
+    Responses that already carry an ETag (cached bodies, per-resource
+    validators) are checked without touching the body. Otherwise
+    single-chunk bodies are hashed into a strong ETag; streamed bodies
+    pass through untouched.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD"):
+            await self.app(scope, receive, send)
+            return
+
+        request_headers = Headers(scope=scope)
+        start: Optional[dict] = None
+        finished = False
+
+        async def send_wrapper(message):
+            nonlocal start, finished
+            if finished:
+                # 304 already sent; drop the rest of the body
+                return
+
+            if message["type"] == "http.response.start":
+                if message["status"] != 200:
+                    await send(message)
+                    return
+                headers = MutableHeaders(scope=message)
+                if "cache-control" not in headers:
+                    headers["Cache-Control"] = cache_control_for(request_headers)
+                start = message
+                return
+
+            if start is None:
+                await send(message)
+                return
+
+            headers = MutableHeaders(scope=start)
+            etag = headers.get("etag")
+            if etag is None:
+                if message.get("more_body", False):
+                    # Streaming response: nothing to hash up front
+                    await send(start)
+                    start = None
+                    await send(message)
+                    return
+                etag = headers["ETag"] = body_etag(message.get("body", b""))
+
+            if is_not_modified(request_headers, etag, headers.get("last-modified")):
+                start["status"] = 304
+                start["headers"] = [(k, v) for k, v in start["headers"] if k.lower() not in BODY_HEADERS]
+                await send(start)
+                await send({"type": "http.response.body", "body": b""})
+                finished = True
+            else:
+                await send(start)
+                await send(message)
+            start = None
+
+        await self.app(scope, receive, send_wrapper)
@@ -16,9 +16,65 @@ class Settings(BaseSettings):
     SECRET_KEY: str = "your-super-secret-key-change-this-in-production"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    AUTH_CACHE_SIZE: int = 10000  # verified tokens kept per worker, 0 disables
+    AUTH_CACHE_TTL: int = 300  # seconds, bounds staleness across workers
     
-    # Database (Optional - for future use)
+    # Logout revocation list: "memory" (per worker) or "redis" (shared, uses REDIS_URL)
+    REVOCATION_BACKEND: str = "memory"
+    REVOCATION_BLOOM_CAPACITY: int = 100000
+    REVOCATION_BLOOM_ERROR_RATE: float = 0.001
+    
+    # Password hashing: "bcrypt" or "argon2"; hashes made with other settings are upgraded on login
+    PASSWORD_SCHEME: str = "bcrypt"
+    BCRYPT_ROUNDS: int = 12
+    ARGON2_TIME_COST: int = 3
+    ARGON2_MEMORY_COST: int = 65536  # KiB
+    ARGON2_PARALLELISM: int = 4
+    PASSWORD_HASH_WORKERS: int = 2  # hashing processes, 0 uses threads
+    # Accept (and hash on login) passwords stored as plaintext; only while migrating old rows
+    LEGACY_PLAINTEXT_PASSWORDS: bool = False
+    
+    # Database (Optional - in-memory stores are used when unset)
     DATABASE_URL: Optional[str] = None
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: int = 30  # seconds
+    DB_POOL_RECYCLE: int = 1800  # seconds
+    DB_ECHO: bool = False
+    DB_CREATE_TABLES: bool = True  # create and seed missing tables on startup
+    
+    # View/like/share counters are buffered and flushed to the database in batches
+    BUFFER_COUNTERS: bool = True
+    COUNTER_FLUSH_INTERVAL: float = 5.0  # seconds
+    
+    # Response cache for read endpoints: "memory", "redis" or "none"
+    CACHE_BACKEND: str = "memory"
+    CACHE_TTL: int = 60  # seconds
+    CACHE_MAX_ENTRIES: int = 1000
+    REDIS_URL: str = "redis://localhost:6379"
+    
+    # HTTP caching: ETag / Last-Modified revalidation and Cache-Control for GET responses
+    CONDITIONAL_GET: bool = True
+    CACHE_CONTROL: str = "public, max-age=0, must-revalidate"
+    CACHE_CONTROL_PRIVATE: str = "private, no-cache"  # requests with an Authorization header
+    
+    # Response compression: encodings in server preference order (br/zstd need
+    # the brotli/zstandard packages), profiles "fast", "default" or "high"
+    COMPRESSION: bool = True
+    COMPRESSION_MIN_SIZE: int = 1024  # bytes
+    COMPRESSION_ENCODINGS: list = ["br", "zstd", "gzip"]
+    COMPRESSION_PROFILE: str = "default"
+    COMPRESSION_CACHED_PROFILE: str = "high"  # cached bodies are compressed once
+    COMPRESSION_ROUTES: dict = {"/api/export": "fast", "/api/posts/bulk": "fast", "/api/comments/bulk": "fast"}
+    
+    # orjson responses; routes skip re-validating repository records against
+    # their response_model and only copy the model's fields
+    FAST_JSON: bool = False
+    
+    # Bulk export: rows fetched per keyset page while streaming
+    EXPORT_BATCH_SIZE: int = 500
+    # Bulk import: NDJSON rows validated and upserted per batch
+    IMPORT_BATCH_SIZE: int = 1000
     
     # File Upload
     UPLOAD_DIR: str = "uploads"
@@ -26,10 +82,57 @@ class Settings(BaseSettings):
     ALLOWED_IMAGE_TYPES: list = ["jpg", "jpeg", "png", "gif", "webp"]
     ALLOWED_VIDEO_TYPES: list = ["mp4", "avi", "mov", "wmv", "flv"]
     ALLOWED_AUDIO_TYPES: list = ["mp3", "wav", "ogg", "m4a"]
+    MEDIA_WORKERS: int = 2  # image processing processes, 0 uses threads
+    IMAGE_THUMBNAIL_SIZE: int = 320  # px, longest side
+    IMAGE_WEBP_QUALITY: int = 80
+    # /uploads caching: content-hashed files never change under their URL
+    MEDIA_IMMUTABLE_CACHE_CONTROL: str = "public, max-age=31536000, immutable"
+    MEDIA_CACHE_CONTROL: str = "public, max-age=3600"
     
     # AI Features (Optional)
     OPENAI_API_KEY: Optional[str] = None
-    ENABLE_AI_FEATURES: bool = False
+    ENABLE_AI_FEATURES: bool = False  # required for AI_PROVIDER=openai; mock and fake always run
+    # Provider: "mock" (canned answers), "openai" (any OpenAI-compatible API at
+    # AI_BASE_URL) or "fake" (the local stand-in in app/core/ai_fake.py)
+    AI_PROVIDER: str = "mock"
+    AI_BASE_URL: str = "https://api.openai.com/v1"
+    AI_CHAT_MODEL: str = "gpt-4o-mini"
+    AI_IMAGE_MODEL: str = "dall-e-3"
+    AI_TRANSCRIBE_MODEL: str = "whisper-1"
+    AI_TTS_MODEL: str = "tts-1"
+    AI_TTS_VOICE: str = "alloy"
+    AI_TIMEOUT: float = 60.0  # seconds per provider call
+    AI_CONNECT_TIMEOUT: float = 5.0
+    AI_MAX_CONNECTIONS: int = 20  # sockets to the provider, shared by all features
+    AI_MAX_KEEPALIVE_CONNECTIONS: int = 10
+    AI_MAX_RETRIES: int = 3
+    AI_RETRY_BASE_DELAY: float = 0.5  # seconds, doubled per attempt with full jitter
+    AI_RETRY_MAX_DELAY: float = 8.0
+    # Concurrent provider calls per feature; callers wait up to AI_QUEUE_TIMEOUT for a slot
+    AI_CONCURRENCY: dict = {"image_generation": 2, "speech_to_text": 2, "text_to_speech": 4}
+    AI_DEFAULT_CONCURRENCY: int = 8
+    AI_QUEUE_TIMEOUT: float = 10.0  # seconds, then 503
+    AI_MAX_INPUT_CHARS: int = 4000  # longer texts are sent in chunks split at paragraphs/sentences
+    AI_MAX_TEXT_CHARS: int = 40000  # per translate/grammar-check text, sent in AI_MAX_INPUT_CHARS chunks
+    AI_BATCH_MAX_ITEMS: int = 200
+    AI_BATCH_MAX_CHARS: int = 200000  # input characters per /ai/batch request
+    AI_BATCH_CONCURRENCY: int = 8  # provider calls in flight per /ai/batch request
+    # Result cache for deterministic features, keyed by normalized input and
+    # model; features without a TTL (generated media) are not cached
+    AI_CACHE: bool = True
+    AI_CACHE_MAX_ENTRIES: int = 5000  # memory tier
+    AI_CACHE_PATH: str = "ai_cache.db"  # SQLite tier (git-ignored), empty to keep results in memory only
+    AI_CACHE_TTLS: dict = {"translation": 30 * 86400, "grammar_check": 30 * 86400, "content_generation": 86400}
+    AI_COST_PER_1K_TOKENS: float = 0.0006  # for usage accounting and the cost-saved estimate
+    AI_COST_PER_CALL: dict = {"image_generation": 0.04}  # flat price per call, on top of tokens
+    # Usage accounting: every call is aggregated in memory and written to
+    # ai_interactions in batches every AI_USAGE_FLUSH_INTERVAL seconds
+    AI_USAGE_FLUSH_INTERVAL: float = 5.0
+    AI_USAGE_BATCH_SIZE: int = 500  # rows per INSERT
+    AI_USAGE_BUFFER_SIZE: int = 50000  # unflushed calls kept per worker, oldest dropped beyond
+    AI_FAKE_LATENCY: float = 0.05  # seconds added by the fake provider
+    AI_FAKE_TOKEN_INTERVAL: float = 0.01  # seconds between the fake provider's streamed words
+    AI_FAKE_ERROR_RATE: float = 0.0  # share of fake provider calls that fail
     
     # CORS
     ALLOWED_ORIGINS: list = [
@@ -51,3 +154,4 @@ os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
 os.makedirs(f"{settings.UPLOAD_DIR}/images", exist_ok=True)
 os.makedirs(f"{settings.UPLOAD_DIR}/videos", exist_ok=True)
 os.makedirs(f"{settings.UPLOAD_DIR}/audio", exist_ok=True)
+os.makedirs(f"{settings.UPLOAD_DIR}/tmp", exist_ok=True)
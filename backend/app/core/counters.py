@@ -0,0 +1,114 @@
+import asyncio
+import logging
+import threading
+from collections import defaultdict
+from typing import Awaitable, Callable, Dict, Optional
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+# field -> {entity_id: delta}
+Deltas = Dict[str, Dict[int, int]]
+
+class CounterBuffer:
+    """Write-behind buffer for hot counters (views, likes, shares).
+
+    Increments are summed in memory and written out in one batch every
+    flush interval, so a popular post costs one row update per flush
+    instead of one per hit. Each worker process has its own buffer;
+    reads add the worker's pending deltas to the stored value.
+    """
+
+    def __init__(self, flush_interval: float = 5.0):
+        self.flush_interval = flush_interval
+        self._pending: Deltas = defaultdict(lambda: defaultdict(int))
+        self._in_flight: Deltas = {}
+        self._lock = threading.Lock()
+        self._sink: Optional[Callable[[Deltas], Awaitable[None]]] = None
+        self._task: Optional[asyncio.Task] = None
+        self._flushing: Optional[asyncio.Future] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self._sink is not None
+
+    def add(self, entity_id: int, field: str, amount: int = 1):
+        with self._lock:
+            self._pending[field][entity_id] += amount
+
+    def pending(self, entity_id: int, field: str) -> int:
+        """Deltas not yet visible in storage, including a flush in progress"""
+        total = 0
+        for deltas in (self._pending, self._in_flight):
+            counts = deltas.get(field)
+            if counts:
+                total += counts.get(entity_id, 0)
+        return total
+
+    def overlay(self, record: dict) -> dict:
+        """Add pending deltas to a stored record's counters (read-your-writes)"""
+        for field in set(self._pending) | set(self._in_flight):
+            delta = self.pending(record["id"], field)
+            if delta:
+                record[field] = record.get(field, 0) + delta
+        return record
+
+    async def flush(self):
+        """Write all pending deltas through the sink in one batch"""
+        if self._sink is None:
+            return
+
+        with self._lock:
+            deltas, self._pending = self._pending, defaultdict(lambda: defaultdict(int))
+        if not deltas:
+            return
+
+        self._in_flight = deltas
+        try:
+            await self._sink(deltas)
+        except BaseException as e:
+            if isinstance(e, Exception):
+                logger.exception("Counter flush failed, keeping deltas for the next attempt")
+            # Also when cancelled, so the deltas are not lost
+            with self._lock:
+                for field, counts in deltas.items():
+                    for entity_id, delta in counts.items():
+                        self._pending[field][entity_id] += delta
+            if not isinstance(e, Exception):
+                raise
+        finally:
+            self._in_flight = {}
+
+    async def start(self, sink: Callable[[Deltas], Awaitable[None]]):
+        self._sink = sink
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._flushing is not None:
+            # A periodic flush the cancellation left running in the background
+            await self._flushing
+            self._flushing = None
+        await self.flush()
+        self._sink = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            # Shielded so stopping the loop doesn't interrupt a write half-way
+            self._flushing = asyncio.ensure_future(self.flush())
+            try:
+                await asyncio.shield(self._flushing)
+            finally:
+                if self._flushing.done():
+                    self._flushing = None
+
+# Shared buffer for this worker process
+counter_buffer = CounterBuffer(settings.COUNTER_FLUSH_INTERVAL)
@@ -0,0 +1,100 @@
+from typing import AsyncIterator, Dict, List, Optional
+from sqlalchemy import func, select
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.pool import AsyncAdaptedQueuePool, StaticPool
+from .config import settings
+
+# Sync drivers from env.example mapped to their asyncio counterparts
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+    "mysql": "mysql+aiomysql",
+    "mysql+pymysql": "mysql+aiomysql",
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+}
+
+class Base(DeclarativeBase):
+    def to_dict(self) -> dict:
+        """Return the row as the plain dict shape the routers work with"""
+        return {attr.key: getattr(self, attr.key) for attr in self.__mapper__.column_attrs}
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        keys = {attr.key for attr in cls.__mapper__.column_attrs}
+        return cls(**{key: value for key, value in data.items() if key in keys})
+
+engine: Optional[AsyncEngine] = None
+SessionLocal: Optional[async_sessionmaker] = None
+
+def get_async_url(url: str) -> str:
+    """Swap a sync driver (e.g. mysql+pymysql) for its async equivalent"""
+    parsed = make_url(url)
+    driver = ASYNC_DRIVERS.get(parsed.drivername)
+    if driver:
+        parsed = parsed.set(drivername=driver)
+    return parsed.render_as_string(hide_password=False)
+
+def init_engine(url: Optional[str] = None) -> Optional[AsyncEngine]:
+    """Create the shared engine and session factory"""
+    global engine, SessionLocal
+
+    url = url or settings.DATABASE_URL
+    if not url:
+        return None
+
+    async_url = get_async_url(url)
+    parsed = make_url(async_url)
+    options = {"echo": settings.DB_ECHO}
+    if parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:"):
+        # A single shared connection keeps the in-memory database alive
+        options.update(poolclass=StaticPool, connect_args={"check_same_thread": False})
+    else:
+        options.update(
+            poolclass=AsyncAdaptedQueuePool,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+            pool_pre_ping=True,
+        )
+
+    engine = create_async_engine(async_url, **options)
+    SessionLocal = async_sessionmaker(engine, expire_on_commit=False)
+    return engine
+
+async def dispose_engine():
+    global engine, SessionLocal
+    if engine is not None:
+        await engine.dispose()
+    engine = None
+    SessionLocal = None
+
+async def get_db() -> AsyncIterator[Optional[AsyncSession]]:
+    """FastAPI dependency yielding a session, or None when no database is configured"""
+    if SessionLocal is None:
+        yield None
+        return
+
+    async with SessionLocal() as session:
+        yield session
+
+async def create_tables():
+    # Import models so they register on Base.metadata
+    from .. import models  # noqa: F401
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+async def seed_database(seed: Dict[type, List[dict]]):
+    """Copy the built-in mock data into empty tables"""
+    async with SessionLocal() as session:
+        for model, rows in seed.items():
+            count = await session.scalar(select(func.count()).select_from(model))
+            if count:
+                continue
+            session.add_all(model.from_dict(row) for row in rows)
+            await session.flush()
+        await session.commit()
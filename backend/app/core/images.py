@@ -0,0 +1,79 @@
+import asyncio
+import logging
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor
+from functools import partial
+from typing import Awaitable, Callable, Optional, Set
+from PIL import Image, ImageOps
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+# Derived files live next to the originals, named after the content hash
+DERIVED_DIR = "derived"
+
+def derive_image(upload_dir: str, path: str, thumbnail_size: int, quality: int) -> dict:
+    """Probe an image and write its WebP and thumbnail variants.
+
+    Runs in a worker process; returns the record changes (dimensions and
+    variant paths relative to upload_dir).
+    """
+    directory, name = os.path.split(path)
+    stem = os.path.splitext(name)[0]
+    derived = os.path.join(directory, DERIVED_DIR)
+    os.makedirs(os.path.join(upload_dir, derived), exist_ok=True)
+
+    with Image.open(os.path.join(upload_dir, path)) as image:
+        width, height = image.size
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "transparency" in image.info or "A" in image.mode else "RGB")
+
+        variants = {
+            "webp": f"{derived}/{stem}.webp",
+            "thumbnail": f"{derived}/{stem}_{thumbnail_size}.webp",
+        }
+        image.save(os.path.join(upload_dir, variants["webp"]), "WEBP", quality=quality, method=4)
+        image.thumbnail((thumbnail_size, thumbnail_size))
+        image.save(os.path.join(upload_dir, variants["thumbnail"]), "WEBP", quality=quality, method=4)
+
+    return {"width": width, "height": height, "variants": variants}
+
+_executor: Optional[Executor] = None
+_tasks: Set[asyncio.Task] = set()
+
+def _get_executor() -> Optional[Executor]:
+    global _executor
+    if _executor is None and settings.MEDIA_WORKERS > 0:
+        _executor = ProcessPoolExecutor(max_workers=settings.MEDIA_WORKERS)
+    return _executor
+
+async def _process_image(path: str, on_done: Callable[[dict], Awaitable[None]]):
+    loop = asyncio.get_running_loop()
+    try:
+        changes = await loop.run_in_executor(_get_executor(), partial(
+            derive_image, settings.UPLOAD_DIR, path, settings.IMAGE_THUMBNAIL_SIZE, settings.IMAGE_WEBP_QUALITY
+        ))
+    except Exception:
+        logger.exception("Could not derive image variants for %s", path)
+        changes = {"variants": {}}
+    await on_done(changes)
+
+def schedule_image(path: str, on_done: Callable[[dict], Awaitable[None]]):
+    """Generate an image's variants in the background, off the request path.
+
+    on_done receives the record changes once the worker finishes (an empty
+    variants dict if the image could not be decoded).
+    """
+    task = asyncio.create_task(_process_image(path, on_done))
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+
+async def shutdown():
+    """Finish queued derivative jobs, then stop the worker processes"""
+    global _executor
+    if _tasks:
+        await asyncio.gather(*_tasks, return_exceptions=True)
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
@@ -0,0 +1,54 @@
+import base64
+import json
+from datetime import datetime
+from typing import AsyncIterator, Awaitable, Callable, List, Optional, Tuple
+from fastapi import HTTPException, Response
+
+# Response header carrying the cursor for the next page
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def encode_cursor(record: dict, field: str = "created_at") -> str:
+    """Build an opaque cursor from a record's (timestamp, id) sort key"""
+    raw = json.dumps([record[field].isoformat(), record["id"]], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Tuple[datetime, int]]:
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        timestamp, record_id = json.loads(raw)
+        return datetime.fromisoformat(timestamp), int(record_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def set_next_cursor(response: Response, page: List[dict], limit: int, field: str = "created_at"):
+    """Advertise the next page's cursor when this page came back full"""
+    if len(page) == limit:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(page[-1], field)
+
+async def iterate_pages(
+    fetch: Callable[..., Awaitable[List[dict]]],
+    batch_size: int = 500,
+    keyset: bool = True,
+    **filters
+) -> AsyncIterator[List[dict]]:
+    """Yield every record of a repository listing, one batch at a time.
+
+    Pages by (created_at, id) keyset so each batch is an index range scan
+    and only one batch is held in memory; keyset=False falls back to skip
+    for listings without a stable order (e.g. ranked search).
+    """
+    after = None
+    skip = 0
+    while True:
+        if keyset:
+            page = await fetch(after=after, limit=batch_size, **filters)
+        else:
+            page = await fetch(skip=skip, limit=batch_size, **filters)
+        if page:
+            yield page
+        if len(page) < batch_size:
+            return
+        after = (page[-1]["created_at"], page[-1]["id"])
+        skip += len(page)
@@ -0,0 +1,83 @@
+import asyncio
+import hmac
+import secrets
+from concurrent.futures import Executor, ProcessPoolExecutor
+from functools import partial
+from typing import Optional, Tuple
+from passlib.context import CryptContext
+from .config import settings
+
+def build_context() -> CryptContext:
+    """Hashing policy from settings; hashes made under other parameters
+    (or the non-default scheme) are flagged for rehash on the next login"""
+    schemes = [settings.PASSWORD_SCHEME] + [s for s in ("bcrypt", "argon2") if s != settings.PASSWORD_SCHEME]
+    return CryptContext(
+        schemes=schemes,
+        deprecated="auto",
+        bcrypt__rounds=settings.BCRYPT_ROUNDS,
+        bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+        argon2__time_cost=settings.ARGON2_TIME_COST,
+        argon2__memory_cost=settings.ARGON2_MEMORY_COST,
+        argon2__parallelism=settings.ARGON2_PARALLELISM,
+    )
+
+# Built in each worker process on import
+pwd_context = build_context()
+
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+def is_hashed(stored: str) -> bool:
+    return pwd_context.identify(stored, required=False) is not None
+
+def _verify(password: str, stored: str) -> Tuple[bool, Optional[str]]:
+    if not is_hashed(stored):
+        if not settings.LEGACY_PLAINTEXT_PASSWORDS:
+            return False, None
+        # Legacy plaintext from before hashing, accepted while migrating; upgraded on login
+        if hmac.compare_digest(password.encode(), stored.encode()):
+            return True, pwd_context.hash(password)
+        return False, None
+    return pwd_context.verify_and_update(password, stored)
+
+_executor: Optional[Executor] = None
+
+def _get_executor() -> Optional[Executor]:
+    global _executor
+    if _executor is None and settings.PASSWORD_HASH_WORKERS > 0:
+        _executor = ProcessPoolExecutor(max_workers=settings.PASSWORD_HASH_WORKERS)
+    return _executor
+
+async def _run(func, *args):
+    # Without workers, the default thread pool still keeps the loop free
+    # (bcrypt releases the GIL while hashing)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor(), partial(func, *args))
+
+async def hash_password(password: str) -> str:
+    """Hash a password off the event loop"""
+    return await _run(_hash, password)
+
+async def verify_password(password: str, stored: str) -> Tuple[bool, Optional[str]]:
+    """Check a password off the event loop.
+
+    Returns (valid, new_hash); new_hash is set when the stored hash uses
+    outdated parameters (or is legacy plaintext, with
+    LEGACY_PLAINTEXT_PASSWORDS on) and should be replaced.
+    """
+    return await _run(_verify, password, stored)
+
+_dummy_hash: Optional[str] = None
+
+async def dummy_hash() -> str:
+    """Hash of a random password, checked for unknown accounts so they answer as slowly as known ones"""
+    global _dummy_hash
+    if _dummy_hash is None:
+        _dummy_hash = await hash_password(secrets.token_urlsafe(16))
+    return _dummy_hash
+
+def shutdown():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
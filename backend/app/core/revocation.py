@@ -0,0 +1,227 @@
+import asyncio
+import hashlib
+import logging
+import math
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings (no false negatives)"""
+
+    def __init__(self, capacity: int = 100_000, error_rate: float = 0.001):
+        self.capacity = capacity
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _hashes(self, item: str):
+        # Double hashing: k positions from one 128-bit digest
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        return int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+
+    def add(self, item: str):
+        h1, h2 = self._hashes(item)
+        bits, size = self.bits, self.size
+        for i in range(self.hashes):
+            pos = (h1 + i * h2) % size
+            bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        if not self.count:
+            return False
+        h1, h2 = self._hashes(item)
+        bits, size = self.bits, self.size
+        for i in range(self.hashes):
+            pos = (h1 + i * h2) % size
+            if not bits[pos >> 3] & (1 << (pos & 7)):
+                return False
+        return True
+
+class MemoryRevocationBackend:
+    """Revoked jti -> expiry, for a single worker process"""
+
+    def __init__(self):
+        self._revoked: Dict[str, float] = {}
+
+    async def add(self, jti: str, expires_at: float):
+        self._revoked[jti] = expires_at
+
+    async def contains(self, jti: str) -> bool:
+        expires_at = self._revoked.get(jti)
+        if expires_at is None:
+            return False
+        if expires_at <= time.time():
+            del self._revoked[jti]
+            return False
+        return True
+
+    async def active(self) -> List[str]:
+        """Drop expired entries and return the rest"""
+        now = time.time()
+        self._revoked = {jti: exp for jti, exp in self._revoked.items() if exp > now}
+        return list(self._revoked)
+
+class RedisRevocationBackend:
+    """Revocations shared by all workers through any Redis-protocol server.
+
+    Each revoked jti is a key expiring with the token; revocations are
+    also published so every worker can add them to its local filter.
+    """
+
+    def __init__(self, client, prefix: str = "blog:revoked:", channel: str = "blog:revocations"):
+        self.client = client
+        self.prefix = prefix
+        self.channel = channel
+
+    async def add(self, jti: str, expires_at: float):
+        ttl = max(1, math.ceil(expires_at - time.time()))
+        await self.client.set(self.prefix + jti, 1, ex=ttl)
+        await self.client.publish(self.channel, jti)
+
+    async def contains(self, jti: str) -> bool:
+        return bool(await self.client.exists(self.prefix + jti))
+
+    async def active(self) -> List[str]:
+        return [
+            key[len(self.prefix):].decode() if isinstance(key, bytes) else key[len(self.prefix):]
+            async for key in self.client.scan_iter(match=self.prefix + "*")
+        ]
+
+    async def listen(self, on_revoked: Callable[[str], None], on_subscribed: Callable[[], Awaitable[None]]):
+        """Follow published revocations until the connection fails.
+
+        on_subscribed runs once the subscription is live, so anything it
+        reads from Redis is complete: later revocations arrive as messages.
+        """
+        pubsub = self.client.pubsub()
+        try:
+            await pubsub.subscribe(self.channel)
+            confirmation = await pubsub.get_message(timeout=5.0)
+            if confirmation is None or confirmation["type"] != "subscribe":
+                raise ConnectionError("Subscription to the revocation channel was not confirmed")
+            await on_subscribed()
+            async for message in pubsub.listen():
+                if message["type"] == "message":
+                    data = message["data"]
+                    on_revoked(data.decode() if isinstance(data, bytes) else data)
+        finally:
+            await pubsub.aclose()
+
+class RevocationList:
+    """Revoked token ids, checked on every authenticated request.
+
+    A Bloom filter in front answers the common not-revoked case in memory
+    without touching the backend; only filter hits (revoked tokens and
+    rare false positives) pay for the exact lookup. Once the filter fills
+    up it is rebuilt from the backend's live entries, so expired
+    revocations stop costing lookups.
+
+    With a shared backend the filter is only trusted while this worker is
+    subscribed to other workers' revocations. When the subscription drops,
+    every check goes to the backend until it reconnects and the filter is
+    rebuilt.
+    """
+
+    # Seconds between reconnect attempts, doubling up to the maximum
+    RECONNECT_DELAY = 0.5
+    MAX_RECONNECT_DELAY = 30.0
+
+    def __init__(self, backend, capacity: int = 100_000, error_rate: float = 0.001):
+        self.backend = backend
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self._bloom = BloomFilter(capacity, error_rate)
+        self._rebuilding: Optional[List[str]] = None
+        self._task: Optional[asyncio.Task] = None
+        # Whether the filter holds every live revocation
+        self._synced = False
+
+    @property
+    def synced(self) -> bool:
+        return self._synced
+
+    async def is_revoked(self, jti: str) -> bool:
+        if self._synced and jti not in self._bloom:
+            return False
+        return await self.backend.contains(jti)
+
+    async def revoke(self, jti: str, expires_at: float):
+        self._bloom_add(jti)
+        await self.backend.add(jti, expires_at)
+        if self._bloom.count > self._bloom.capacity:
+            await self._rebuild()
+
+    async def start(self):
+        """Load live revocations and follow other workers' revocations"""
+        if not hasattr(self.backend, "listen"):
+            await self._rebuild()
+            self._synced = True
+        elif self._task is None:
+            self._task = asyncio.create_task(self._follow())
+
+    async def _on_subscribed(self):
+        await self._rebuild()
+        self._synced = True
+        self._delay = self.RECONNECT_DELAY
+
+    async def _follow(self):
+        """Keep the subscription up, rebuilding the filter on every reconnect"""
+        self._delay = self.RECONNECT_DELAY
+        while True:
+            try:
+                await self.backend.listen(self._bloom_add, self._on_subscribed)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Revocation subscription failed (%s), checking the backend until it is back", e)
+            self._synced = False
+            await asyncio.sleep(self._delay)
+            self._delay = min(self._delay * 2, self.MAX_RECONNECT_DELAY)
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._synced = False
+
+    def _bloom_add(self, jti: str):
+        self._bloom.add(jti)
+        if self._rebuilding is not None:
+            self._rebuilding.append(jti)
+
+    async def _rebuild(self):
+        # Revocations arriving while the backend is scanned go into both filters
+        self._rebuilding = []
+        try:
+            active = await self.backend.active()
+            # Leave headroom so a large revocation set doesn't rebuild on every logout
+            bloom = BloomFilter(max(self.capacity, 2 * len(active)), self.error_rate)
+            for jti in active:
+                bloom.add(jti)
+            for jti in self._rebuilding:
+                bloom.add(jti)
+            self._bloom = bloom
+        finally:
+            self._rebuilding = None
+
+def create_backend():
+    if settings.REVOCATION_BACKEND == "redis":
+        import redis.asyncio as redis
+        return RedisRevocationBackend(redis.from_url(settings.REDIS_URL))
+    return MemoryRevocationBackend()
+
+# Shared revocation list for this worker process
+revocation_list = RevocationList(
+    create_backend(),
+    settings.REVOCATION_BLOOM_CAPACITY,
+    settings.REVOCATION_BLOOM_ERROR_RATE
+)
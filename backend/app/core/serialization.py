@@ -0,0 +1,114 @@
+from typing import Any, Callable, Dict, Optional, Union, get_args, get_origin
+from fastapi.routing import APIRoute
+from pydantic import BaseModel
+from .config import settings
+
+Projector = Callable[[Any], Any]
+
+def _identity(value: Any) -> Any:
+    return value
+
+def _is_plain(model: type) -> bool:
+    """True when dumping the model is just copying its fields"""
+    decorators = model.__pydantic_decorators__
+    return not (
+        decorators.validators or decorators.field_validators or decorators.root_validators
+        or decorators.model_validators or decorators.field_serializers
+        or decorators.model_serializers or decorators.computed_fields
+        or any(field.alias or field.serialization_alias for field in model.model_fields.values())
+    )
+
+def build_projector(annotation: Any, _seen: Optional[Dict[type, Projector]] = None) -> Optional[Projector]:
+    """A function copying a trusted value into the shape of annotation.
+
+    Models become dicts holding exactly their fields (defaults filled in,
+    extra keys such as password hashes dropped); lists and optionals are
+    walked; anything else is passed through for orjson to encode. Returns
+    None when a model needs real validation (validators, computed fields,
+    aliases), so the route keeps the regular path.
+    """
+    seen = {} if _seen is None else _seen
+    origin, args = get_origin(annotation), get_args(annotation)
+
+    if origin is Union:
+        projectors = [build_projector(arg, seen) for arg in args if arg is not type(None)]
+        if None in projectors:
+            return None
+        if all(project is _identity for project in projectors):
+            return _identity
+        if len(projectors) != 1:
+            return None
+        project = projectors[0]
+        return lambda value: None if value is None else project(value)
+
+    if origin in (list, tuple, set, frozenset):
+        if not args:
+            return list
+        project = build_projector(args[0], seen)
+        if project is None:
+            return None
+        return lambda value: [project(item) for item in value]
+
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        if annotation in seen:
+            # Self-referencing model (e.g. comment replies); resolved lazily
+            return lambda value: seen[annotation](value)
+        if not _is_plain(annotation):
+            return None
+        seen[annotation] = _identity
+        fields = []
+        for name, field in annotation.model_fields.items():
+            project = build_projector(field.annotation, seen)
+            if project is None:
+                return None
+            default = field.get_default(call_default_factory=True) if not field.is_required() else None
+            fields.append((name, default, project))
+
+        def project_model(value):
+            if isinstance(value, BaseModel):
+                value = value.__dict__
+            return {name: project(value.get(name, default)) for name, default, project in fields}
+
+        seen[annotation] = project_model
+        return project_model
+
+    return _identity
+
+class TrustedResponseField:
+    """Response field that projects instead of validating; see TrustedRoute"""
+
+    def __init__(self, field, project: Projector):
+        self.field = field
+        self.project = project
+
+    def __getattr__(self, name):
+        return getattr(self.field, name)
+
+    def validate(self, value, values=None, loc=()):
+        return value, None
+
+    def serialize(self, value, **kwargs):
+        return self.project(value)
+
+class TrustedRoute(APIRoute):
+    """APIRoute that skips response_model validation when FAST_JSON is on.
+
+    Repository records are already valid, so re-validating them on every
+    response only costs CPU. The record is projected onto the model's
+    fields and encoded by ORJSONResponse. Routes whose model has
+    validators, computed fields or aliases, or that use response_model
+    include/exclude options, keep the regular validation.
+    """
+
+    def get_route_handler(self):
+        if settings.FAST_JSON and self.response_field is not None and not self._filters_response():
+            project = build_projector(self.response_model)
+            if project is not None:
+                self.secure_cloned_response_field = TrustedResponseField(self.secure_cloned_response_field, project)
+        return super().get_route_handler()
+
+    def _filters_response(self) -> bool:
+        return bool(
+            self.response_model_include or self.response_model_exclude or self.response_model_exclude_unset
+            or self.response_model_exclude_defaults or self.response_model_exclude_none
+        )
@@ -0,0 +1,177 @@
+import os
+import re
+import stat
+from email.utils import parsedate
+from mimetypes import guess_type
+from typing import List, Optional, Tuple
+import anyio
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from .compression import accepted_codings
+from .config import settings
+
+# Uploads are stored as <sha256>.<ext> and variants as <sha256>_<size>.<ext>
+CONTENT_HASHED = re.compile(r"^[0-9a-f]{64}(_\d+)?\.")
+
+# Precompressed siblings, in order of preference
+PRECOMPRESSED = (("br", ".br"), ("gzip", ".gz"))
+
+ZEROCOPY = "http.response.zerocopysend"
+PATHSEND = "http.response.pathsend"
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Parse a single "bytes=" range into inclusive (start, end).
+
+    Returns None for headers to ignore (other units, multiple ranges,
+    malformed values); raises 416 when the range lies outside the file.
+    """
+    unit, _, spec = header.partition("=")
+    first, sep, last = spec.strip().partition("-")
+    if unit.strip().lower() != "bytes" or "," in spec or not sep:
+        return None
+    unsatisfiable = HTTPException(status_code=416, headers={"Content-Range": f"bytes */{size}"})
+    try:
+        if first:
+            start, end = int(first), int(last) if last else size - 1
+            if start >= size:
+                raise unsatisfiable
+            if start > end:
+                return None
+        else:
+            suffix = int(last)
+            if suffix == 0:
+                raise unsatisfiable
+            start, end = max(0, size - suffix), size - 1
+    except ValueError:
+        return None
+    return start, min(end, size - 1)
+
+def accepted_encodings(headers: Headers) -> List[str]:
+    """Precompressed encodings the client accepts, best first"""
+    codings = accepted_codings(headers)
+    wildcard = codings.get("*", 0.0)
+    return [encoding for encoding, _ in PRECOMPRESSED if codings.get(encoding, wildcard) > 0]
+
+class RangeFileResponse(FileResponse):
+    """FileResponse that can send one byte range, zero-copy where possible.
+
+    When the ASGI server offers the zero-copy send extension the file
+    descriptor is handed over and the kernel copies it to the socket
+    (sendfile); whole files may also go out via the path-send extension.
+    Otherwise the range is streamed in chunk_size reads, so a client never
+    costs more than one chunk of memory.
+    """
+
+    byte_range: Optional[Tuple[int, int]] = None
+
+    def set_range(self, start: int, end: int):
+        """Send only bytes start..end (inclusive) as 206 Partial Content"""
+        self.byte_range = (start, end)
+        self.status_code = 206
+        self.headers["content-range"] = f"bytes {start}-{end}/{self.stat_result.st_size}"
+        self.headers["content-length"] = str(end - start + 1)
+
+    async def __call__(self, scope, receive, send):
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        start, end = self.byte_range or (0, self.stat_result.st_size - 1)
+        count = end - start + 1
+        extensions = scope.get("extensions") or {}
+
+        if self.send_header_only or count <= 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        elif ZEROCOPY in extensions:
+            with open(self.path, "rb") as file:
+                await send({"type": ZEROCOPY, "file": file, "offset": start, "count": count, "more_body": False})
+        elif PATHSEND in extensions and self.byte_range is None:
+            await send({"type": PATHSEND, "path": os.path.abspath(self.path)})
+        else:
+            async with await anyio.open_file(self.path, mode="rb") as file:
+                await file.seek(start)
+                remaining = count
+                while remaining:
+                    chunk = await file.read(min(self.chunk_size, remaining))
+                    if not chunk:
+                        break
+                    remaining -= len(chunk)
+                    await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+                if remaining:
+                    # File shrank while streaming; end the response anyway
+                    await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+        if self.background is not None:
+            await self.background()
+
+class MediaFiles(StaticFiles):
+    """StaticFiles for uploads: byte ranges, precompressed siblings and cache policy.
+
+    Content-hashed files never change under their URL, so they are sent
+    with an immutable Cache-Control; anything else gets the shorter
+    MEDIA_CACHE_CONTROL. A request without a Range header is answered
+    with a .br or .gz sibling when one exists and the client accepts it.
+    Top-level directories in hidden (e.g. in-progress uploads) are 404.
+    """
+
+    def __init__(self, *args, hidden: Tuple[str, ...] = (), **kwargs):
+        super().__init__(*args, **kwargs)
+        self.hidden = hidden
+
+    async def get_response(self, path: str, scope) -> Response:
+        if path.split(os.sep, 1)[0] in self.hidden:
+            raise HTTPException(status_code=404)
+        request_headers = Headers(scope=scope)
+        if scope["method"] in ("GET", "HEAD") and "range" not in request_headers:
+            for encoding in accepted_encodings(request_headers):
+                suffix = dict(PRECOMPRESSED)[encoding]
+                full_path, stat_result = await anyio.to_thread.run_sync(self.lookup_path, path + suffix)
+                if stat_result is not None and stat.S_ISREG(stat_result.st_mode):
+                    return self.file_response(full_path, stat_result, scope, encoding=encoding)
+        return await super().get_response(path, scope)
+
+    def file_response(
+        self,
+        full_path,
+        stat_result,
+        scope,
+        status_code: int = 200,
+        encoding: Optional[str] = None
+    ) -> Response:
+        request_headers = Headers(scope=scope)
+        headers = {"Accept-Ranges": "bytes", "Vary": "Accept-Encoding"}
+        media_path = full_path
+        if encoding is not None:
+            media_path = full_path[:-len(dict(PRECOMPRESSED)[encoding])]
+            headers["Content-Encoding"] = encoding
+        if CONTENT_HASHED.match(os.path.basename(media_path)):
+            headers["Cache-Control"] = settings.MEDIA_IMMUTABLE_CACHE_CONTROL
+        else:
+            headers["Cache-Control"] = settings.MEDIA_CACHE_CONTROL
+
+        response = RangeFileResponse(
+            full_path,
+            status_code=status_code,
+            stat_result=stat_result,
+            method=scope["method"],
+            headers=headers,
+            media_type=guess_type(media_path)[0]
+        )
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+
+        if "range" in request_headers and status_code == 200 and self.range_applies(response.headers, request_headers):
+            byte_range = parse_range(request_headers["range"], stat_result.st_size)
+            if byte_range is not None:
+                response.set_range(*byte_range)
+        return response
+
+    @staticmethod
+    def range_applies(response_headers: Headers, request_headers: Headers) -> bool:
+        """If-Range: only honour the range while the client's copy is current"""
+        if_range = request_headers.get("if-range")
+        if if_range is None:
+            return True
+        since = parsedate(if_range)
+        if since is None:
+            return if_range.strip('"') == response_headers.get("etag", "").strip('"')
+        return since == parsedate(response_headers.get("last-modified", ""))
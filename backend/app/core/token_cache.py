@@ -0,0 +1,83 @@
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Dict, NamedTuple, Optional, Set
+from .config import settings
+
+class CachedPrincipal(NamedTuple):
+    claims: dict
+    user: dict
+    expires_at: float
+
+class TokenCache:
+    """Bounded LRU of verified access tokens -> (claims, user).
+
+    Skips the HMAC check and user lookup for tokens seen recently. Entries
+    live until the token's exp or the TTL, whichever comes first, and are
+    dropped whenever the user is updated, deactivated or deleted. Keys are
+    token digests, so raw tokens are never kept in memory. Each worker
+    process has its own cache; the TTL bounds how long another worker may
+    keep serving a principal after a change.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl: int = 300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[bytes, CachedPrincipal]" = OrderedDict()
+        self._by_user: Dict[int, Set[bytes]] = {}
+
+    @staticmethod
+    def digest(token: str) -> bytes:
+        return hashlib.blake2b(token.encode(), digest_size=20).digest()
+
+    def get(self, token: str) -> Optional[CachedPrincipal]:
+        key = self.digest(token)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= time.time():
+            self._drop(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def set(self, token: str, claims: dict, user: dict):
+        if self.max_entries <= 0:
+            return
+        expires_at = time.time() + self.ttl
+        if "exp" in claims:
+            expires_at = min(expires_at, float(claims["exp"]))
+
+        key = self.digest(token)
+        if key in self._entries:
+            self._drop(key)
+        self._entries[key] = CachedPrincipal(claims, user, expires_at)
+        self._by_user.setdefault(user["id"], set()).add(key)
+
+        while len(self._entries) > self.max_entries:
+            self._drop(next(iter(self._entries)))
+
+    def discard(self, token: str):
+        key = self.digest(token)
+        if key in self._entries:
+            self._drop(key)
+
+    def invalidate_user(self, user_id: int):
+        """Forget every cached token of a user"""
+        for key in list(self._by_user.get(user_id, ())):
+            self._drop(key)
+
+    def clear(self):
+        self._entries.clear()
+        self._by_user.clear()
+
+    def _drop(self, key: bytes):
+        entry = self._entries.pop(key)
+        keys = self._by_user.get(entry.user["id"])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_user[entry.user["id"]]
+
+# Shared cache for this worker process
+token_cache = TokenCache(settings.AUTH_CACHE_SIZE, settings.AUTH_CACHE_TTL)
@@ -0,0 +1,193 @@
+import hashlib
+import os
+import uuid
+from typing import Collection, Dict, List, NamedTuple, Optional, Tuple
+import aiofiles
+import aiofiles.os
+import multipart
+from fastapi import HTTPException, Request
+from multipart.exceptions import MultipartParseError
+from multipart.multipart import parse_options_header
+from .config import settings
+
+# Upload subdirectory per media type, as created in config
+MEDIA_DIRS = {"image": "images", "video": "videos", "audio": "audio"}
+
+# Room for multipart boundaries and part headers on top of the file itself
+MULTIPART_OVERHEAD = 64 * 1024
+
+class ReceivedFile(NamedTuple):
+    path: str
+    filename: str
+    extension: str
+    content_type: Optional[str]
+    size: int
+    sha256: str
+
+class _Part:
+    def __init__(self):
+        self.headers: Dict[bytes, bytes] = {}
+        self.name: Optional[str] = None
+        self.filename: Optional[str] = None
+        self.data = bytearray()
+
+class _Receiver:
+    """python-multipart callbacks; file data is queued for async writing"""
+
+    def __init__(self, field_name: str, allowed_extensions: Collection[str], max_field_size: int):
+        self.field_name = field_name
+        self.allowed_extensions = allowed_extensions
+        self.max_field_size = max_field_size
+        self.fields: Dict[str, str] = {}
+        self.file: Optional[_Part] = None
+        self.complete = False
+        self.chunks: List[bytes] = []
+        self._part = _Part()
+        self._header_name = b""
+        self._header_value = b""
+
+    def callbacks(self) -> dict:
+        return {
+            "on_part_begin": self.on_part_begin,
+            "on_part_data": self.on_part_data,
+            "on_part_end": self.on_part_end,
+            "on_header_field": self.on_header_field,
+            "on_header_value": self.on_header_value,
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": self.on_headers_finished,
+            "on_end": self.on_end,
+        }
+
+    def on_part_begin(self):
+        self._part = _Part()
+
+    def on_header_field(self, data: bytes, start: int, end: int):
+        self._header_name += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int):
+        self._header_value += data[start:end]
+
+    def on_header_end(self):
+        self._part.headers[self._header_name.lower()] = self._header_value
+        self._header_name = self._header_value = b""
+
+    def on_headers_finished(self):
+        part = self._part
+        _, options = parse_options_header(part.headers.get(b"content-disposition", b""))
+        if b"name" not in options:
+            raise HTTPException(status_code=400, detail="Invalid multipart body")
+        part.name = options[b"name"].decode("utf-8", "replace")
+        if b"filename" not in options:
+            return
+
+        if part.name != self.field_name or self.file is not None:
+            raise HTTPException(status_code=400, detail=f"Send exactly one file in the '{self.field_name}' field")
+        part.filename = os.path.basename(options[b"filename"].decode("utf-8", "replace"))
+        if extension_of(part.filename) not in self.allowed_extensions:
+            raise HTTPException(status_code=415, detail="Unsupported file type")
+        self.file = part
+
+    def on_part_data(self, data: bytes, start: int, end: int):
+        if self._part is self.file:
+            self.chunks.append(data[start:end])
+            return
+        self._part.data += data[start:end]
+        if len(self._part.data) > self.max_field_size:
+            raise HTTPException(status_code=413, detail=f"Field '{self._part.name}' too large")
+
+    def on_part_end(self):
+        if self._part is not self.file:
+            self.fields[self._part.name] = self._part.data.decode("utf-8", "replace")
+
+    def on_end(self):
+        self.complete = True
+
+def extension_of(filename: str) -> str:
+    return os.path.splitext(filename)[1].lstrip(".").lower()
+
+def file_type_of(extension: str) -> Optional[str]:
+    if extension in settings.ALLOWED_IMAGE_TYPES:
+        return "image"
+    if extension in settings.ALLOWED_VIDEO_TYPES:
+        return "video"
+    if extension in settings.ALLOWED_AUDIO_TYPES:
+        return "audio"
+    return None
+
+def media_path(file_type: str, sha256: str, extension: str) -> str:
+    """Content-addressed path of an original, relative to UPLOAD_DIR"""
+    return f"{MEDIA_DIRS[file_type]}/{sha256}.{extension}"
+
+async def receive_upload(
+    request: Request,
+    tmp_dir: str,
+    allowed_extensions: Collection[str],
+    max_size: int,
+    field_name: str = "file",
+    max_field_size: int = 8192
+) -> Tuple[ReceivedFile, Dict[str, str]]:
+    """Stream a multipart upload straight to a temporary file.
+
+    The body is parsed chunk by chunk as it arrives; file data is hashed
+    and appended to disk with aiofiles, so memory use stays at one network
+    chunk regardless of file size. The size limit and file type are
+    enforced mid-stream, rejecting oversized or disallowed uploads without
+    reading the rest of the body. Returns the file and the form's other
+    (small) text fields; the caller owns the temporary file.
+    """
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in params:
+        raise HTTPException(status_code=400, detail="Expected a multipart/form-data body")
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > max_size + MULTIPART_OVERHEAD:
+        raise HTTPException(status_code=413, detail="File too large")
+
+    receiver = _Receiver(field_name, allowed_extensions, max_field_size)
+    parser = multipart.MultipartParser(params[b"boundary"], receiver.callbacks())
+    tmp_path = os.path.join(tmp_dir, uuid.uuid4().hex)
+    digest = hashlib.sha256()
+    size = 0
+    out = None
+    try:
+        async for chunk in request.stream():
+            try:
+                parser.write(chunk)
+            except MultipartParseError:
+                raise HTTPException(status_code=400, detail="Invalid multipart body")
+            if not receiver.chunks:
+                continue
+            if out is None:
+                out = await aiofiles.open(tmp_path, "wb")
+            for data in receiver.chunks:
+                size += len(data)
+                if size > max_size:
+                    raise HTTPException(status_code=413, detail="File too large")
+                digest.update(data)
+                await out.write(data)
+            receiver.chunks.clear()
+        parser.finalize()
+
+        if not receiver.complete:
+            raise HTTPException(status_code=400, detail="Incomplete multipart body")
+        if receiver.file is None:
+            raise HTTPException(status_code=400, detail="No file uploaded")
+        if out is None:
+            # Empty file
+            out = await aiofiles.open(tmp_path, "wb")
+    except BaseException:
+        if out is not None:
+            await out.close()
+            await aiofiles.os.remove(tmp_path)
+        raise
+    await out.close()
+
+    part = receiver.file
+    received = ReceivedFile(
+        path=tmp_path,
+        filename=part.filename,
+        extension=extension_of(part.filename),
+        content_type=part.headers.get(b"content-type", b"").decode("latin-1") or None,
+        size=size,
+        sha256=digest.hexdigest()
+    )
+    return received, receiver.fields
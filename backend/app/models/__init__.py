@@ -0,0 +1,8 @@
+# SQLAlchemy models mirroring database_setup.sql
+from .user import User
+from .category import Category
+from .post import Post
+from .comment import Comment
+from .analytics import Analytics
+from .ai_interaction import AIInteraction
+from .media import MediaFile
@@ -0,0 +1,22 @@
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import Boolean, DateTime, ForeignKey, Index, JSON, Numeric, String
+from sqlalchemy.orm import Mapped, mapped_column
+from ..core.database import Base
+
+class AIInteraction(Base):
+    __tablename__ = "ai_interactions"
+    __table_args__ = (Index("idx_type_created", "interaction_type", "created_at"),)
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    user_id: Mapped[Optional[int]] = mapped_column(ForeignKey("users.id", ondelete="SET NULL"), index=True)
+    interaction_type: Mapped[str] = mapped_column(String(20), index=True)
+    input_data: Mapped[Optional[dict]] = mapped_column(JSON)
+    output_data: Mapped[Optional[dict]] = mapped_column(JSON)
+    model_used: Mapped[Optional[str]] = mapped_column(String(100))
+    tokens_used: Mapped[Optional[int]]
+    cost: Mapped[Optional[float]] = mapped_column(Numeric(12, 6, asdecimal=False))
+    processing_time: Mapped[Optional[int]]  # milliseconds
+    success: Mapped[bool] = mapped_column(Boolean, default=True)
+    cached: Mapped[bool] = mapped_column(Boolean, default=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.now, index=True)
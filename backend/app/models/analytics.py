@@ -0,0 +1,19 @@
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import DateTime, ForeignKey, Index, JSON, String, Text
+from sqlalchemy.orm import Mapped, mapped_column
+from ..core.database import Base
+
+class Analytics(Base):
+    __tablename__ = "analytics"
+    __table_args__ = (Index("idx_entity", "entity_type", "entity_id"),)
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    event_type: Mapped[str] = mapped_column(String(50), index=True)
+    entity_type: Mapped[str] = mapped_column(String(20))
+    entity_id: Mapped[Optional[int]]
+    user_id: Mapped[Optional[int]] = mapped_column(ForeignKey("users.id", ondelete="SET NULL"), index=True)
+    event_metadata: Mapped[Optional[dict]] = mapped_column("metadata", JSON)
+    ip_address: Mapped[Optional[str]] = mapped_column(String(45))
+    user_agent: Mapped[Optional[str]] = mapped_column(Text)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.now, index=True)
@@ -0,0 +1,26 @@
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import Boolean, DateTime, ForeignKey, Index, Text
+from sqlalchemy.orm import Mapped, mapped_column
+from ..core.database import Base
+
+class Comment(Base):
+    __tablename__ = "comments"
+    __table_args__ = (
+        # Serve per-post listings and the moderation queue in (created_at, id) order
+        Index("idx_post_approved_created", "post_id", "is_approved", "created_at", "id"),
+        Index("idx_approved_created", "is_approved", "created_at", "id"),
+        Index("idx_user_created", "user_id", "created_at", "id"),
+        # Page each level of a thread: a post's top-level comments or one comment's replies
+        Index("idx_post_parent_created", "post_id", "parent_id", "created_at", "id"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    post_id: Mapped[int] = mapped_column(ForeignKey("posts.id", ondelete="CASCADE"), index=True)
+    user_id: Mapped[Optional[int]] = mapped_column(ForeignKey("users.id", ondelete="SET NULL"), index=True)
+    parent_id: Mapped[Optional[int]] = mapped_column(ForeignKey("comments.id", ondelete="CASCADE"), index=True)
+    content: Mapped[str] = mapped_column(Text)
+    is_approved: Mapped[bool] = mapped_column(Boolean, default=False, index=True)
+    is_ai_generated: Mapped[bool] = mapped_column(Boolean, default=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.now, index=True)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.now, onupdate=datetime.now)
@@ -0,0 +1,34 @@
+from datetime import datetime
+from typing import List, Optional
+from sqlalchemy import Boolean, DateTime, ForeignKey, Index, Integer, JSON, String, Text
+from sqlalchemy.orm import Mapped, mapped_column
+from ..core.database import Base
+
+class Post(Base):
+    __tablename__ = "posts"
+    # Category subtree listings and per-category published counts
+    __table_args__ = (Index("idx_category_status_created", "category_id", "status", "created_at", "id"),)
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    title: Mapped[str] = mapped_column(String(255))
+    slug: Mapped[str] = mapped_column(String(255), unique=True, index=True)
+    content: Mapped[str] = mapped_column(Text)
+    excerpt: Mapped[Optional[str]] = mapped_column(Text)
+    featured_image: Mapped[Optional[str]] = mapped_column(String(255))
+    status: Mapped[str] = mapped_column(String(20), default="draft", index=True)
+    post_type: Mapped[str] = mapped_column(String(20), default="text")
+    author_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), index=True)
+    category_id: Mapped[Optional[int]] = mapped_column(ForeignKey("categories.id", ondelete="SET NULL"), index=True)
+    tags: Mapped[Optional[List[str]]] = mapped_column(JSON, default=list)
+    meta_description: Mapped[Optional[str]] = mapped_column(String(160))
+    meta_keywords: Mapped[Optional[str]] = mapped_column(String(255))
+    view_count: Mapped[int] = mapped_column(Integer, default=0)
+    like_count: Mapped[int] = mapped_column(Integer, default=0)
+    comment_count: Mapped[int] = mapped_column(Integer, default=0)
+    share_count: Mapped[int] = mapped_column(Integer, default=0)
+    is_featured: Mapped[bool] = mapped_column(Boolean, default=False, index=True)
+    is_ai_generated: Mapped[bool] = mapped_column(Boolean, default=False)
+    ai_metadata: Mapped[Optional[dict]] = mapped_column(JSON)
+    published_at: Mapped[Optional[datetime]] = mapped_column(DateTime, index=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.now, index=True)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.now, onupdate=datetime.now)
@@ -0,0 +1 @@
+# Data access repositories (in-memory and SQL backends)
@@ -0,0 +1,24 @@
+from datetime import datetime
+from typing import List
+from sqlalchemy import insert
+from ..core import database
+from ..core.ai_usage import UsageRecord
+from ..models.ai_interaction import AIInteraction
+
+async def flush_ai_interactions(records: List[UsageRecord]):
+    """Log a batch of AI calls as one executemany INSERT"""
+    async with database.SessionLocal() as session:
+        await session.execute(insert(AIInteraction), [
+            {
+                "interaction_type": record.feature,
+                "model_used": record.model,
+                "tokens_used": record.tokens,
+                "cost": round(record.cost, 6),
+                "processing_time": round(record.latency_ms),
+                "success": record.success,
+                "cached": record.cached,
+                "created_at": datetime.fromtimestamp(record.created_at)
+            }
+            for record in records
+        ])
+        await session.commit()
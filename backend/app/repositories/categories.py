@@ -0,0 +1,111 @@
+from typing import List, Optional
+from sqlalchemy import func, literal, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..models.category import Category
+from ..stores.categories import CategoryTree
+
+class MemoryCategoryRepository:
+    """Category repository backed by the mock categories list"""
+
+    def __init__(self, categories: List[dict]):
+        self.categories = categories
+        self._by_id = {cat["id"]: cat for cat in categories}
+        self.tree = CategoryTree(categories)
+        self._last_id = max((c["id"] for c in categories), default=0)
+
+    async def count(self) -> int:
+        return len(self._by_id)
+
+    async def get(self, category_id: int) -> Optional[dict]:
+        return self._by_id.get(category_id)
+
+    async def ancestors(self, category_id: int) -> List[dict]:
+        """The category's ancestors, root first"""
+        return [self._by_id[ancestor_id] for ancestor_id in self.tree.ancestors(category_id)]
+
+    async def descendant_ids(self, category_id: int) -> List[int]:
+        """Ids of the category and every category below it"""
+        return self.tree.descendants(category_id)
+
+    async def is_within(self, category_id: int, ancestor_id: int) -> bool:
+        return self.tree.is_within(category_id, ancestor_id)
+
+    async def get_by_slug(self, slug: str) -> Optional[dict]:
+        return next((cat for cat in self.categories if cat["slug"] == slug), None)
+
+    async def list_active(self) -> List[dict]:
+        return [cat for cat in self.categories if cat["is_active"]]
+
+    async def create(self, data: dict) -> dict:
+        self._last_id += 1
+        category = dict(data, id=self._last_id)
+        self.categories.append(category)
+        self._by_id[category["id"]] = category
+        self.tree.set_parent(category["id"], category["parent_id"])
+        return category
+
+    async def update(self, category_id: int, changes: dict) -> dict:
+        category = await self.get(category_id)
+        category.update(changes)
+        self.tree.set_parent(category_id, category["parent_id"])
+        return category
+
+class SqlCategoryRepository:
+    """Category repository backed by an async SQLAlchemy session"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def count(self) -> int:
+        return await self.db.scalar(select(func.count()).select_from(Category))
+
+    async def get(self, category_id: int) -> Optional[dict]:
+        category = await self.db.get(Category, category_id)
+        return category.to_dict() if category else None
+
+    async def get_by_slug(self, slug: str) -> Optional[dict]:
+        category = await self.db.scalar(select(Category).where(Category.slug == slug))
+        return category.to_dict() if category else None
+
+    async def ancestors(self, category_id: int) -> List[dict]:
+        """The category's ancestors, root first, in one recursive query"""
+        path = (
+            select(Category.parent_id.label("id"), literal(1).label("depth"))
+            .where(Category.id == category_id)
+            .cte("path", recursive=True)
+        )
+        path = path.union_all(
+            select(Category.parent_id, path.c.depth + 1)
+            .join(path, Category.id == path.c.id)
+            .where(Category.parent_id.is_not(None))
+        )
+        query = select(Category).join(path, Category.id == path.c.id).order_by(path.c.depth.desc())
+        result = await self.db.scalars(query)
+        return [category.to_dict() for category in result]
+
+    async def descendant_ids(self, category_id: int) -> List[int]:
+        """Ids of the category and every category below it"""
+        subtree = select(Category.id).where(Category.id == category_id).cte("subtree", recursive=True)
+        subtree = subtree.union_all(select(Category.id).join(subtree, Category.parent_id == subtree.c.id))
+        return list(await self.db.scalars(select(subtree.c.id)))
+
+    async def is_within(self, category_id: int, ancestor_id: int) -> bool:
+        return category_id in await self.descendant_ids(ancestor_id)
+
+    async def list_active(self) -> List[dict]:
+        query = select(Category).where(Category.is_active.is_(True)).order_by(Category.id)
+        result = await self.db.scalars(query)
+        return [category.to_dict() for category in result]
+
+    async def create(self, data: dict) -> dict:
+        category = Category.from_dict(data)
+        self.db.add(category)
+        await self.db.commit()
+        return category.to_dict()
+
+    async def update(self, category_id: int, changes: dict) -> dict:
+        category = await self.db.get(Category, category_id)
+        for field, value in changes.items():
+            setattr(category, field, value)
+        await self.db.commit()
+        return category.to_dict()
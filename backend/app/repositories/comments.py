@@ -0,0 +1,445 @@
+from datetime import datetime
+from itertools import islice
+from typing import Callable, Dict, List, Optional, Tuple
+from sortedcontainers import SortedList
+from sqlalchemy import and_, delete, func, or_, select, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..core.pagination import encode_cursor
+from ..models.comment import Comment
+from ..stores.posts import sort_key
+
+# Fields a bulk upsert overwrites on an existing comment (matched by id)
+UPSERT_FIELDS = ("content", "parent_id", "updated_at")
+
+# Fields that decide where a comment sits in the sorted indexes
+INDEXED_FIELDS = ("post_id", "user_id", "parent_id", "is_approved", "created_at")
+
+def build_thread(
+    children: Callable[[Optional[int]], Optional[SortedList]],
+    comments: Dict[int, dict],
+    parent_id: Optional[int],
+    depth: int,
+    limit: int,
+    replies_limit: int,
+    after: Optional[Tuple[datetime, int]] = None
+) -> Tuple[List[dict], Optional[str]]:
+    """One page of a thread level, with up to depth levels of replies nested.
+
+    children(parent_id) returns the sorted (created_at, id) keys of a
+    comment's replies, so each level costs O(log n + page) regardless of
+    thread size. Returns the nodes and a cursor for the level's next page.
+    """
+    keys = children(parent_id)
+    if not keys:
+        return [], None
+    if after is not None:
+        page = list(islice(keys.irange(minimum=after, inclusive=(False, True)), limit + 1))
+    else:
+        page = list(islice(iter(keys), limit + 1))
+
+    nodes = []
+    for _, comment_id in page[:limit]:
+        comment = comments[comment_id]
+        node = dict(comment, replies=[], reply_count=len(children(comment_id) or ()), replies_cursor=None)
+        if depth > 1 and node["reply_count"]:
+            node["replies"], node["replies_cursor"] = build_thread(
+                children, comments, comment_id, depth - 1, replies_limit, replies_limit
+            )
+        nodes.append(node)
+
+    next_cursor = encode_cursor(nodes[-1]) if len(page) > limit else None
+    return nodes, next_cursor
+
+class MemoryCommentRepository:
+    """Comment repository backed by the mock comments.
+
+    Every index maps a bucket to its comments' sorted (created_at, id)
+    keys: by post (all and approved only), by author, by approval state
+    (the pending bucket is the moderation queue) and by thread, where each
+    (post, parent) holds a comment's replies. Listings walk the smallest
+    matching bucket, so a page costs O(log n + page) instead of a scan.
+    """
+
+    def __init__(self, comments: List[dict]):
+        self._comments: Dict[int, dict] = {}
+        self._order = SortedList()
+        self._by_post: Dict[int, SortedList] = {}
+        self._approved_by_post: Dict[int, SortedList] = {}
+        self._by_user: Dict[Optional[int], SortedList] = {}
+        self._by_approval: Dict[bool, SortedList] = {}
+        self._children: Dict[Tuple[int, Optional[int]], SortedList] = {}
+        self._approved_children: Dict[Tuple[int, Optional[int]], SortedList] = {}
+        for comment in comments:
+            self._comments[comment["id"]] = comment
+            self._index(comment)
+        self._last_id = max(self._comments, default=0)
+
+    def _buckets(self, comment: dict):
+        """Every (index, bucket) the comment is listed under"""
+        yield self._by_post, comment["post_id"]
+        yield self._by_user, comment["user_id"]
+        yield self._by_approval, bool(comment["is_approved"])
+        yield self._children, (comment["post_id"], comment["parent_id"])
+        if comment["is_approved"]:
+            yield self._approved_by_post, comment["post_id"]
+            yield self._approved_children, (comment["post_id"], comment["parent_id"])
+
+    def _index(self, comment: dict):
+        key = sort_key(comment)
+        self._order.add(key)
+        for index, bucket in self._buckets(comment):
+            index.setdefault(bucket, SortedList()).add(key)
+
+    def _unindex(self, comment: dict):
+        key = sort_key(comment)
+        self._order.discard(key)
+        for index, bucket in self._buckets(comment):
+            keys = index.get(bucket)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del index[bucket]
+
+    def _page(
+        self,
+        indexes: List[Optional[SortedList]],
+        skip: int = 0,
+        limit: Optional[int] = None,
+        after: Optional[Tuple[datetime, int]] = None,
+        match: Optional[Callable[[dict], bool]] = None
+    ) -> List[dict]:
+        """Walk the smallest of the given indexes after the cursor.
+
+        Each index must cover every comment the listing can return; match
+        checks whatever the chosen index doesn't guarantee.
+        """
+        if any(index is None for index in indexes):
+            return []
+        index = min(indexes, key=len)
+        if after is not None:
+            keys = index.irange(minimum=after, inclusive=(False, True))
+        else:
+            keys = iter(index)
+
+        comments = []
+        for _, comment_id in keys:
+            comment = self._comments[comment_id]
+            if match is not None and not match(comment):
+                continue
+            if skip:
+                skip -= 1
+                continue
+            comments.append(comment)
+            if limit is not None and len(comments) >= limit:
+                break
+        return comments
+
+    async def count(self) -> int:
+        return len(self._comments)
+
+    async def get(self, comment_id: int) -> Optional[dict]:
+        return self._comments.get(comment_id)
+
+    async def get_many(self, comment_ids: List[int]) -> Dict[int, dict]:
+        return {comment_id: self._comments[comment_id] for comment_id in comment_ids if comment_id in self._comments}
+
+    async def list(
+        self,
+        post_id: Optional[int] = None,
+        approved_only: bool = False,
+        skip: int = 0,
+        limit: Optional[int] = None,
+        after: Optional[Tuple[datetime, int]] = None,
+        updated_since: Optional[datetime] = None,
+        user_id: Optional[int] = None
+    ) -> List[dict]:
+        indexes = [self._order]
+        if post_id:
+            indexes.append((self._approved_by_post if approved_only else self._by_post).get(post_id))
+        elif approved_only:
+            indexes.append(self._by_approval.get(True))
+        if user_id is not None:
+            indexes.append(self._by_user.get(user_id))
+
+        def match(comment: dict) -> bool:
+            return not (
+                (post_id and comment["post_id"] != post_id) or
+                (approved_only and not comment["is_approved"]) or
+                (user_id is not None and comment["user_id"] != user_id) or
+                (updated_since is not None and comment["updated_at"] < updated_since)
+            )
+
+        return self._page(indexes, skip, limit, after, match)
+
+    async def pending(
+        self,
+        post_id: Optional[int] = None,
+        skip: int = 0,
+        limit: Optional[int] = None,
+        after: Optional[Tuple[datetime, int]] = None
+    ) -> List[dict]:
+        """The moderation queue: unapproved comments, oldest first"""
+        indexes = [self._by_approval.get(False)]
+        if post_id:
+            indexes.append(self._by_post.get(post_id))
+
+        def match(comment: dict) -> bool:
+            return not comment["is_approved"] and (not post_id or comment["post_id"] == post_id)
+
+        return self._page(indexes, skip, limit, after, match)
+
+    async def thread(
+        self,
+        post_id: int,
+        parent_id: Optional[int] = None,
+        depth: int = 3,
+        limit: int = 20,
+        replies_limit: int = 5,
+        after: Optional[Tuple[datetime, int]] = None,
+        approved_only: bool = True
+    ) -> Tuple[List[dict], Optional[str]]:
+        index = self._approved_children if approved_only else self._children
+        return build_thread(
+            lambda parent: index.get((post_id, parent)),
+            self._comments, parent_id, depth, limit, replies_limit, after
+        )
+
+    async def create(self, data: dict) -> dict:
+        self._last_id += 1
+        comment = dict(data, id=self._last_id)
+        self._comments[comment["id"]] = comment
+        self._index(comment)
+        return comment
+
+    async def upsert_many(self, records: List[dict]) -> List[Tuple[dict, bool]]:
+        """Update records whose id exists, create the rest; returns (comment, created)"""
+        results = []
+        for record in records:
+            existing = self._comments.get(record.get("id"))
+            if existing is not None:
+                self._unindex(existing)
+                existing.update({field: record[field] for field in UPSERT_FIELDS})
+                self._index(existing)
+                results.append((existing, False))
+            else:
+                self._last_id += 1
+                results.append((dict(record, id=self._last_id), True))
+
+        for comment, created in results:
+            if created:
+                self._comments[comment["id"]] = comment
+                self._index(comment)
+        return results
+
+    async def update(self, comment_id: int, changes: dict) -> dict:
+        comment = self._comments[comment_id]
+        reindex = any(field in changes and changes[field] != comment[field] for field in INDEXED_FIELDS)
+        if reindex:
+            self._unindex(comment)
+        comment.update(changes)
+        if reindex:
+            self._index(comment)
+        return comment
+
+    async def delete(self, comment_id: int) -> int:
+        """Delete a comment and every reply below it; returns how many were deleted"""
+        comment = self._comments.get(comment_id)
+        if comment is None:
+            return 0
+        subtree = [comment_id]
+        for reply_to in subtree:
+            subtree.extend(reply_id for _, reply_id in self._children.get((comment["post_id"], reply_to), ()))
+        for reply_id in subtree:
+            self._unindex(self._comments.pop(reply_id))
+        return len(subtree)
+
+class SqlCommentRepository:
+    """Comment repository backed by an async SQLAlchemy session"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def count(self) -> int:
+        return await self.db.scalar(select(func.count()).select_from(Comment))
+
+    async def get(self, comment_id: int) -> Optional[dict]:
+        comment = await self.db.get(Comment, comment_id)
+        return comment.to_dict() if comment else None
+
+    async def get_many(self, comment_ids: List[int]) -> Dict[int, dict]:
+        if not comment_ids:
+            return {}
+        result = await self.db.scalars(select(Comment).where(Comment.id.in_(set(comment_ids))))
+        return {comment.id: comment.to_dict() for comment in result}
+
+    async def list(
+        self,
+        post_id: Optional[int] = None,
+        approved_only: bool = False,
+        skip: int = 0,
+        limit: Optional[int] = None,
+        after: Optional[Tuple[datetime, int]] = None,
+        updated_since: Optional[datetime] = None,
+        user_id: Optional[int] = None
+    ) -> List[dict]:
+        query = select(Comment)
+        if post_id:
+            query = query.where(Comment.post_id == post_id)
+        if approved_only:
+            query = query.where(Comment.is_approved.is_(True))
+        if user_id is not None:
+            query = query.where(Comment.user_id == user_id)
+        if updated_since is not None:
+            query = query.where(Comment.updated_at >= updated_since)
+        return await self._page(query, skip, limit, after)
+
+    async def _page(
+        self,
+        query,
+        skip: int = 0,
+        limit: Optional[int] = None,
+        after: Optional[Tuple[datetime, int]] = None
+    ) -> List[dict]:
+        if after is not None:
+            created_at, comment_id = after
+            query = query.where(or_(
+                Comment.created_at > created_at,
+                and_(Comment.created_at == created_at, Comment.id > comment_id)
+            ))
+        query = query.order_by(Comment.created_at, Comment.id).offset(skip)
+        if limit is not None:
+            query = query.limit(limit)
+        result = await self.db.scalars(query)
+        return [comment.to_dict() for comment in result]
+
+    async def thread(
+        self,
+        post_id: int,
+        parent_id: Optional[int] = None,
+        depth: int = 3,
+        limit: int = 20,
+        replies_limit: int = 5,
+        after: Optional[Tuple[datetime, int]] = None,
+        approved_only: bool = True
+    ) -> Tuple[List[dict], Optional[str]]:
+        """One page of a thread level with up to depth levels of replies.
+
+        Each level is read with keyset queries on (post_id, parent_id,
+        created_at, id), served by idx_post_parent_created: the requested
+        level is one page, and the next level is one UNION ALL of a
+        limited page per parent plus one grouped count of replies, so a
+        request reads O(depth * page) rows however large the thread is.
+        """
+        def level(parent: Optional[int]):
+            query = select(Comment).where(
+                Comment.post_id == post_id,
+                Comment.parent_id.is_(None) if parent is None else Comment.parent_id == parent
+            )
+            if approved_only:
+                query = query.where(Comment.is_approved.is_(True))
+            return query.order_by(Comment.created_at, Comment.id)
+
+        page = await self._page(level(parent_id), limit=limit + 1, after=after)
+        nodes = [self._node(comment) for comment in page[:limit]]
+        next_cursor = encode_cursor(nodes[-1]) if len(page) > limit else None
+
+        parents = nodes
+        while parents:
+            await self._count_replies(post_id, parents, approved_only)
+            depth -= 1
+            parents = [node for node in parents if node["reply_count"]]
+            if depth < 1 or not parents:
+                break
+            pages = [select(level(node["id"]).limit(replies_limit + 1).subquery()) for node in parents]
+            query = pages[0] if len(pages) == 1 else union_all(*pages)
+            replies: Dict[int, List[dict]] = {}
+            for row in await self.db.execute(query):
+                replies.setdefault(row.parent_id, []).append(dict(row._mapping))
+
+            children = []
+            for node in parents:
+                page = sorted(replies.get(node["id"], ()), key=sort_key)
+                node["replies"] = [self._node(comment) for comment in page[:replies_limit]]
+                if len(page) > replies_limit:
+                    node["replies_cursor"] = encode_cursor(node["replies"][-1])
+                children.extend(node["replies"])
+            parents = children
+        return nodes, next_cursor
+
+    @staticmethod
+    def _node(comment: dict) -> dict:
+        return dict(comment, replies=[], reply_count=0, replies_cursor=None)
+
+    async def _count_replies(self, post_id: int, nodes: List[dict], approved_only: bool):
+        query = select(Comment.parent_id, func.count()).where(
+            Comment.post_id == post_id,
+            Comment.parent_id.in_([node["id"] for node in nodes])
+        )
+        if approved_only:
+            query = query.where(Comment.is_approved.is_(True))
+        counts = dict((await self.db.execute(query.group_by(Comment.parent_id))).all())
+        for node in nodes:
+            node["reply_count"] = counts.get(node["id"], 0)
+
+    async def pending(
+        self,
+        post_id: Optional[int] = None,
+        skip: int = 0,
+        limit: Optional[int] = None,
+        after: Optional[Tuple[datetime, int]] = None
+    ) -> List[dict]:
+        """The moderation queue: unapproved comments, oldest first"""
+        query = select(Comment).where(Comment.is_approved.is_(False))
+        if post_id:
+            query = query.where(Comment.post_id == post_id)
+        return await self._page(query, skip, limit, after)
+
+    async def create(self, data: dict) -> dict:
+        comment = Comment.from_dict(data)
+        self.db.add(comment)
+        await self.db.commit()
+        return comment.to_dict()
+
+    async def upsert_many(self, records: List[dict]) -> List[Tuple[dict, bool]]:
+        """Update records whose id exists, create the rest, in one transaction"""
+        ids = {record["id"] for record in records if record.get("id") is not None}
+        existing = {}
+        if ids:
+            result = await self.db.scalars(select(Comment).where(Comment.id.in_(ids)))
+            existing = {comment.id: comment for comment in result}
+
+        outcome = []
+        for record in records:
+            comment = existing.get(record.get("id"))
+            if comment is not None:
+                for field in UPSERT_FIELDS:
+                    setattr(comment, field, record[field])
+                outcome.append((comment, False))
+            else:
+                comment = Comment.from_dict({k: v for k, v in record.items() if k != "id"})
+                self.db.add(comment)
+                outcome.append((comment, True))
+
+        await self.db.commit()
+        return [(comment.to_dict(), created) for comment, created in outcome]
+
+    async def update(self, comment_id: int, changes: dict) -> dict:
+        comment = await self.db.get(Comment, comment_id)
+        for field, value in changes.items():
+            setattr(comment, field, value)
+        await self.db.commit()
+        return comment.to_dict()
+
+    async def delete(self, comment_id: int) -> int:
+        """Delete a comment and every reply below it; returns how many were deleted.
+
+        Done explicitly rather than relying on the parent_id foreign key's
+        ON DELETE CASCADE, which SQLite only applies with foreign_keys on.
+        """
+        subtree = select(Comment.id).where(Comment.id == comment_id).cte("subtree", recursive=True)
+        subtree = subtree.union_all(select(Comment.id).join(subtree, Comment.parent_id == subtree.c.id))
+        comment_ids = list(await self.db.scalars(select(subtree.c.id)))
+        if comment_ids:
+            await self.db.execute(delete(Comment).where(Comment.id.in_(comment_ids)))
+            await self.db.commit()
+        return len(comment_ids)
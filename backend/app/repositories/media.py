@@ -0,0 +1,72 @@
+from typing import Dict, Optional
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..models.media import MediaFile
+
+class MemoryMediaRepository:
+    """Media repository backed by in-process dicts, indexed by content hash"""
+
+    def __init__(self):
+        self._files: Dict[int, dict] = {}
+        self._by_hash: Dict[str, int] = {}
+        self._last_id = 0
+
+    async def get(self, media_id: int) -> Optional[dict]:
+        return self._files.get(media_id)
+
+    async def get_by_hash(self, content_hash: str) -> Optional[dict]:
+        media_id = self._by_hash.get(content_hash)
+        return self._files.get(media_id) if media_id is not None else None
+
+    async def create(self, data: dict) -> dict:
+        """Insert a file, or return the existing one with the same content"""
+        existing = await self.get_by_hash(data["content_hash"])
+        if existing is not None:
+            return existing
+        self._last_id += 1
+        media = dict(data, id=self._last_id)
+        self._files[media["id"]] = media
+        self._by_hash[media["content_hash"]] = media["id"]
+        return media
+
+    async def update(self, media_id: int, changes: dict) -> Optional[dict]:
+        media = self._files.get(media_id)
+        if media is not None:
+            media.update(changes)
+        return media
+
+class SqlMediaRepository:
+    """Media repository backed by an async SQLAlchemy session"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get(self, media_id: int) -> Optional[dict]:
+        media = await self.db.get(MediaFile, media_id)
+        return media.to_dict() if media else None
+
+    async def get_by_hash(self, content_hash: str) -> Optional[dict]:
+        media = await self.db.scalar(select(MediaFile).where(MediaFile.content_hash == content_hash))
+        return media.to_dict() if media else None
+
+    async def create(self, data: dict) -> dict:
+        """Insert a file, or return the existing one with the same content"""
+        media = MediaFile.from_dict(data)
+        self.db.add(media)
+        try:
+            await self.db.commit()
+        except IntegrityError:
+            # A concurrent upload of the same content won the unique index
+            await self.db.rollback()
+            return await self.get_by_hash(data["content_hash"])
+        return media.to_dict()
+
+    async def update(self, media_id: int, changes: dict) -> Optional[dict]:
+        media = await self.db.get(MediaFile, media_id)
+        if media is None:
+            return None
+        for field, value in changes.items():
+            setattr(media, field, value)
+        await self.db.commit()
+        return media.to_dict()
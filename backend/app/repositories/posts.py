@@ -0,0 +1,350 @@
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import and_, bindparam, delete, func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..core import database
+from ..core.config import settings
+from ..core.counters import Deltas, counter_buffer
+from ..models.analytics import Analytics
+from ..models.post import Post
+from ..stores.posts import PostStore
+from ..stores.search import SearchIndex
+
+COUNTER_FIELDS = ("view_count", "like_count", "comment_count", "share_count")
+
+# Hot counters written through the write-behind buffer, with their analytics event
+BUFFERED_COUNTERS = {"view_count": "post_view", "like_count": "post_like", "share_count": "post_share"}
+
+# Fields a bulk upsert overwrites on an existing post (matched by slug)
+UPSERT_FIELDS = (
+    "title", "content", "excerpt", "category_id", "tags",
+    "meta_description", "meta_keywords", "is_featured", "updated_at",
+)
+
+# Field weights for full-text ranking
+SEARCH_FIELDS = {"title": 3.0, "excerpt": 2.0, "content": 1.0}
+
+class MemoryPostRepository:
+    """Post repository backed by the in-process PostStore"""
+
+    def __init__(self, store: PostStore):
+        self.store = store
+        self.search_index = SearchIndex(SEARCH_FIELDS)
+        for post in store:
+            self.search_index.add(post["id"], post)
+
+    async def count(self) -> int:
+        return len(self.store)
+
+    async def get(self, post_id: int) -> Optional[dict]:
+        return self.store.get(post_id)
+
+    async def get_by_slug(self, slug: str) -> Optional[dict]:
+        return self.store.get_by_slug(slug)
+
+    async def slug_taken(self, slug: str, exclude_id: Optional[int] = None) -> bool:
+        return self.store.slug_taken(slug, exclude_id=exclude_id)
+
+    async def list(
+        self,
+        status: Optional[str] = None,
+        category_id: Optional[int] = None,
+        featured: Optional[bool] = None,
+        search: Optional[str] = None,
+        skip: int = 0,
+        limit: Optional[int] = None,
+        after: Optional[Tuple[datetime, int]] = None,
+        updated_since: Optional[datetime] = None,
+        category_ids: Optional[List[int]] = None
+    ) -> List[dict]:
+        if search:
+            # Ranked by relevance, then narrowed by the other filters;
+            # relevance order has no stable cursor, so only skip applies
+            posts = [self.store.get(post_id) for post_id, _ in self.search_index.search(search)]
+            posts = [p for p in posts if
+                    (status is None or p["status"] == status) and
+                    (category_id is None or p["category_id"] == category_id) and
+                    (category_ids is None or p["category_id"] in category_ids) and
+                    (featured is None or p["is_featured"] == featured) and
+                    (updated_since is None or p["updated_at"] >= updated_since)]
+        else:
+            return self.store.page(
+                status=status,
+                category_id=category_id,
+                featured=featured,
+                after=after,
+                skip=skip,
+                limit=limit,
+                updated_since=updated_since,
+                category_ids=category_ids
+            )
+
+        if limit is None:
+            return posts[skip:]
+        return posts[skip:skip + limit]
+
+    async def recent(
+        self,
+        limit: int,
+        category_id: Optional[int] = None,
+        author_id: Optional[int] = None,
+        featured: Optional[bool] = None
+    ) -> List[dict]:
+        return self.store.recent(limit, category_id=category_id, author_id=author_id, featured=featured)
+
+    async def published_counts(self, category_ids: List[int]) -> Dict[int, int]:
+        return self.store.published_counts(category_ids)
+
+    async def create(self, data: dict) -> dict:
+        post = self.store.add(dict(data, id=self.store.next_id()))
+        self.search_index.add(post["id"], post)
+        return post
+
+    async def authors_by_slug(self, slugs: List[str]) -> Dict[str, int]:
+        """author_id of the existing posts among slugs"""
+        return {slug: post["author_id"] for slug in set(slugs) if (post := self.store.get_by_slug(slug))}
+
+    async def upsert_many(self, records: List[dict]) -> List[Tuple[dict, Optional[dict]]]:
+        """Create or update posts by slug.
+
+        Returns (post, previous state or None) per record; previous is the
+        state before the batch, so it is None for every row of a slug the
+        batch creates.
+        """
+        results = []
+        created: Dict[str, dict] = {}
+        for record in records:
+            changes = {field: record[field] for field in UPSERT_FIELDS}
+            post = created.get(record["slug"])
+            if post is not None:
+                # Repeated slug within the batch: still a post the batch creates
+                previous = None
+                post.update(changes)
+            elif (existing := self.store.get_by_slug(record["slug"])) is not None:
+                previous = dict(existing)
+                post = self.store.update(existing["id"], changes)
+                self.search_index.add(post["id"], post)
+            else:
+                previous = None
+                post = created[record["slug"]] = dict(record)
+            results.append((post, previous))
+
+        next_id = self.store.next_id()
+        for offset, post in enumerate(created.values()):
+            post["id"] = next_id + offset
+        self.store.add_many(list(created.values()))
+        for post in created.values():
+            self.search_index.add(post["id"], post)
+        return results
+
+    async def update(self, post_id: int, changes: dict) -> dict:
+        post = self.store.update(post_id, changes)
+        if any(field in changes for field in SEARCH_FIELDS):
+            self.search_index.add(post_id, post)
+        return post
+
+    async def delete(self, post_id: int):
+        self.store.remove(post_id)
+        self.search_index.remove(post_id)
+
+    async def increment(self, post_id: int, field: str, amount: int = 1) -> Optional[int]:
+        """Add amount to a counter, never going below zero"""
+        post = self.store.get(post_id)
+        if post is None:
+            return None
+        post[field] = max(0, post[field] + amount)
+        return post[field]
+
+class SqlPostRepository:
+    """Post repository backed by an async SQLAlchemy session"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def count(self) -> int:
+        return await self.db.scalar(select(func.count()).select_from(Post))
+
+    async def get(self, post_id: int) -> Optional[dict]:
+        post = await self.db.get(Post, post_id)
+        return counter_buffer.overlay(post.to_dict()) if post else None
+
+    async def get_by_slug(self, slug: str) -> Optional[dict]:
+        post = await self.db.scalar(select(Post).where(Post.slug == slug))
+        return counter_buffer.overlay(post.to_dict()) if post else None
+
+    async def slug_taken(self, slug: str, exclude_id: Optional[int] = None) -> bool:
+        query = select(Post.id).where(Post.slug == slug)
+        if exclude_id is not None:
+            query = query.where(Post.id != exclude_id)
+        return await self.db.scalar(query.limit(1)) is not None
+
+    async def list(
+        self,
+        status: Optional[str] = None,
+        category_id: Optional[int] = None,
+        featured: Optional[bool] = None,
+        search: Optional[str] = None,
+        skip: int = 0,
+        limit: Optional[int] = None,
+        after: Optional[Tuple[datetime, int]] = None,
+        updated_since: Optional[datetime] = None,
+        category_ids: Optional[List[int]] = None
+    ) -> List[dict]:
+        query = select(Post)
+        if status is not None:
+            query = query.where(Post.status == status)
+        if category_id is not None:
+            query = query.where(Post.category_id == category_id)
+        if category_ids is not None:
+            query = query.where(Post.category_id.in_(category_ids))
+        if featured is not None:
+            query = query.where(Post.is_featured == featured)
+        if search:
+            pattern = f"%{search}%"
+            query = query.where(or_(
+                Post.title.ilike(pattern),
+                Post.content.ilike(pattern),
+                Post.excerpt.ilike(pattern)
+            ))
+        if updated_since is not None:
+            query = query.where(Post.updated_at >= updated_since)
+        if after is not None:
+            created_at, post_id = after
+            query = query.where(or_(
+                Post.created_at > created_at,
+                and_(Post.created_at == created_at, Post.id > post_id)
+            ))
+
+        query = query.order_by(Post.created_at, Post.id).offset(skip)
+        if limit is not None:
+            query = query.limit(limit)
+        result = await self.db.scalars(query)
+        return [counter_buffer.overlay(post.to_dict()) for post in result]
+
+    async def recent(
+        self,
+        limit: int,
+        category_id: Optional[int] = None,
+        author_id: Optional[int] = None,
+        featured: Optional[bool] = None
+    ) -> List[dict]:
+        query = select(Post).where(Post.status == "published")
+        if category_id is not None:
+            query = query.where(Post.category_id == category_id)
+        if author_id is not None:
+            query = query.where(Post.author_id == author_id)
+        if featured is not None:
+            query = query.where(Post.is_featured == featured)
+        query = query.order_by(Post.published_at.desc(), Post.id.desc()).limit(limit)
+        result = await self.db.scalars(query)
+        return [counter_buffer.overlay(post.to_dict()) for post in result]
+
+    async def published_counts(self, category_ids: List[int]) -> Dict[int, int]:
+        query = (
+            select(Post.category_id, func.count())
+            .where(Post.status == "published", Post.category_id.in_(category_ids))
+            .group_by(Post.category_id)
+        )
+        counts = dict((await self.db.execute(query)).all())
+        return {category_id: counts.get(category_id, 0) for category_id in category_ids}
+
+    async def create(self, data: dict) -> dict:
+        post = Post.from_dict(data)
+        self.db.add(post)
+        await self.db.commit()
+        return post.to_dict()
+
+    async def authors_by_slug(self, slugs: List[str]) -> Dict[str, int]:
+        """author_id of the existing posts among slugs"""
+        result = await self.db.execute(select(Post.slug, Post.author_id).where(Post.slug.in_(set(slugs))))
+        return dict(result.all())
+
+    async def upsert_many(self, records: List[dict]) -> List[Tuple[dict, Optional[dict]]]:
+        """Create or update posts by slug in one transaction; see MemoryPostRepository.upsert_many"""
+        result = await self.db.scalars(select(Post).where(Post.slug.in_({r["slug"] for r in records})))
+        by_slug = {post.slug: post for post in result}
+        created = set()
+
+        outcome = []
+        for record in records:
+            post = by_slug.get(record["slug"])
+            if post is None:
+                post = by_slug[record["slug"]] = Post.from_dict(record)
+                self.db.add(post)
+                created.add(record["slug"])
+                previous = None
+            elif record["slug"] in created:
+                previous = None
+                for field in UPSERT_FIELDS:
+                    setattr(post, field, record[field])
+            else:
+                previous = post.to_dict()
+                for field in UPSERT_FIELDS:
+                    setattr(post, field, record[field])
+            outcome.append((post, previous))
+
+        await self.db.commit()
+        return [(counter_buffer.overlay(post.to_dict()), previous) for post, previous in outcome]
+
+    async def update(self, post_id: int, changes: dict) -> dict:
+        post = await self.db.get(Post, post_id)
+        for field, value in changes.items():
+            setattr(post, field, value)
+        await self.db.commit()
+        return counter_buffer.overlay(post.to_dict())
+
+    async def delete(self, post_id: int):
+        await self.db.execute(delete(Post).where(Post.id == post_id))
+        await self.db.commit()
+
+    async def increment(self, post_id: int, field: str, amount: int = 1) -> Optional[int]:
+        """Atomically add amount to a counter, never going below zero"""
+        if field not in COUNTER_FIELDS:
+            raise ValueError(f"Unknown counter '{field}'")
+
+        column = getattr(Post, field)
+        if field in BUFFERED_COUNTERS and counter_buffer.enabled:
+            # Read-only existence check; the write happens on the next flush
+            stored = await self.db.scalar(select(column).where(Post.id == post_id))
+            if stored is None:
+                return None
+            counter_buffer.add(post_id, field, amount)
+            return stored + counter_buffer.pending(post_id, field)
+
+        await self.db.execute(
+            update(Post)
+            .where(Post.id == post_id, column + amount >= 0)
+            .values({field: column + amount})
+        )
+        await self.db.commit()
+        return await self.db.scalar(select(column).where(Post.id == post_id))
+
+async def flush_post_counters(deltas: Deltas):
+    """Apply buffered counter deltas in one transaction.
+
+    Each counter is a single executemany UPDATE ... SET col = col + delta,
+    and each (post, event) pair is logged as one aggregated analytics row.
+    """
+    table = Post.__table__
+    async with database.SessionLocal() as session:
+        for field, counts in deltas.items():
+            rows = [{"b_id": post_id, "b_delta": delta} for post_id, delta in counts.items() if delta]
+            if not rows:
+                continue
+            column = table.c[field]
+            await session.execute(
+                update(table)
+                .where(table.c.id == bindparam("b_id"))
+                .values({field: column + bindparam("b_delta")}),
+                rows
+            )
+            session.add_all(
+                Analytics(
+                    event_type=BUFFERED_COUNTERS.get(field, field),
+                    entity_type="post",
+                    entity_id=row["b_id"],
+                    event_metadata={"count": row["b_delta"]}
+                )
+                for row in rows
+            )
+        await session.commit()
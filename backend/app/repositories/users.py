@@ -0,0 +1,135 @@
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from sortedcontainers import SortedList
+from sqlalchemy import and_, delete, func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..models.user import User
+from ..stores.posts import sort_key
+
+class MemoryUserRepository:
+    """User repository backed by the mock users dict (keyed by email)"""
+
+    def __init__(self, users: Dict[str, dict]):
+        self.users = users
+        self._by_id: Dict[int, dict] = {u["id"]: u for u in users.values()}
+        self._order = SortedList(sort_key(u) for u in users.values())
+        self._last_id = max(self._by_id, default=0)
+
+    async def count(self) -> int:
+        return len(self._by_id)
+
+    async def get(self, user_id: int) -> Optional[dict]:
+        return self._by_id.get(user_id)
+
+    async def get_by_email(self, email: str) -> Optional[dict]:
+        return self.users.get(email)
+
+    async def list(
+        self,
+        role: Optional[str] = None,
+        skip: int = 0,
+        limit: Optional[int] = None,
+        after: Optional[Tuple[datetime, int]] = None,
+        updated_since: Optional[datetime] = None
+    ) -> List[dict]:
+        if after is not None:
+            keys = self._order.irange(minimum=after, inclusive=(False, True))
+        else:
+            keys = iter(self._order)
+
+        users = []
+        for _, user_id in keys:
+            user = self._by_id[user_id]
+            if role and user["role"] != role:
+                continue
+            if updated_since is not None and user["updated_at"] < updated_since:
+                continue
+            if skip:
+                skip -= 1
+                continue
+            users.append(user)
+            if limit is not None and len(users) >= limit:
+                break
+        return users
+
+    async def create(self, data: dict) -> dict:
+        self._last_id += 1
+        user = dict(data, id=self._last_id)
+        self.users[user["email"]] = user
+        self._by_id[user["id"]] = user
+        self._order.add(sort_key(user))
+        return user
+
+    async def update(self, user_id: int, changes: dict) -> dict:
+        user = self._by_id[user_id]
+        old_email = user["email"]
+        user.update(changes)
+        if user["email"] != old_email:
+            del self.users[old_email]
+            self.users[user["email"]] = user
+        return user
+
+    async def delete(self, user_id: int):
+        user = self._by_id.pop(user_id, None)
+        if user is not None:
+            del self.users[user["email"]]
+            self._order.discard(sort_key(user))
+
+class SqlUserRepository:
+    """User repository backed by an async SQLAlchemy session"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def count(self) -> int:
+        return await self.db.scalar(select(func.count()).select_from(User))
+
+    async def get(self, user_id: int) -> Optional[dict]:
+        user = await self.db.get(User, user_id)
+        return user.to_dict() if user else None
+
+    async def get_by_email(self, email: str) -> Optional[dict]:
+        user = await self.db.scalar(select(User).where(User.email == email))
+        return user.to_dict() if user else None
+
+    async def list(
+        self,
+        role: Optional[str] = None,
+        skip: int = 0,
+        limit: Optional[int] = None,
+        after: Optional[Tuple[datetime, int]] = None,
+        updated_since: Optional[datetime] = None
+    ) -> List[dict]:
+        query = select(User)
+        if role:
+            query = query.where(User.role == role)
+        if updated_since is not None:
+            query = query.where(User.updated_at >= updated_since)
+        if after is not None:
+            created_at, user_id = after
+            query = query.where(or_(
+                User.created_at > created_at,
+                and_(User.created_at == created_at, User.id > user_id)
+            ))
+        query = query.order_by(User.created_at, User.id).offset(skip)
+        if limit is not None:
+            query = query.limit(limit)
+        result = await self.db.scalars(query)
+        return [user.to_dict() for user in result]
+
+    async def create(self, data: dict) -> dict:
+        user = User.from_dict(data)
+        self.db.add(user)
+        await self.db.commit()
+        return user.to_dict()
+
+    async def update(self, user_id: int, changes: dict) -> dict:
+        user = await self.db.get(User, user_id)
+        for field, value in changes.items():
+            setattr(user, field, value)
+        await self.db.commit()
+        return user.to_dict()
+
+    async def delete(self, user_id: int):
+        await self.db.execute(delete(User).where(User.id == user_id))
+        await self.db.commit()
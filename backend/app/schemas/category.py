@@ -29,3 +29,8 @@ class CategoryResponse(CategoryBase):
 
     class Config:
         from_attributes = True
+
+class CategoryCounts(BaseModel):
+    category_id: int
+    post_count: int
+    total_post_count: int
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 
 class CommentBase(BaseModel):
@@ -23,3 +23,12 @@ class CommentResponse(CommentBase):
 
     class Config:
         from_attributes = True
+
+class CommentTreeNode(CommentResponse):
+    replies: List["CommentTreeNode"] = []
+    reply_count: int = 0
+    replies_cursor: Optional[str] = None  # next page of replies, if any
+
+class CommentTreeResponse(BaseModel):
+    comments: List[CommentTreeNode]
+    next_cursor: Optional[str] = None
@@ -0,0 +1,34 @@
+from pydantic import BaseModel, computed_field
+from typing import Dict, Optional
+from datetime import datetime
+
+class MediaFileResponse(BaseModel):
+    id: int
+    filename: str
+    original_filename: str
+    file_path: str
+    file_type: str
+    mime_type: str
+    file_size: int
+    content_hash: str
+    width: Optional[int] = None
+    height: Optional[int] = None
+    duration: Optional[int] = None
+    alt_text: Optional[str] = None
+    caption: Optional[str] = None
+    variants: Optional[Dict[str, str]] = None  # None until derivatives are generated
+    uploaded_by: int
+    is_ai_generated: bool = False
+    created_at: datetime
+
+    @computed_field
+    @property
+    def urls(self) -> Dict[str, str]:
+        """Public URLs of the original and each variant"""
+        urls = {"original": f"/uploads/{self.file_path}"}
+        for name, path in (self.variants or {}).items():
+            urls[name] = f"/uploads/{path}"
+        return urls
+
+    class Config:
+        from_attributes = True
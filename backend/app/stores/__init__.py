@@ -0,0 +1 @@
+# In-memory data stores
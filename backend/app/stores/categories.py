@@ -0,0 +1,77 @@
+from typing import Dict, Iterable, List, Optional
+
+class CategoryTree:
+    """Category hierarchy with an Euler-tour interval index.
+
+    Categories are numbered in depth-first order; each one's subtree is the
+    contiguous slice [entry, exit) of that order, so listing descendants
+    is a slice and "is A under B" is two comparisons. Ancestors follow
+    parent links in O(depth). The numbering is rebuilt in O(n) on the next
+    read after a category is added or moved, which is rare next to reads.
+    """
+
+    def __init__(self, categories: Optional[Iterable[dict]] = None):
+        self._parent: Dict[int, Optional[int]] = {}
+        self._tour: List[int] = []
+        self._entry: Dict[int, int] = {}
+        self._exit: Dict[int, int] = {}
+        self._stale = True
+        for category in categories or []:
+            self._parent[category["id"]] = category["parent_id"]
+
+    def __contains__(self, category_id: int) -> bool:
+        return category_id in self._parent
+
+    def set_parent(self, category_id: int, parent_id: Optional[int]):
+        """Add a category or move it under a new parent"""
+        if category_id in self._parent and self._parent[category_id] == parent_id:
+            return
+        self._parent[category_id] = parent_id
+        self._stale = True
+
+    def ancestors(self, category_id: int) -> List[int]:
+        """Ids from the root down to the category's parent"""
+        path = []
+        parent_id = self._parent.get(category_id)
+        while parent_id is not None and parent_id in self._parent and len(path) < len(self._parent):
+            path.append(parent_id)
+            parent_id = self._parent[parent_id]
+        path.reverse()
+        return path
+
+    def descendants(self, category_id: int) -> List[int]:
+        """The category followed by every category below it"""
+        self._refresh()
+        if category_id not in self._entry:
+            return []
+        return self._tour[self._entry[category_id]:self._exit[category_id]]
+
+    def is_within(self, category_id: int, ancestor_id: int) -> bool:
+        """Whether category_id is ancestor_id or one of its descendants"""
+        self._refresh()
+        if category_id not in self._entry or ancestor_id not in self._entry:
+            return False
+        return self._entry[ancestor_id] <= self._entry[category_id] < self._exit[ancestor_id]
+
+    def _refresh(self):
+        if not self._stale:
+            return
+        children: Dict[Optional[int], List[int]] = {}
+        for category_id, parent_id in sorted(self._parent.items()):
+            # Dangling parents are treated as roots
+            children.setdefault(parent_id if parent_id in self._parent else None, []).append(category_id)
+
+        self._tour, self._entry, self._exit = [], {}, {}
+        for root in children.get(None, []):
+            # Iterative DFS: (category, exiting) pairs
+            stack = [(root, False)]
+            while stack:
+                category_id, exiting = stack.pop()
+                if exiting:
+                    self._exit[category_id] = len(self._tour)
+                    continue
+                self._entry[category_id] = len(self._tour)
+                self._tour.append(category_id)
+                stack.append((category_id, True))
+                stack.extend((child, False) for child in reversed(children.get(category_id, [])))
+        self._stale = False
@@ -0,0 +1,275 @@
+import heapq
+from datetime import datetime
+from typing import Collection, Dict, Iterable, Iterator, List, Optional, Tuple
+from sortedcontainers import SortedList
+
+# Posts are ordered by (created_at, id); this is also the pagination cursor
+SortKey = Tuple[object, int]
+
+def sort_key(post: dict) -> SortKey:
+    return (post["created_at"], post["id"])
+
+def published_key(post: dict) -> SortKey:
+    return (post["published_at"] or post["created_at"], post["id"])
+
+# Fields with their own published-posts feed index
+FEED_FIELDS = ("category_id", "author_id", "is_featured")
+
+class PostStore:
+    """In-memory post repository with hash and sorted indexes.
+
+    Posts are kept in a dict keyed by id, so lookups and deletes are O(1).
+    Slug is a hash index; status, category_id and is_featured are sorted
+    indexes of (created_at, id) keys, so filtered pages can start right
+    after a cursor instead of scanning every post. Published posts are also
+    kept sorted by (published_at, id), overall and per category, author and
+    featured flag, so "most recent" feeds read k posts from the end.
+    """
+
+    INDEXED_FIELDS = (
+        "slug", "status", "category_id", "is_featured", "created_at",
+        "published_at", "author_id",
+    )
+
+    def __init__(self, posts: Optional[Iterable[dict]] = None):
+        self._posts: Dict[int, dict] = {}
+        self._by_slug: Dict[str, int] = {}
+        self._order: SortedList = SortedList()
+        self._by_status: Dict[str, SortedList] = {}
+        self._by_category: Dict[Optional[int], SortedList] = {}
+        self._featured: SortedList = SortedList()
+        self._published: SortedList = SortedList()
+        self._published_by: Dict[Tuple[str, object], SortedList] = {}
+        self._last_id = 0
+
+        for post in posts or []:
+            self.add(post)
+
+    def __len__(self) -> int:
+        return len(self._posts)
+
+    def __iter__(self) -> Iterator[dict]:
+        return iter(self._posts.values())
+
+    def __contains__(self, post_id: int) -> bool:
+        return post_id in self._posts
+
+    def next_id(self) -> int:
+        """Return the id the next created post should use"""
+        return self._last_id + 1
+
+    def get(self, post_id: int) -> Optional[dict]:
+        return self._posts.get(post_id)
+
+    def get_by_slug(self, slug: str) -> Optional[dict]:
+        post_id = self._by_slug.get(slug)
+        return self._posts.get(post_id) if post_id is not None else None
+
+    def slug_taken(self, slug: str, exclude_id: Optional[int] = None) -> bool:
+        post_id = self._by_slug.get(slug)
+        return post_id is not None and post_id != exclude_id
+
+    def add(self, post: dict) -> dict:
+        """Insert a new post and index it"""
+        if post["id"] in self._posts:
+            raise ValueError(f"Post {post['id']} already exists")
+        if self.slug_taken(post["slug"]):
+            raise ValueError(f"Slug '{post['slug']}' already exists")
+
+        self._posts[post["id"]] = post
+        self._last_id = max(self._last_id, post["id"])
+        self._index(post)
+        return post
+
+    def add_many(self, posts: List[dict]) -> List[dict]:
+        """Insert a batch of new posts, updating each index once"""
+        slugs = set()
+        for post in posts:
+            if post["id"] in self._posts:
+                raise ValueError(f"Post {post['id']} already exists")
+            if self.slug_taken(post["slug"]) or post["slug"] in slugs:
+                raise ValueError(f"Slug '{post['slug']}' already exists")
+            slugs.add(post["slug"])
+
+        for post in posts:
+            self._posts[post["id"]] = post
+            self._last_id = max(self._last_id, post["id"])
+        self._index_many(posts)
+        return posts
+
+    def update(self, post_id: int, changes: dict) -> dict:
+        """Apply changes to a post, re-indexing only when indexed fields change"""
+        post = self._posts[post_id]
+        reindex = any(
+            field in changes and changes[field] != post.get(field)
+            for field in self.INDEXED_FIELDS
+        )
+        if "slug" in changes and self.slug_taken(changes["slug"], exclude_id=post_id):
+            raise ValueError(f"Slug '{changes['slug']}' already exists")
+
+        if reindex:
+            self._unindex(post)
+        post.update(changes)
+        if reindex:
+            self._index(post)
+        return post
+
+    def remove(self, post_id: int) -> Optional[dict]:
+        """Remove a post and its index entries"""
+        post = self._posts.pop(post_id, None)
+        if post is not None:
+            self._unindex(post)
+        return post
+
+    def filter(
+        self,
+        status: Optional[str] = None,
+        category_id: Optional[int] = None,
+        featured: Optional[bool] = None,
+    ) -> List[dict]:
+        """Return every post matching the given filters, oldest first"""
+        return self.page(status=status, category_id=category_id, featured=featured)
+
+    def page(
+        self,
+        status: Optional[str] = None,
+        category_id: Optional[int] = None,
+        featured: Optional[bool] = None,
+        after: Optional[SortKey] = None,
+        skip: int = 0,
+        limit: Optional[int] = None,
+        updated_since: Optional[datetime] = None,
+        category_ids: Optional[Collection[int]] = None,
+    ) -> List[dict]:
+        """Return up to limit matching posts ordered by (created_at, id).
+
+        Walks the smallest applicable sorted index starting right after the
+        cursor, checking the remaining filters on each post, so a page costs
+        O(log n + limit) when the filters are served by the index. A set of
+        categories is served by merging their per-category indexes.
+        """
+        # Each candidate is a group of indexes whose merge covers the result
+        candidates = [[self._order]]
+        if status is not None:
+            candidates.append([self._by_status.get(status)])
+        if category_id is not None:
+            candidates.append([self._by_category.get(category_id)])
+        if featured is True:
+            candidates.append([self._featured])
+        if category_ids is not None:
+            candidates.append([self._by_category[c] for c in category_ids if c in self._by_category])
+        if any(index is None for group in candidates for index in group):
+            return []
+        group = min(candidates, key=lambda group: sum(len(index) for index in group))
+
+        if after is not None:
+            ranges = [index.irange(minimum=after, inclusive=(False, True)) for index in group]
+        else:
+            ranges = [iter(index) for index in group]
+        keys = ranges[0] if len(ranges) == 1 else heapq.merge(*ranges)
+
+        categories = set(category_ids) if category_ids is not None else None
+        posts = []
+        for _, post_id in keys:
+            post = self._posts[post_id]
+            if ((status is not None and post["status"] != status) or
+                    (category_id is not None and post["category_id"] != category_id) or
+                    (categories is not None and post["category_id"] not in categories) or
+                    (featured is not None and post["is_featured"] != featured) or
+                    (updated_since is not None and post["updated_at"] < updated_since)):
+                continue
+            if skip:
+                skip -= 1
+                continue
+            posts.append(post)
+            if limit is not None and len(posts) >= limit:
+                break
+        return posts
+
+    def published_counts(self, category_ids: Iterable[int]) -> Dict[int, int]:
+        """Published posts per category, read from the feed index sizes"""
+        return {
+            category_id: len(self._published_by.get(("category_id", category_id), ()))
+            for category_id in category_ids
+        }
+
+    def recent(
+        self,
+        limit: int,
+        category_id: Optional[int] = None,
+        author_id: Optional[int] = None,
+        featured: Optional[bool] = None,
+    ) -> List[dict]:
+        """Return the limit most recently published posts matching the filters"""
+        filters = {"category_id": category_id, "author_id": author_id, "is_featured": featured}
+        filters = {field: value for field, value in filters.items() if value is not None}
+
+        index = self._published
+        if filters:
+            indexes = [self._published_by.get((field, value)) for field, value in filters.items()]
+            if any(i is None for i in indexes):
+                return []
+            index = min(indexes, key=len)
+
+        posts = []
+        for _, post_id in reversed(index):
+            post = self._posts[post_id]
+            if all(post[field] == value for field, value in filters.items()):
+                posts.append(post)
+                if len(posts) >= limit:
+                    break
+        return posts
+
+    def _index_keys(self, post: dict) -> Iterator[Tuple[SortedList, SortKey]]:
+        """Every sorted index the post belongs to, with its key there"""
+        key = sort_key(post)
+        yield self._order, key
+        yield self._by_status.setdefault(post["status"], SortedList()), key
+        yield self._by_category.setdefault(post["category_id"], SortedList()), key
+        if post["is_featured"]:
+            yield self._featured, key
+
+        if post["status"] == "published":
+            key = published_key(post)
+            yield self._published, key
+            for field in FEED_FIELDS:
+                yield self._published_by.setdefault((field, post[field]), SortedList()), key
+
+    def _index(self, post: dict):
+        self._by_slug[post["slug"]] = post["id"]
+        for index, key in self._index_keys(post):
+            index.add(key)
+
+    def _index_many(self, posts: List[dict]):
+        # Group keys per index so each SortedList is merged once
+        pending: Dict[int, Tuple[SortedList, List[SortKey]]] = {}
+        for post in posts:
+            self._by_slug[post["slug"]] = post["id"]
+            for index, key in self._index_keys(post):
+                pending.setdefault(id(index), (index, []))[1].append(key)
+        for index, keys in pending.values():
+            index.update(keys)
+
+    def _unindex(self, post: dict):
+        key = sort_key(post)
+        if self._by_slug.get(post["slug"]) == post["id"]:
+            del self._by_slug[post["slug"]]
+        self._order.discard(key)
+        self._discard(self._by_status, post["status"], key)
+        self._discard(self._by_category, post["category_id"], key)
+        self._featured.discard(key)
+
+        if post["status"] == "published":
+            key = published_key(post)
+            self._published.discard(key)
+            for field in FEED_FIELDS:
+                self._discard(self._published_by, (field, post[field]), key)
+
+    @staticmethod
+    def _discard(index: Dict, value, key: SortKey):
+        bucket = index.get(value)
+        if bucket is None:
+            return
+        bucket.discard(key)
+        if not bucket:
+            del index[value]
@@ -0,0 +1,186 @@
+import math
+import re
+from bisect import bisect_left, insort
+from collections import defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+
+# Arabic diacritics (tashkeel), superscript alef and tatweel
+DIACRITICS = re.compile("[\u0610-\u061A\u064B-\u065F\u0670\u06D6-\u06ED\u0640]")
+CHAR_MAP = str.maketrans({
+    "أ": "ا", "إ": "ا", "آ": "ا", "ٱ": "ا",
+    "ى": "ي",
+    "ة": "ه",
+})
+TOKEN = re.compile(r"\w+\*?")
+ARABIC_LETTERS = re.compile("[\u0621-\u064A]")
+
+# Light10-style affixes (after normalization, so ة is already ه)
+ARABIC_PREFIXES = ("وال", "بال", "كال", "فال", "لل", "ال", "و")
+ARABIC_SUFFIXES = ("ها", "ان", "ات", "ون", "ين", "يه", "ه", "ي")
+
+def normalize(text: str) -> str:
+    """Case-fold and remove Arabic diacritics, tatweel and letter variants"""
+    return DIACRITICS.sub("", text).translate(CHAR_MAP).casefold()
+
+def strip_prefix(word: str, min_length: int = 3) -> str:
+    if ARABIC_LETTERS.match(word):
+        for prefix in ARABIC_PREFIXES:
+            if word.startswith(prefix) and len(word) - len(prefix) >= min_length:
+                return word[len(prefix):]
+    return word
+
+def stem(word: str) -> str:
+    """Light stemming: drop one leading article/conjunction and common suffixes"""
+    if not ARABIC_LETTERS.match(word):
+        return word
+    word = strip_prefix(word)
+    stripped = True
+    while stripped:
+        stripped = False
+        for suffix in ARABIC_SUFFIXES:
+            if word.endswith(suffix) and len(word) - len(suffix) >= 2:
+                word = word[:-len(suffix)]
+                stripped = True
+                break
+    return word
+
+def tokenize(text: Optional[str]) -> List[str]:
+    if not text:
+        return []
+    return [stem(token) for token in TOKEN.findall(normalize(text)) if not token.endswith("*")]
+
+class SearchIndex:
+    """Incrementally maintained inverted index ranked with BM25.
+
+    Each field is tokenized separately and weighted (a title hit counts more
+    than a content hit). Postings map term -> {doc_id: weighted tf}; a sorted
+    vocabulary lets "term*" (and an unmatched last query word) expand as a
+    prefix.
+    """
+
+    K1 = 1.2
+    B = 0.75
+    MAX_EXPANSIONS = 50
+
+    def __init__(self, fields: Dict[str, float]):
+        self.fields = fields
+        self._postings: Dict[str, Dict[int, float]] = defaultdict(dict)
+        self._doc_terms: Dict[int, Dict[str, float]] = {}
+        self._doc_length: Dict[int, float] = {}
+        self._total_length = 0.0
+        self._vocabulary: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self._doc_terms)
+
+    def add(self, doc_id: int, doc: dict):
+        """Index a document, replacing any previous version"""
+        self.remove(doc_id)
+
+        terms: Dict[str, float] = defaultdict(float)
+        for field, weight in self.fields.items():
+            for term in tokenize(doc.get(field)):
+                terms[term] += weight
+
+        for term, tf in terms.items():
+            postings = self._postings[term]
+            if not postings:
+                insort(self._vocabulary, term)
+            postings[doc_id] = tf
+
+        length = sum(terms.values())
+        self._doc_terms[doc_id] = terms
+        self._doc_length[doc_id] = length
+        self._total_length += length
+
+    def remove(self, doc_id: int):
+        terms = self._doc_terms.pop(doc_id, None)
+        if terms is None:
+            return
+
+        for term in terms:
+            postings = self._postings[term]
+            postings.pop(doc_id, None)
+            if not postings:
+                del self._postings[term]
+                position = bisect_left(self._vocabulary, term)
+                if position < len(self._vocabulary) and self._vocabulary[position] == term:
+                    del self._vocabulary[position]
+        self._total_length -= self._doc_length.pop(doc_id)
+
+    def search(self, query: str) -> List[Tuple[int, float]]:
+        """Return (doc_id, score) pairs matching every query word, best first"""
+        words = TOKEN.findall(normalize(query))
+        if not words:
+            return []
+
+        # Each query word becomes a group of terms; documents must hit every group
+        groups: List[Set[str]] = []
+        for position, word in enumerate(words):
+            if word.endswith("*"):
+                group = self._expand(word[:-1])
+            else:
+                group = {stem(word)} & self._postings.keys()
+                if not group and position == len(words) - 1:
+                    # The last word may still be being typed
+                    group = self._expand(word)
+            if not group:
+                return []
+            groups.append(group)
+
+        candidates = self._match_all(groups)
+        if not candidates:
+            return []
+
+        doc_count = len(self._doc_terms)
+        avg_length = (self._total_length / doc_count) or 1.0
+        k1, b = self.K1, self.B
+        doc_length = self._doc_length
+        scores: Dict[int, float] = defaultdict(float)
+        for group in groups:
+            for term in group:
+                postings = self._postings[term]
+                idf = math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+                if len(candidates) <= len(postings):
+                    matched = [doc_id for doc_id in candidates if doc_id in postings]
+                else:
+                    matched = [doc_id for doc_id in postings if doc_id in candidates]
+                for doc_id in matched:
+                    tf = postings[doc_id]
+                    norm = k1 * (1 - b + b * doc_length[doc_id] / avg_length)
+                    scores[doc_id] += idf * tf * (k1 + 1) / (tf + norm)
+
+        return sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+
+    def _expand(self, word: str) -> Set[str]:
+        """Vocabulary terms starting with word, with or without its article"""
+        terms: Set[str] = set()
+        for prefix in {word, strip_prefix(word, min_length=2)}:
+            if not prefix:
+                continue
+            start = bisect_left(self._vocabulary, prefix)
+            for term in self._vocabulary[start:start + self.MAX_EXPANSIONS]:
+                if not term.startswith(prefix):
+                    break
+                terms.add(term)
+        return terms
+
+    def _match_all(self, groups: List[Set[str]]) -> Set[int]:
+        """Intersect the groups' posting lists, starting from the rarest"""
+        doc_sets = []
+        for group in groups:
+            if len(group) == 1:
+                doc_sets.append(self._postings[next(iter(group))].keys())
+            else:
+                docs: Set[int] = set()
+                for term in group:
+                    docs.update(self._postings[term])
+                doc_sets.append(docs)
+
+        doc_sets.sort(key=len)
+        result = set(doc_sets[0])
+        for docs in doc_sets[1:]:
+            result.intersection_update(docs)
+            if not result:
+                break
+        return result
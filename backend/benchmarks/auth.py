@@ -0,0 +1,53 @@
+"""Per-request authentication cost with and without the token cache.
+
+Run from backend/:
+
+    python -m benchmarks.auth [--calls 20000]
+
+Calls get_current_user directly against the in-memory user repository,
+so the numbers are the dependency's own cost: HS256 verification, the
+revocation check and the user lookup when uncached, a digest and an LRU
+hit when cached.
+"""
+import argparse
+import asyncio
+import time
+from fastapi.security import HTTPAuthorizationCredentials
+from app.api.auth import create_access_token, get_current_user, memory_user_repository, mock_users_db
+from app.core.token_cache import token_cache
+
+async def per_call(credentials: HTTPAuthorizationCredentials, calls: int) -> float:
+    """Mean seconds per get_current_user call"""
+    started = time.perf_counter()
+    for _ in range(calls):
+        await get_current_user(credentials, memory_user_repository)
+    return (time.perf_counter() - started) / calls
+
+async def run(calls: int):
+    email = next(iter(mock_users_db))
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=create_access_token({"sub": email}))
+
+    max_entries = token_cache.max_entries
+    token_cache.clear()
+    token_cache.max_entries = 0  # set() stores nothing, every call verifies
+    try:
+        await per_call(credentials, calls // 10)
+        uncached = await per_call(credentials, calls)
+    finally:
+        token_cache.max_entries = max_entries
+
+    await per_call(credentials, calls // 10)
+    cached = await per_call(credentials, calls)
+
+    print(f"uncached (HS256 decode + lookup): {uncached * 1e6:.1f} us")
+    print(f"cached:                           {cached * 1e6:.1f} us")
+    print(f"speedup:                          {uncached / cached:.0f}x")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=20000)
+    args = parser.parse_args()
+    asyncio.run(run(args.calls))
+
+if __name__ == "__main__":
+    main()
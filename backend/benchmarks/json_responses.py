@@ -0,0 +1,74 @@
+"""Requests per second on GET /api/posts/?limit=100 with FAST_JSON off and on.
+
+Run from backend/:
+
+    python -m benchmarks.json_responses [--requests 1000] [--posts 100]
+
+FAST_JSON is read when the routers are built, so each mode runs in its
+own process: the store is filled to --posts posts, the app is served
+in-process through an httpx ASGI client with identity encoding, and the
+timed requests follow a warm-up. The bodies of both modes must decode to
+the same JSON.
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+async def measure(requests: int, posts: int) -> dict:
+    import httpx
+    import main
+    from app.api.posts import post_store
+
+    # Fixed timestamps, so both processes serve the same bodies
+    stamp = datetime(2024, 1, 1)
+    for post in list(post_store):
+        post_store.update(post["id"], {"created_at": stamp, "updated_at": stamp, "published_at": stamp})
+    template = next(iter(post_store))
+    while len(post_store) < posts:
+        post_id = post_store.next_id()
+        post_store.add(dict(template, id=post_id, slug=f"benchmark-{post_id}", tags=list(template["tags"])))
+
+    url = f"/api/posts/?limit={min(posts, 100)}"
+    headers = {"Accept-Encoding": "identity"}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://test") as client:
+        for _ in range(max(10, requests // 10)):
+            response = await client.get(url, headers=headers)
+            response.raise_for_status()
+        started = time.perf_counter()
+        for _ in range(requests):
+            await client.get(url, headers=headers)
+        elapsed = time.perf_counter() - started
+    return {"rps": requests / elapsed, "body": response.json()}
+
+def run_mode(fast: bool, requests: int, posts: int) -> dict:
+    env = dict(os.environ, FAST_JSON=str(fast).lower(), DATABASE_URL="")
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.json_responses", "--child", "--requests", str(requests), "--posts", str(posts)],
+        env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--posts", type=int, default=100)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(asyncio.run(measure(args.requests, args.posts)), default=str))
+        return
+
+    slow = run_mode(False, args.requests, args.posts)
+    fast = run_mode(True, args.requests, args.posts)
+    print(f"FAST_JSON=false  {slow['rps']:.0f} req/s")
+    print(f"FAST_JSON=true   {fast['rps']:.0f} req/s")
+    print(f"responses identical: {slow['body'] == fast['body']}")
+
+if __name__ == "__main__":
+    main()
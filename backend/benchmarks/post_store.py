@@ -0,0 +1,70 @@
+"""Post lookup latency of PostStore against a linear scan, by store size.
+
+Run from backend/:
+
+    python -m benchmarks.post_store [--sizes 10,1000,100000,1000000] [--lookups 1000]
+
+Each lookup hits a random existing post. The linear scan is the
+next((p for p in posts if ...)) lookup the routers used before PostStore,
+skipped above --scan-limit posts.
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+from app.stores.posts import PostStore
+
+def make_posts(count: int) -> list:
+    start = datetime(2024, 1, 1)
+    return [{
+        "id": post_id,
+        "title": f"Post {post_id}",
+        "slug": f"post-{post_id}",
+        "status": "published" if post_id % 4 else "draft",
+        "author_id": post_id % 50 + 1,
+        "category_id": post_id % 20 + 1,
+        "is_featured": post_id % 10 == 0,
+        "published_at": start + timedelta(seconds=post_id),
+        "created_at": start + timedelta(seconds=post_id),
+        "updated_at": start + timedelta(seconds=post_id)
+    } for post_id in range(1, count + 1)]
+
+def per_call(lookup, keys) -> float:
+    """Mean seconds per call over keys"""
+    started = time.perf_counter()
+    for key in keys:
+        lookup(key)
+    return (time.perf_counter() - started) / len(keys)
+
+def format_time(seconds: float) -> str:
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.1f} {unit}"
+    return f"{seconds / 1e-9:.0f} ns"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="10,1000,100000,1000000")
+    parser.add_argument("--lookups", type=int, default=1000)
+    parser.add_argument("--scan-limit", type=int, default=100000)
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    print(f"{'posts':>10}  {'get(id)':>10}  {'get_by_slug':>12}  {'linear scan':>12}")
+    for size in (int(size) for size in args.sizes.split(",")):
+        posts = make_posts(size)
+        store = PostStore(posts)
+        ids = [rng.randint(1, size) for _ in range(args.lookups)]
+        slugs = [f"post-{post_id}" for post_id in ids]
+
+        by_id = per_call(store.get, ids)
+        by_slug = per_call(store.get_by_slug, slugs)
+        scan = "-"
+        if size <= args.scan_limit:
+            # Fewer scans on big lists; each one is already milliseconds
+            sample = ids[:max(10, args.lookups * 1000 // size)]
+            scan = format_time(per_call(lambda post_id: next((p for p in posts if p["id"] == post_id), None), sample))
+        print(f"{size:>10,}  {format_time(by_id):>10}  {format_time(by_slug):>12}  {scan:>12}")
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,24 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import Depends, FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse
 import uvicorn
 import os
 from dotenv import load_dotenv
 
 # Import API routers
-from app.api import auth, posts, categories, users, comments, ai
+from app.api import auth, posts, categories, users, comments, ai, export, media
 from app.core.config import settings
+from app.core import database, images, passwords
+from app.core.ai_client import ai_client
+from app.core.ai_usage import ai_usage
+from app.core.compression import CompressionMiddleware
+from app.core.conditional import ConditionalGetMiddleware
+from app.core.counters import counter_buffer
+from app.core.pagination import NEXT_CURSOR_HEADER
+from app.core.revocation import revocation_list
+from app.core.static import MediaFiles
+from app.repositories.ai_interactions import flush_ai_interactions
+from app.repositories.posts import flush_post_counters
 
 # Load environment variables
 load_dotenv()
@@ -19,7 +29,8 @@ app = FastAPI(
     description="Professional Blog with AI Features - مدونة احترافية مع ميزات الذكاء الاصطناعي",
     version=settings.VERSION,
     docs_url="/api/docs",
-    redoc_url="/api/redoc"
+    redoc_url="/api/redoc",
+    default_response_class=ORJSONResponse if settings.FAST_JSON else JSONResponse
 )
 
 # CORS middleware
@@ -29,12 +40,21 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, "ETag", "Content-Range", "Accept-Ranges"],
 )
 
-# Mount static files
+# ETag / 304 handling for GET responses
+if settings.CONDITIONAL_GET:
+    app.add_middleware(ConditionalGetMiddleware)
+
+# gzip/brotli/zstd; outermost so ETags and 304s are settled first
+if settings.COMPRESSION:
+    app.add_middleware(CompressionMiddleware)
+
+# Mount uploaded media (byte ranges, precompressed siblings, immutable caching)
 if not os.path.exists(settings.UPLOAD_DIR):
     os.makedirs(settings.UPLOAD_DIR)
-app.mount("/uploads", StaticFiles(directory=settings.UPLOAD_DIR), name="uploads")
+app.mount("/uploads", MediaFiles(directory=settings.UPLOAD_DIR, hidden=("tmp",)), name="uploads")
 
 @app.get("/")
 async def root():
@@ -65,24 +85,72 @@ async def health_check():
         }
     }
 
+@app.on_event("startup")
+async def startup():
+    """Load revoked tokens and connect to the database when DATABASE_URL is configured"""
+    await revocation_list.start()
+    await auth.hash_seed_passwords()
+    # Made now so the first login for an unknown email isn't slower than the rest
+    await passwords.dummy_hash()
+    
+    if not database.init_engine():
+        return
+    
+    if settings.DB_CREATE_TABLES:
+        from app.models import User, Category, Post, Comment
+        await database.create_tables()
+        await database.seed_database({
+            User: list(auth.mock_users_db.values()),
+            Category: categories.mock_categories_db,
+            Post: list(posts.post_store),
+            Comment: comments.mock_comments_db
+        })
+    
+    if settings.BUFFER_COUNTERS:
+        await counter_buffer.start(flush_post_counters)
+    
+    await ai_usage.start(flush_ai_interactions)
+
+@app.on_event("shutdown")
+async def shutdown():
+    # Flush buffered counters before the connection pool goes away
+    await counter_buffer.stop()
+    # Let in-flight image jobs record their results while the database is up
+    await images.shutdown()
+    await ai_client.stop()
+    # After the AI calls above have been accounted
+    await ai_usage.stop()
+    await revocation_list.stop()
+    await database.dispose_engine()
+    passwords.shutdown()
+
 # Include API routers
 app.include_router(auth.router, prefix="/api")
 app.include_router(posts.router, prefix="/api")
 app.include_router(categories.router, prefix="/api")
 app.include_router(users.router, prefix="/api")
 app.include_router(comments.router, prefix="/api")
+app.include_router(comments.post_comments_router, prefix="/api")
 app.include_router(ai.router, prefix="/api")
+app.include_router(export.router, prefix="/api")
+app.include_router(media.router, prefix="/api")
 
 # Additional endpoints
 @app.get("/api/stats")
-async def get_stats():
+async def get_stats(
+    post_repository = Depends(posts.get_post_repository),
+    category_repository = Depends(categories.get_category_repository),
+    user_repository = Depends(auth.get_user_repository),
+    comment_repository = Depends(comments.get_comment_repository)
+):
     """Get basic API statistics"""
     return {
-        "total_posts": 3,
-        "total_categories": 5,
-        "total_users": 1,
-        "total_comments": 3,
-        "ai_requests_today": 0,
+        "total_posts": await post_repository.count(),
+        "total_categories": await category_repository.count(),
+        "total_users": await user_repository.count(),
+        "total_comments": await comment_repository.count(),
+        # This worker's calls since midnight UTC, from the usage rollups
+        "ai_requests_today": sum(rollup.calls for rollup in ai_usage.totals("today").values()),
         "api_version": settings.VERSION
     }
 
@@ -0,0 +1,51 @@
+import itertools
+from datetime import datetime
+import httpx
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+import main
+from app.core.database import Base
+from app.api.auth import create_access_token, memory_user_repository
+
+_user_numbers = itertools.count(1)
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+@pytest.fixture
+async def client():
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://test") as client:
+        yield client
+
+@pytest.fixture
+def make_user():
+    """Add a user to the in-memory store; returns (user, auth headers)"""
+    async def make(role: str = "user"):
+        number = next(_user_numbers)
+        now = datetime.now()
+        user = await memory_user_repository.create({
+            "username": f"{role}{number}",
+            "email": f"{role}{number}@test.invalid",
+            "password": "unused",
+            "first_name": role.title(),
+            "last_name": str(number),
+            "role": role,
+            "is_active": True,
+            "is_verified": True,
+            "created_at": now,
+            "updated_at": now
+        })
+        token = create_access_token({"sub": user["email"]})
+        return user, {"Authorization": f"Bearer {token}"}
+    return make
+
+@pytest.fixture
+async def sql_session(tmp_path):
+    """A session on an empty SQLite database with every table created"""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'test.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with async_sessionmaker(engine, expire_on_commit=False)() as session:
+        yield session
+    await engine.dispose()
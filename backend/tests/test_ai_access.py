@@ -0,0 +1,22 @@
+import pytest
+from app.core.config import settings
+
+pytestmark = pytest.mark.anyio
+
+async def test_ai_routes_need_a_signed_in_user(client):
+    response = await client.post("/api/ai/translate", json={"text": "hello"})
+    assert response.status_code in (401, 403)
+    assert (await client.get("/api/ai/analytics")).status_code in (401, 403)
+
+async def test_mock_provider_runs_without_the_feature_flag(client, make_user, monkeypatch):
+    monkeypatch.setattr(settings, "ENABLE_AI_FEATURES", False)
+    _, headers = await make_user()
+    response = await client.post("/api/ai/translate", headers=headers, json={"text": "hello"})
+    assert response.status_code == 200
+
+async def test_paid_provider_is_off_until_enabled(client, make_user, monkeypatch):
+    monkeypatch.setattr(settings, "AI_PROVIDER", "openai")
+    monkeypatch.setattr(settings, "ENABLE_AI_FEATURES", False)
+    _, headers = await make_user()
+    response = await client.post("/api/ai/text-to-speech", headers=headers, json={"text": "hello"})
+    assert response.status_code == 503
@@ -0,0 +1,53 @@
+import json
+import pytest
+from app.core import ai_fake
+from app.core.ai_client import AIClient
+from app.core.config import settings
+
+pytestmark = pytest.mark.anyio
+
+@pytest.fixture
+async def fake_provider(monkeypatch):
+    """Route the AI endpoints to app/core/ai_fake.py, uncached and with no added latency"""
+    from app.api import ai
+    monkeypatch.setattr(settings, "AI_PROVIDER", "fake")
+    monkeypatch.setattr(settings, "AI_FAKE_LATENCY", 0)
+    monkeypatch.setattr(settings, "AI_CACHE", False)
+    client = AIClient()
+    monkeypatch.setattr(ai, "ai_client", client)
+    ai_fake.calls.clear()
+    yield ai_fake.calls
+    await client.stop()
+
+def lines(response) -> list:
+    return [json.loads(line) for line in response.text.splitlines()]
+
+async def test_batch_runs_items_in_order(client, make_user, fake_provider):
+    _, headers = await make_user()
+    response = await client.post("/api/ai/batch", headers=headers, json={"items": [
+        {"type": "translate", "text": "one"},
+        {"type": "grammar_check", "text": "two"},
+        {"type": "translate", "text": "one"}
+    ]})
+    results = lines(response)
+    assert [(r["index"], r["status"]) for r in results] == [(0, "ok"), (1, "ok"), (2, "ok")]
+    # The repeated item ran once
+    assert fake_provider["/v1/chat/completions"] == 2
+
+async def test_oversized_items_fail_before_any_call(client, make_user, fake_provider, monkeypatch):
+    monkeypatch.setattr(settings, "AI_MAX_INPUT_CHARS", 10)
+    monkeypatch.setattr(settings, "AI_MAX_TEXT_CHARS", 50)
+    monkeypatch.setattr(settings, "AI_BATCH_MAX_CHARS", 60)
+    _, headers = await make_user()
+    results = lines(await client.post("/api/ai/batch", headers=headers, json={"items": [
+        {"type": "translate", "text": "x" * 51},
+        {"type": "generate_content", "prompt": "p" * 11},
+        {"type": "translate", "text": "aaaa bbbb cccc dddd eeee ffff gggg hhhh "},
+        {"type": "grammar_check", "text": "f g h i j " * 4}
+    ]}))
+    assert [r["status"] for r in results] == ["error", "error", "ok", "error"]
+    assert results[0]["detail"] == "Text exceeds 50 characters"
+    assert results[1]["detail"] == "Prompt exceeds 10 characters"
+    assert results[3]["detail"] == "Batch exceeds 60 characters of input"
+    # Only the one item within both limits reached the provider, in 10-character chunks
+    assert fake_provider["/v1/chat/completions"] == 4
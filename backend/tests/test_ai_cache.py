@@ -0,0 +1,30 @@
+import time
+from app.core.ai_cache import MemoryTier, cache_key
+
+def test_translation_keys_ignore_spacing_and_code_case():
+    a = cache_key("translation", "m", {"text": "Hello   world\r\n", "target_language": "EN"})
+    b = cache_key("translation", "m", {"text": "Hello world", "target_language": "en"})
+    assert a == b
+
+def test_grammar_check_keys_keep_exact_text():
+    a = cache_key("grammar_check", "m", {"text": "Hello  world", "language": "EN"})
+    b = cache_key("grammar_check", "m", {"text": "Hello world", "language": "en"})
+    c = cache_key("grammar_check", "m", {"text": "Hello  world", "language": "en"})
+    assert a != b
+    assert a == c
+
+def test_keys_depend_on_feature_and_model():
+    payload = {"text": "Hello"}
+    assert cache_key("translation", "m1", payload) != cache_key("translation", "m2", payload)
+    assert cache_key("translation", "m1", payload) != cache_key("grammar_check", "m1", payload)
+
+def test_memory_tier_evicts_least_recently_used_and_expired():
+    tier = MemoryTier(max_entries=2)
+    later = time.time() + 60
+    tier.set("a", {"n": 1}, later)
+    tier.set("b", {"n": 2}, later)
+    assert tier.get("a") == {"n": 1}
+    tier.set("c", {"n": 3}, later)
+    assert tier.get("b") is None
+    tier.set("old", {"n": 4}, time.time() - 1)
+    assert tier.get("old") is None
@@ -0,0 +1,115 @@
+import asyncio
+import httpx
+import pytest
+from fastapi import HTTPException
+from app.core import ai_client as ai_client_module, ai_fake
+from app.core.ai_client import AIClient, OpenAIBackend
+from app.core.ai_usage import AIUsageLedger
+from app.core.config import settings
+
+pytestmark = pytest.mark.anyio
+
+CHAT = "/v1/chat/completions"
+
+def translation(text: str = "hello") -> dict:
+    return {"text": text, "source_language": "en", "target_language": "ar"}
+
+class ScriptedRandom:
+    """Stands in for the fake provider's random module: fails the calls listed, with the given status"""
+
+    def __init__(self, *outcomes: int):
+        self.draws = []
+        for status in outcomes:
+            # A failure draws twice: below the error rate, then 429 below 0.5 or 503 above
+            self.draws += [0.0, 0.1 if status == 429 else 0.9] if status else [0.99]
+
+    def random(self) -> float:
+        return self.draws.pop(0) if self.draws else 0.99
+
+@pytest.fixture
+async def ai(monkeypatch):
+    """An AIClient on app/core/ai_fake.py, uncached and with no retry delays"""
+    monkeypatch.setattr(settings, "AI_PROVIDER", "fake")
+    monkeypatch.setattr(settings, "AI_FAKE_LATENCY", 0)
+    monkeypatch.setattr(settings, "AI_FAKE_ERROR_RATE", 0.5)
+    monkeypatch.setattr(settings, "AI_RETRY_BASE_DELAY", 0)
+    monkeypatch.setattr(settings, "AI_MAX_RETRIES", 3)
+    monkeypatch.setattr(settings, "AI_CACHE", False)
+    monkeypatch.setattr(ai_fake, "random", ScriptedRandom())
+    ai_fake.calls.clear()
+    client = AIClient()
+    yield client
+    await client.stop()
+
+async def test_retries_rate_limits_and_overloads(ai, monkeypatch):
+    monkeypatch.setattr(ai_fake, "random", ScriptedRandom(503, 429, 0))
+    result = await ai.run("translation", translation())
+    assert result["translated_text"]
+    assert ai_fake.calls[CHAT] == 3
+
+async def test_gives_up_after_max_retries(ai, monkeypatch):
+    monkeypatch.setattr(ai_fake, "random", ScriptedRandom(503, 503, 503, 503, 0))
+    with pytest.raises(HTTPException) as error:
+        await ai.run("translation", translation())
+    assert error.value.status_code == 502
+    assert ai_fake.calls[CHAT] == settings.AI_MAX_RETRIES + 1
+
+async def test_identical_calls_share_one_provider_call(ai, monkeypatch):
+    ledger = AIUsageLedger()
+    monkeypatch.setattr(ai_client_module, "ai_usage", ledger)
+    monkeypatch.setattr(settings, "AI_FAKE_LATENCY", 0.05)
+    results = await asyncio.gather(
+        *(ai.run("translation", translation()) for _ in range(5)),
+        ai.run("translation", translation("other"))
+    )
+    assert ai_fake.calls[CHAT] == 2
+    # The caller that made the call is the only uncached one, in the response and the ledger
+    assert [result["cached"] for result in results] == [False, True, True, True, True, False]
+    assert all(dict(result, cached=False) == results[0] for result in results[:5])
+    assert ledger.totals("hour")["translation"].cached == 4
+    assert results[5]["translated_text"] != results[0]["translated_text"]
+
+    # Once landed, the same request is a new call
+    await ai.run("translation", translation())
+    assert ai_fake.calls[CHAT] == 3
+
+async def test_a_caller_leaving_does_not_cancel_the_shared_call(ai, monkeypatch):
+    monkeypatch.setattr(settings, "AI_FAKE_LATENCY", 0.05)
+    leaving = asyncio.ensure_future(ai.run("translation", translation()))
+    staying = asyncio.ensure_future(ai.run("translation", translation()))
+    await asyncio.sleep(0.01)
+    leaving.cancel()
+    result = await staying
+    assert result["translated_text"]
+    assert leaving.cancelled()
+    assert ai_fake.calls[CHAT] == 1
+
+async def test_shared_call_failure_reaches_every_caller(ai, monkeypatch):
+    monkeypatch.setattr(settings, "AI_MAX_RETRIES", 0)
+    monkeypatch.setattr(ai_fake, "random", ScriptedRandom(503))
+    results = await asyncio.gather(*(ai.run("translation", translation()) for _ in range(3)), return_exceptions=True)
+    assert [getattr(result, "status_code", None) for result in results] == [502, 502, 502]
+    assert ai_fake.calls[CHAT] == 1
+
+@pytest.mark.parametrize("feature,payload", [
+    ("translation", translation()),
+    ("image_generation", {"prompt": "a cat", "size": "256x256"}),
+    ("speech_to_text", {"file_path": "clip.mp3"}),
+])
+@pytest.mark.parametrize("body", [b"<html>Bad gateway</html>", b"{}", b'{"choices": [], "data": [], "text": null}', b"[]"])
+async def test_unexpected_provider_bodies_are_recorded_failures(monkeypatch, tmp_path, feature, payload, body):
+    monkeypatch.setattr(settings, "AI_CACHE", False)
+    monkeypatch.setattr(settings, "UPLOAD_DIR", str(tmp_path))
+    (tmp_path / "clip.mp3").write_bytes(b"audio")
+    ledger = AIUsageLedger()
+    monkeypatch.setattr(ai_client_module, "ai_usage", ledger)
+
+    transport = httpx.MockTransport(lambda request: httpx.Response(200, content=body))
+    client = AIClient(backend=OpenAIBackend(), transport=transport)
+    try:
+        with pytest.raises(HTTPException) as error:
+            await client.run(feature, payload)
+    finally:
+        await client.stop()
+    assert error.value.status_code == 502
+    assert ledger.totals("hour")[feature].errors == 1
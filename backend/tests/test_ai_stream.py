@@ -0,0 +1,65 @@
+import json
+import httpx
+import pytest
+from app.core.ai_client import AIClient, OpenAIBackend
+from app.core.config import settings
+
+pytestmark = pytest.mark.anyio
+
+PAYLOAD = {"prompt": "streams", "content_type": "article", "language": "en"}
+
+def chunk(text: str) -> str:
+    return "data: " + json.dumps({"model": "test-model", "choices": [{"delta": {"content": text}}]})
+
+@pytest.fixture
+async def provider(monkeypatch):
+    """serve(*lines) points the API at a provider streaming those SSE lines"""
+    from app.api import ai
+    monkeypatch.setattr(settings, "ENABLE_AI_FEATURES", True)
+    monkeypatch.setattr(settings, "AI_CACHE", False)
+    clients = []
+
+    def serve(*lines: str):
+        body = "".join(line + "\n\n" for line in lines).encode()
+        transport = httpx.MockTransport(lambda request: httpx.Response(200, content=body))
+        client = AIClient(backend=OpenAIBackend(), transport=transport)
+        monkeypatch.setattr(ai, "ai_client", client)
+        clients.append(client)
+
+    yield serve
+    for client in clients:
+        await client.stop()
+
+def events(response) -> list:
+    parsed = []
+    for block in response.text.strip().split("\n\n"):
+        event, data = block.split("\n")
+        parsed.append((event[len("event: "):], json.loads(data[len("data: "):])))
+    return parsed
+
+async def test_stream_relays_tokens(client, make_user, provider):
+    _, headers = await make_user()
+    provider(chunk("Hello"), chunk(" world"), "data: [DONE]")
+    response = await client.post("/api/ai/generate-content/stream", headers=headers, json=PAYLOAD)
+    received = events(response)
+    assert received[:2] == [("token", {"text": "Hello"}), ("token", {"text": " world"})]
+    assert received[2][0] == "done"
+    assert received[2][1]["generated_content"] == "Hello world"
+
+@pytest.mark.parametrize("malformed", ["data: {not json", "data: 42"])
+async def test_malformed_chunk_ends_stream_with_error_event(client, make_user, provider, malformed):
+    _, headers = await make_user()
+    provider(chunk("Hello"), malformed, chunk(" world"), "data: [DONE]")
+    response = await client.post("/api/ai/generate-content/stream", headers=headers, json=PAYLOAD)
+    assert response.status_code == 200
+    assert events(response) == [
+        ("token", {"text": "Hello"}),
+        ("error", {"detail": "AI provider stream was interrupted"})
+    ]
+
+async def test_malformed_first_chunk_is_a_502(client, make_user, provider):
+    _, headers = await make_user()
+    provider("data: {not json", "data: [DONE]")
+    response = await client.post("/api/ai/generate-content/stream", headers=headers, json=PAYLOAD)
+    assert response.status_code == 502
+    assert response.json()["detail"] == "AI provider stream was interrupted"
@@ -0,0 +1,197 @@
+import math
+import random
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from app.core import ai_usage as ai_usage_module, database
+from app.core.ai_usage import RESOLUTIONS, AIUsageLedger, LatencyHistogram, UsageRecord
+from app.models.ai_interaction import AIInteraction
+from app.repositories.ai_interactions import flush_ai_interactions
+
+pytestmark = pytest.mark.anyio
+
+# A Monday at midnight UTC, so every resolution's bucket starts here
+START = 1_700_438_400
+
+class Clock:
+    def __init__(self, now: float = START):
+        self.now = now
+
+    def time(self) -> float:
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(ai_usage_module, "time", clock)
+    return clock
+
+def exact_percentile(values, percent):
+    ordered = sorted(values)
+    return ordered[max(1, math.ceil(percent / 100 * len(ordered))) - 1]
+
+def test_percentiles_are_within_a_few_percent():
+    rng = random.Random(7)
+    latencies = [rng.lognormvariate(5, 1.2) for _ in range(20000)]
+    histogram = LatencyHistogram()
+    for latency in latencies:
+        histogram.record(latency)
+
+    for percent in (1, 10, 50, 90, 99, 99.9, 100):
+        exact = exact_percentile([int(latency * 1000) / 1000 for latency in latencies], percent)
+        assert histogram.percentile(percent) == pytest.approx(exact, rel=0.035)
+    summary = histogram.summary()
+    assert summary["max"] == round(max(int(latency * 1000) for latency in latencies) / 1000, 3)
+    assert summary["mean"] == pytest.approx(sum(latencies) / len(latencies), rel=0.001)
+
+def test_small_latencies_are_exact():
+    histogram = LatencyHistogram()
+    for micros in range(32):
+        histogram.record(micros / 1000)
+    assert histogram.percentile(50) == 0.015
+    assert histogram.percentile(100) == 0.031
+    assert LatencyHistogram().percentile(50) == 0.0
+    assert LatencyHistogram().summary()["mean"] == 0.0
+
+def test_merging_equals_recording_everything():
+    rng = random.Random(3)
+    latencies = [rng.uniform(0, 5000) for _ in range(1000)]
+    whole, first, second = LatencyHistogram(), LatencyHistogram(), LatencyHistogram()
+    for index, latency in enumerate(latencies):
+        whole.record(latency)
+        (first if index % 2 else second).record(latency)
+    first.merge(second)
+    assert first.summary() == whole.summary()
+    assert first.counts == whole.counts
+
+def test_periods_merge_the_buckets_they_span(clock):
+    ledger = AIUsageLedger()
+    for offset, feature, success in [
+        (-2 * 3600, "translation", True),  # outside the last hour
+        (-59 * 60, "translation", False),
+        (-1, "summary", True),
+        (0, "translation", True),
+    ]:
+        clock.now = START + offset
+        ledger.record(feature, "model", 100.0, tokens=10, success=success)
+
+    clock.now = START + 30
+    hour = ledger.totals("hour")
+    assert hour["translation"].calls == 2 and hour["translation"].errors == 1
+    assert hour["summary"].calls == 1
+    assert [point["requests"] for point in ledger.series("hour")] == [1, 1, 1]
+
+    day = ledger.totals("day")
+    assert day["translation"].calls == 3
+    assert sum(point["requests"] for point in ledger.series("day")) == 4
+    # "today" starts at midnight: only the calls from START on
+    assert {feature: rollup.calls for feature, rollup in ledger.totals("today").items()} == {"translation": 1}
+
+def test_old_buckets_are_evicted(clock):
+    ledger = AIUsageLedger()
+    width, keep = RESOLUTIONS["minute"]
+    for minute in range(keep + 10):
+        clock.now = START + minute * width
+        ledger.record("translation", "model", 50.0)
+    minutes = ledger.rollups["minute"]
+    assert len(minutes) == keep
+    assert next(iter(minutes)) == START + 10 * width
+    assert len(ledger.rollups["hour"]) == 3
+
+def record(ledger: AIUsageLedger, count: int, feature: str = "translation"):
+    for _ in range(count):
+        ledger.record(feature, "model", 10.0, tokens=1)
+
+async def test_calls_are_only_buffered_once_a_sink_is_set():
+    ledger = AIUsageLedger(flush_interval=3600)
+    record(ledger, 3)
+    assert ledger.pending == 0
+
+    written = []
+
+    async def sink(batch):
+        written.append(batch)
+
+    await ledger.start(sink)
+    record(ledger, 3)
+    assert ledger.pending == 3
+    await ledger.stop()
+    assert [len(batch) for batch in written] == [3]
+    assert ledger.pending == 0 and not ledger.enabled
+
+async def test_full_ring_drops_the_oldest_and_counts_them():
+    ledger = AIUsageLedger(flush_interval=3600, buffer_size=5, batch_size=2)
+    written = []
+
+    async def sink(batch):
+        written.append(batch)
+
+    await ledger.start(sink)
+    for number in range(8):
+        ledger.record("translation", "model", float(number))
+    assert (ledger.pending, ledger.dropped) == (5, 3)
+
+    await ledger.flush()
+    assert [[r.latency_ms for r in batch] for batch in written] == [[3.0, 4.0], [5.0, 6.0], [7.0]]
+    assert (ledger.pending, ledger.flushed) == (0, 5)
+    await ledger.stop()
+
+async def test_calls_dropped_while_writing_are_neither_lost_twice_nor_rewritten():
+    ledger = AIUsageLedger(flush_interval=3600, buffer_size=5, batch_size=2)
+    written = []
+
+    async def sink(batch):
+        if not written:
+            # New calls push the batch being written, and one more, out of the ring
+            for number in range(5, 8):
+                ledger.record("translation", "model", float(number))
+        written.append(batch)
+
+    await ledger.start(sink)
+    for number in range(5):
+        ledger.record("translation", "model", float(number))
+    await ledger.flush()
+
+    latencies = [r.latency_ms for batch in written for r in batch]
+    assert latencies == [0.0, 1.0, 3.0, 4.0, 5.0, 6.0, 7.0]
+    assert ledger.dropped == 1 and ledger.pending == 0
+    await ledger.stop()
+
+async def test_failed_writes_are_kept_for_the_next_flush(caplog):
+    ledger = AIUsageLedger(flush_interval=3600, batch_size=2)
+    written = []
+    failures = [RuntimeError("database down")]
+
+    async def sink(batch):
+        if failures:
+            raise failures.pop()
+        written.append(batch)
+
+    await ledger.start(sink)
+    record(ledger, 3)
+    await ledger.flush()
+    assert written == [] and ledger.pending == 3 and ledger.flushed == 0
+    assert "keeping 3 calls" in caplog.text
+
+    await ledger.flush()
+    assert [len(batch) for batch in written] == [2, 1]
+    assert ledger.pending == 0 and ledger.flushed == 3
+    await ledger.stop()
+
+async def test_flush_ai_interactions_writes_one_row_per_call(sql_session, monkeypatch):
+    monkeypatch.setattr(database, "SessionLocal", async_sessionmaker(sql_session.bind, expire_on_commit=False))
+    records = [
+        UsageRecord("translation", "gpt", 123.6, 40, 0.0012345678, True, False, START),
+        UsageRecord("image_generation", None, 2000.0, 0, 0.04, False, True, START + 1),
+    ]
+    await flush_ai_interactions(records)
+
+    rows = (await sql_session.scalars(select(AIInteraction).order_by(AIInteraction.id))).all()
+    assert [
+        (row.interaction_type, row.model_used, row.tokens_used, row.cost, row.processing_time, row.success, row.cached)
+        for row in rows
+    ] == [
+        ("translation", "gpt", 40, 0.001235, 124, True, False),
+        ("image_generation", None, 0, 0.04, 2000, False, True),
+    ]
+    assert rows[1].created_at.timestamp() == START + 1
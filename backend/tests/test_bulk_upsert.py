@@ -0,0 +1,131 @@
+import json
+import pytest
+from app.core.cache import response_cache
+
+pytestmark = pytest.mark.anyio
+
+def ndjson(*rows) -> str:
+    return "\n".join(row if isinstance(row, str) else json.dumps(row) for row in rows) + "\n"
+
+def results(response) -> list:
+    return [json.loads(line) for line in response.text.splitlines()]
+
+@pytest.fixture
+def invalidated(monkeypatch):
+    """Cache tags invalidated during the test"""
+    tags = []
+    real_invalidate = response_cache.invalidate
+
+    async def invalidate(*stale):
+        tags.extend(stale)
+        await real_invalidate(*stale)
+
+    monkeypatch.setattr(response_cache, "invalidate", invalidate)
+    return tags
+
+def post_row(slug: str, title: str = "Bulk post") -> dict:
+    return {"slug": slug, "title": title, "content": "Body text for the bulk import", "category_id": 1}
+
+async def test_posts_created_then_updated_by_slug(client, make_user):
+    _, headers = await make_user("editor")
+    created = results(await client.post("/api/posts/bulk", headers=headers, content=ndjson(
+        post_row("bulk-a"), "{not json", post_row("bulk-b")
+    )))
+    assert [(r["line"], r["status"]) for r in created] == [(1, "created"), (2, "error"), (3, "created")]
+
+    updated = results(await client.post("/api/posts/bulk", headers=headers, content=ndjson(
+        post_row("bulk-a", "Renamed")
+    )))
+    assert updated == [{"line": 1, "status": "updated", "id": created[0]["id"], "slug": "bulk-a"}]
+    assert (await client.get(f"/api/posts/{created[0]['id']}")).json()["title"] == "Renamed"
+
+async def test_posts_of_other_authors_are_not_overwritten(client, make_user):
+    _, owner = await make_user("editor")
+    _, other = await make_user("editor")
+    _, admin = await make_user("admin")
+    original = results(await client.post("/api/posts/bulk", headers=owner, content=ndjson(post_row("bulk-owned"))))[0]
+
+    denied = results(await client.post("/api/posts/bulk", headers=other, content=ndjson(
+        post_row("bulk-owned", "Hijacked"), post_row("bulk-other")
+    )))
+    assert denied[0] == {"line": 1, "status": "error", "detail": "Not enough permissions"}
+    assert denied[1]["status"] == "created"
+    assert (await client.get(f"/api/posts/{original['id']}")).json()["title"] == "Bulk post"
+
+    allowed = results(await client.post("/api/posts/bulk", headers=admin, content=ndjson(
+        post_row("bulk-owned", "Edited by admin")
+    )))
+    assert allowed[0]["status"] == "updated"
+
+async def test_bulk_requires_editor(client, make_user):
+    _, headers = await make_user("user")
+    response = await client.post("/api/posts/bulk", headers=headers, content=ndjson(post_row("bulk-user")))
+    assert response.status_code == 403
+
+async def test_comments_check_owner_and_parent(client, make_user):
+    _, owner = await make_user("editor")
+    _, other = await make_user("editor")
+    root, reply = results(await client.post("/api/comments/bulk", headers=owner, content=ndjson(
+        {"post_id": 1, "content": "Root comment"},
+        {"post_id": 1, "content": "Second comment"}
+    )))
+    assert root["status"] == reply["status"] == "created"
+
+    checked = results(await client.post("/api/comments/bulk", headers=owner, content=ndjson(
+        {"id": reply["id"], "post_id": 1, "content": "Now a reply", "parent_id": root["id"]},
+        {"id": root["id"], "post_id": 1, "content": "Cycle", "parent_id": reply["id"]},
+        {"post_id": 1, "content": "Orphan", "parent_id": 10 ** 9},
+        {"post_id": 2, "content": "Wrong post", "parent_id": root["id"]},
+        {"id": "x", "post_id": 1, "content": "Bad id"}
+    )))
+    assert [r["status"] for r in checked] == ["updated", "error", "error", "error", "error"]
+    assert checked[1]["detail"] == "A comment cannot be a reply to itself or its replies"
+    assert checked[2]["detail"] == "Parent comment not found"
+    assert checked[3]["detail"] == "Parent comment belongs to another post"
+
+    denied = results(await client.post("/api/comments/bulk", headers=other, content=ndjson(
+        {"id": root["id"], "post_id": 1, "content": "Hijacked"}
+    )))
+    assert denied == [{"line": 1, "status": "error", "detail": "Not enough permissions"}]
+    assert (await client.get(f"/api/comments/{root['id']}")).json()["content"] == "Root comment"
+
+async def test_slug_repeated_within_one_batch(client, make_user, invalidated):
+    _, headers = await make_user("editor")
+    response = await client.post("/api/posts/bulk", headers=headers, content=ndjson(
+        post_row("bulk-dup", "First"), post_row("bulk-dup", "Second")
+    ))
+    first, second = results(response)
+    assert first["status"] == second["status"] == "created"
+    assert first["id"] == second["id"]
+    assert f"post:{first['id']}" in invalidated
+    assert (await client.get(f"/api/posts/{first['id']}")).json()["title"] == "Second"
+
+async def test_sql_slug_repeated_within_one_batch(sql_session):
+    from app.api.posts import build_post
+    from app.repositories.posts import SqlPostRepository
+    from app.schemas.post import PostCreate
+    repository = SqlPostRepository(sql_session)
+    records = [
+        build_post(PostCreate.model_validate(post_row("bulk-dup", title)), "bulk-dup", 1)
+        for title in ("First", "Second")
+    ]
+    (first, first_previous), (second, second_previous) = await repository.upsert_many(records)
+    assert first_previous is None and second_previous is None
+    assert first["id"] == second["id"] is not None
+    assert (await repository.get(first["id"]))["title"] == "Second"
+
+async def test_comment_updates_invalidate_their_post(client, make_user, invalidated):
+    _, headers = await make_user("editor")
+    count = (await client.get("/api/posts/2")).json()["comment_count"]
+    created = results(await client.post("/api/comments/bulk", headers=headers, content=ndjson(
+        {"post_id": 2, "content": "Original"}
+    )))[0]
+    assert (await client.get("/api/posts/2")).json()["comment_count"] == count + 1
+
+    invalidated.clear()
+    updated = results(await client.post("/api/comments/bulk", headers=headers, content=ndjson(
+        {"id": created["id"], "post_id": 2, "content": "Edited"}
+    )))[0]
+    assert updated["status"] == "updated"
+    assert "post:2" in invalidated
+    assert (await client.get("/api/posts/2")).json()["comment_count"] == count + 1
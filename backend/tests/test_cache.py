@@ -0,0 +1,91 @@
+import fakeredis
+import fakeredis.aioredis
+import pytest
+from app.core.cache import CacheEntry, RedisCacheBackend
+
+pytestmark = pytest.mark.anyio
+
+def entry(body: bytes = b"{}") -> CacheEntry:
+    return CacheEntry(body, {"etag": '"e"'}, {})
+
+@pytest.fixture(params=[(6,), (7,)], ids=["redis6", "redis7"])
+async def backend(request):
+    """A backend on a fake server of each version; EXPIRE NX/GT only exist from 7"""
+    client = fakeredis.aioredis.FakeRedis(server=fakeredis.FakeServer(version=request.param))
+    yield RedisCacheBackend(client)
+    await client.aclose()
+
+async def test_tag_sets_outlive_their_longest_entry(backend):
+    await backend.set("long", entry(), 300, ["post:1"])
+    await backend.set("short", entry(), 30, ["post:1", "post:2"])
+    client = backend.client
+    assert 290 < await client.ttl("blog:cache:tag:post:1") <= 300
+    assert 20 < await client.ttl("blog:cache:tag:post:2") <= 30
+
+    await backend.set("longer", entry(), 600, ["post:2"])
+    assert 590 < await client.ttl("blog:cache:tag:post:2") <= 600
+
+async def test_invalidate_drops_tagged_entries(backend):
+    await backend.set("a", entry(b"1"), 60, ["post:1"])
+    await backend.set("b", entry(b"2"), 60, ["post:2"])
+    await backend.invalidate(["post:1"])
+    assert await backend.get("a") is None
+    assert (await backend.get("b")).body == b"2"
+
+def interleave(monkeypatch, client, step):
+    """Run step on another connection once, between a transaction's reads and its EXEC"""
+    transaction = client.transaction
+    pending = [step]
+
+    async def racing_transaction(func, *watches, **kwargs):
+        async def racing(pipe):
+            await func(pipe)
+            if pending:
+                await pending.pop()()
+        return await transaction(racing, *watches, **kwargs)
+
+    monkeypatch.setattr(client, "transaction", racing_transaction)
+    return pending
+
+async def test_encoded_body_is_added_to_a_live_entry(backend):
+    stored = entry()
+    await backend.set("a", stored, 60, ["post:1"])
+    await backend.set_encoded("a", stored, "gzip", b"zipped")
+    assert (await backend.get("a")).encoded == {"gzip": b"zipped"}
+    assert 50 < await backend.client.ttl("blog:cache:a") <= 60
+
+async def test_encoded_body_is_not_written_to_an_invalidated_entry(backend):
+    stored = entry()
+    await backend.set("a", stored, 60, ["post:1"])
+    await backend.invalidate(["post:1"])
+    await backend.set_encoded("a", stored, "br", b"brotli")
+    assert not await backend.client.exists("blog:cache:a")
+
+async def test_invalidation_during_set_encoded_wins(backend, monkeypatch):
+    stored = entry()
+    await backend.set("a", stored, 60, ["post:1"])
+    client = backend.client
+
+    async def invalidate():
+        await client.delete("blog:cache:a", "blog:cache:tag:post:1")
+
+    pending = interleave(monkeypatch, client, invalidate)
+    await backend.set_encoded("a", stored, "gzip", b"zipped")
+    assert not pending
+    assert not await client.exists("blog:cache:a")
+
+async def test_entries_tagged_during_invalidate_are_dropped(backend, monkeypatch):
+    await backend.set("a", entry(b"1"), 60, ["post:1"])
+    client = backend.client
+
+    async def tag_another_entry():
+        await client.hset("blog:cache:b", mapping={"body": b"2", "meta": "{}"})
+        await client.sadd("blog:cache:tag:post:1", "blog:cache:b")
+
+    pending = interleave(monkeypatch, client, tag_another_entry)
+    await backend.invalidate(["post:1"])
+    assert not pending
+    assert await backend.get("a") is None
+    # Without the retry, b would outlive its tag set and never be invalidated
+    assert await backend.get("b") is None
+    assert not await client.exists("blog:cache:tag:post:1")
@@ -0,0 +1,134 @@
+import pytest
+from app.api.categories import mock_categories_db
+from app.api.posts import build_post, memory_post_repository, post_store
+from app.models.category import Category
+from app.repositories.categories import MemoryCategoryRepository, SqlCategoryRepository
+from app.repositories.posts import MemoryPostRepository, SqlPostRepository
+from app.schemas.post import PostCreate
+from app.stores.categories import CategoryTree
+from app.stores.posts import PostStore
+
+pytestmark = pytest.mark.anyio
+
+# 1 ─┬─ 4 ─┬─ 6      2      3 ── 8
+#    │     └─ 7
+#    └─ 5
+PARENTS = {1: None, 2: None, 3: None, 4: 1, 5: 1, 6: 4, 7: 4, 8: 3}
+
+def make_categories() -> list:
+    return [
+        {"id": category_id, "name": f"Category {category_id}", "slug": f"category-{category_id}",
+         "parent_id": parent_id, "is_active": True}
+        for category_id, parent_id in PARENTS.items()
+    ]
+
+@pytest.fixture(params=["memory", "sql"])
+async def repositories(request, sql_session):
+    """Category and post repositories on the same tree and posts, in memory or on SQLite"""
+    posts = []
+    for number, (category_id, status) in enumerate(
+        [(1, "published"), (4, "published"), (6, "published"), (6, "published"),
+         (6, "draft"), (7, "published"), (5, "draft"), (2, "published"), (8, "published")],
+        start=1
+    ):
+        post = build_post(PostCreate(title=f"Post {number}", content="Body", category_id=category_id), f"post-{number}", 1)
+        posts.append(dict(post, id=number, status=status))
+
+    if request.param == "memory":
+        yield MemoryCategoryRepository(make_categories()), MemoryPostRepository(PostStore(posts))
+        return
+    sql_session.add_all(Category.from_dict(category) for category in make_categories())
+    await sql_session.commit()
+    posts_repository = SqlPostRepository(sql_session)
+    for post in posts:
+        await posts_repository.create(post)
+    yield SqlCategoryRepository(sql_session), posts_repository
+
+def test_subtrees_are_contiguous_slices_in_depth_first_order():
+    tree = CategoryTree(make_categories())
+    assert tree.descendants(1) == [1, 4, 6, 7, 5]
+    assert tree.descendants(4) == [4, 6, 7]
+    assert tree.descendants(7) == [7]
+    assert tree.descendants(99) == []
+    assert tree.is_within(6, 1) and tree.is_within(4, 4)
+    assert not tree.is_within(1, 4) and not tree.is_within(8, 1) and not tree.is_within(99, 1)
+    assert tree.ancestors(7) == [1, 4]
+    assert tree.ancestors(1) == []
+
+def test_moves_and_additions_renumber_the_tree():
+    tree = CategoryTree(make_categories())
+    tree.descendants(1)
+    tree.set_parent(4, 3)
+    tree.set_parent(9, 6)
+    assert tree.descendants(1) == [1, 5]
+    assert tree.descendants(3) == [3, 4, 6, 9, 7, 8]
+    assert tree.ancestors(9) == [3, 4, 6]
+    assert tree.is_within(9, 3) and not tree.is_within(9, 1)
+
+def test_dangling_parents_are_roots():
+    tree = CategoryTree([{"id": 1, "parent_id": None}, {"id": 2, "parent_id": 42}, {"id": 3, "parent_id": 2}])
+    assert tree.descendants(2) == [2, 3]
+    assert tree.ancestors(3) == [2]
+    assert not tree.is_within(2, 1)
+
+async def test_descendants_and_breadcrumbs(repositories):
+    categories, _ = repositories
+    assert sorted(await categories.descendant_ids(1)) == [1, 4, 5, 6, 7]
+    assert sorted(await categories.descendant_ids(3)) == [3, 8]
+    assert await categories.descendant_ids(5) == [5]
+    assert [c["id"] for c in await categories.ancestors(7)] == [1, 4]
+    assert await categories.ancestors(2) == []
+    assert await categories.is_within(7, 1) and not await categories.is_within(1, 7)
+
+async def test_subtree_listing_and_counts(repositories):
+    categories, posts = repositories
+    subtree = await categories.descendant_ids(4)
+    listed = await posts.list(status="published", category_ids=subtree)
+    assert sorted(post["id"] for post in listed) == [2, 3, 4, 6]
+    assert await posts.list(status="published", category_ids=await categories.descendant_ids(5)) == []
+
+    counts = await posts.published_counts(await categories.descendant_ids(1))
+    assert counts == {1: 1, 4: 1, 5: 0, 6: 2, 7: 1}
+
+    await posts.update(5, {"status": "published"})
+    await posts.delete(2)
+    assert await posts.published_counts([4, 6]) == {4: 0, 6: 3}
+
+@pytest.fixture
+async def admin(make_user):
+    _, headers = await make_user("admin")
+    return headers
+
+async def test_category_api_follows_post_changes(client, admin):
+    parent = mock_categories_db[0]["id"]
+    child = (await client.post("/api/categories/", headers=admin, json={"name": "Child", "parent_id": parent})).json()
+    leaf = (await client.post("/api/categories/", headers=admin, json={"name": "Leaf", "parent_id": child["id"]})).json()
+
+    crumbs = await client.get(f"/api/categories/{leaf['id']}/breadcrumbs")
+    assert [c["id"] for c in crumbs.json()] == [parent, child["id"], leaf["id"]]
+    before = (await client.get(f"/api/categories/{parent}/counts")).json()
+    assert before["total_post_count"] == sum(
+        (await memory_post_repository.published_counts([parent, child["id"], leaf["id"]])).values()
+    )
+
+    post = (await client.post("/api/posts/", headers=admin, json={
+        "title": "Deep post", "content": "Body", "category_id": leaf["id"]
+    })).json()
+    await client.put(f"/api/posts/{post['id']}", headers=admin, json={"status": "published"})
+    counts = (await client.get(f"/api/categories/{parent}/counts")).json()
+    assert counts == dict(before, total_post_count=before["total_post_count"] + 1)
+    listed = (await client.get(f"/api/categories/{parent}/posts")).json()
+    assert post["id"] in [p["id"] for p in listed]
+    shallow = (await client.get(f"/api/categories/{parent}/posts?include_descendants=false")).json()
+    assert post["id"] not in [p["id"] for p in shallow]
+
+    await client.delete(f"/api/posts/{post['id']}", headers=admin)
+    assert (await client.get(f"/api/categories/{parent}/counts")).json() == before
+    assert post["id"] not in post_store
+
+async def test_moves_that_would_make_a_cycle_are_rejected(client, admin):
+    parent = (await client.post("/api/categories/", headers=admin, json={"name": "Outer"})).json()
+    child = (await client.post("/api/categories/", headers=admin, json={"name": "Inner", "parent_id": parent["id"]})).json()
+    response = await client.put(f"/api/categories/{parent['id']}", headers=admin, json={"parent_id": child["id"]})
+    assert response.status_code == 400
+    assert (await client.put(f"/api/categories/{child['id']}", headers=admin, json={"parent_id": 999999})).status_code == 400
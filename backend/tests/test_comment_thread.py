@@ -0,0 +1,106 @@
+import random
+from datetime import datetime, timedelta
+import pytest
+from app.core.pagination import decode_cursor
+from app.models.comment import Comment
+from app.repositories.comments import MemoryCommentRepository, SqlCommentRepository
+
+pytestmark = pytest.mark.anyio
+
+def make_comments(count: int = 300):
+    """A random thread over two posts; a few timestamps collide to exercise the id tiebreak"""
+    rng = random.Random(14)
+    start = datetime(2024, 1, 1)
+    comments = []
+    for comment_id in range(1, count + 1):
+        post_id = rng.choice((1, 2))
+        parents = [c["id"] for c in comments if c["post_id"] == post_id]
+        created_at = start + timedelta(minutes=comment_id // 3)
+        comments.append({
+            "id": comment_id,
+            "post_id": post_id,
+            "user_id": None,
+            "parent_id": rng.choice(parents[:12]) if parents and rng.random() < 0.8 else None,
+            "content": f"comment {comment_id}",
+            "is_approved": rng.random() < 0.8,
+            "is_ai_generated": False,
+            "created_at": created_at,
+            "updated_at": created_at
+        })
+    return comments
+
+@pytest.fixture
+async def repositories(sql_session):
+    comments = make_comments()
+    sql_session.add_all(Comment.from_dict(comment) for comment in comments)
+    await sql_session.commit()
+    return MemoryCommentRepository([dict(comment) for comment in comments]), SqlCommentRepository(sql_session)
+
+def shape(nodes):
+    return [
+        (node["id"], node["reply_count"], node["replies_cursor"], shape(node["replies"]))
+        for node in nodes
+    ]
+
+@pytest.mark.parametrize("approved_only", [True, False])
+@pytest.mark.parametrize("depth,limit,replies_limit", [(1, 5, 2), (3, 7, 2), (4, 50, 3)])
+async def test_sql_thread_matches_memory(repositories, approved_only, depth, limit, replies_limit):
+    memory, sql = repositories
+    for post_id in (1, 2):
+        cursor = None
+        pages = 0
+        while True:
+            after = decode_cursor(cursor)
+            expected = await memory.thread(post_id, None, depth, limit, replies_limit, after, approved_only)
+            actual = await sql.thread(post_id, None, depth, limit, replies_limit, after, approved_only)
+            assert shape(actual[0]) == shape(expected[0])
+            assert actual[1] == expected[1]
+            cursor = actual[1]
+            pages += 1
+            if cursor is None:
+                break
+        assert pages > 1 or limit == 50
+
+async def test_sql_thread_pages_replies_of_one_comment(repositories):
+    memory, sql = repositories
+    nodes, _ = await memory.thread(1, None, depth=1, limit=100, approved_only=False)
+    parent = max(nodes, key=lambda node: node["reply_count"])
+    assert parent["reply_count"] > 2
+
+    cursor = None
+    seen = []
+    while True:
+        page, cursor = await sql.thread(1, parent["id"], depth=2, limit=2, after=decode_cursor(cursor), approved_only=False)
+        seen.extend(node["id"] for node in page)
+        if cursor is None:
+            break
+    assert len(seen) == parent["reply_count"] == len(set(seen))
+
+async def test_delete_removes_the_replies_too(repositories):
+    memory, sql = repositories
+    nodes, _ = await memory.thread(1, None, depth=1, limit=100, approved_only=False)
+    parent = max(nodes, key=lambda node: node["reply_count"])
+    before = len(await memory.list(post_id=1))
+
+    deleted = [await repository.delete(parent["id"]) for repository in (memory, sql)]
+    assert deleted[0] == deleted[1] > parent["reply_count"]
+    for repository in (memory, sql):
+        remaining = await repository.list(post_id=1)
+        assert len(remaining) == before - deleted[0]
+        # No reply is left pointing at a deleted comment
+        ids = {comment["id"] for comment in remaining}
+        assert all(comment["parent_id"] is None or comment["parent_id"] in ids for comment in remaining)
+    assert await memory.delete(parent["id"]) == await sql.delete(parent["id"]) == 0
+
+async def test_deleting_a_comment_updates_the_post_count(client, make_user):
+    _, headers = await make_user("editor")
+    count = (await client.get("/api/posts/3")).json()["comment_count"]
+    root = (await client.post("/api/comments/", headers=headers, json={"post_id": 3, "content": "Root"})).json()
+    reply = (await client.post(
+        "/api/comments/", headers=headers, json={"post_id": 3, "content": "Reply", "parent_id": root["id"]}
+    )).json()
+    assert (await client.get("/api/posts/3")).json()["comment_count"] == count + 2
+
+    assert (await client.delete(f"/api/comments/{root['id']}", headers=headers)).status_code == 200
+    assert (await client.get(f"/api/comments/{reply['id']}")).status_code == 404
+    assert (await client.get("/api/posts/3")).json()["comment_count"] == count
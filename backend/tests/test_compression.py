@@ -0,0 +1,163 @@
+import gzip
+import zlib
+import anyio
+import httpx
+import pytest
+from starlette.applications import Starlette
+from starlette.datastructures import Headers
+from starlette.responses import PlainTextResponse, Response, StreamingResponse
+from starlette.routing import Route
+from app.core.compression import CompressionMiddleware, negotiate, request_encoding, route_profile
+from app.core.config import settings
+
+pytestmark = pytest.mark.anyio
+
+LARGE = "compressible text " * 200
+SMALL = "tiny"
+CHUNKS = [f'{{"line": {index}, "text": "{"x" * 50}"}}\n' for index in range(5)]
+
+@pytest.mark.parametrize("accept,expected", [
+    ("gzip, br", "br"),
+    ("gzip;q=1.0, br;q=0.5", "gzip"),
+    ("GZIP", "gzip"),
+    ("*", "br"),
+    ("br;q=0, *", "zstd"),
+    ("*;q=0, gzip", "gzip"),
+    ("gzip;q=0", None),
+    ("gzip;q=nonsense", None),
+    ("identity", None),
+    ("identity;q=0", None),
+    ("", None),
+])
+def test_negotiate_by_quality_then_server_preference(accept, expected):
+    assert negotiate(Headers({"accept-encoding": accept}), ["br", "zstd", "gzip"]) == expected
+
+def test_route_profile_uses_the_longest_prefix(monkeypatch):
+    monkeypatch.setattr(settings, "COMPRESSION_ROUTES", {"/api": "high", "/api/export": "fast"})
+    assert route_profile("/api/export/posts") == "fast"
+    assert route_profile("/api/posts") == "high"
+    assert route_profile("/health") == settings.COMPRESSION_PROFILE
+
+def make_app() -> CompressionMiddleware:
+    async def large(request):
+        return PlainTextResponse(LARGE, headers={"X-Encoding": request_encoding.get() or ""})
+
+    async def small(request):
+        return PlainTextResponse(SMALL)
+
+    async def encoded(request):
+        return Response(gzip.compress(LARGE.encode()), media_type="text/plain", headers={"Content-Encoding": "gzip"})
+
+    async def binary(request):
+        return Response(b"\0" * 4096, media_type="image/png")
+
+    async def missing(request):
+        return PlainTextResponse(LARGE, status_code=404)
+
+    async def stream(request):
+        async def lines():
+            for chunk in CHUNKS:
+                yield chunk.encode()
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    async def events(request):
+        async def lines():
+            yield b"data: one\n\n"
+            yield b"data: two\n\n"
+        return StreamingResponse(lines(), media_type="text/event-stream")
+
+    routes = [Route(f"/{endpoint.__name__}", endpoint) for endpoint in (large, small, encoded, binary, missing, stream, events)]
+    return CompressionMiddleware(Starlette(routes=routes))
+
+@pytest.fixture
+async def client():
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=make_app()), base_url="http://test") as client:
+        yield client
+
+async def get_raw(client, path: str, accept: str = "gzip"):
+    """The response with its body as sent, not decoded"""
+    async with client.stream("GET", path, headers={"Accept-Encoding": accept}) as response:
+        return response, b"".join([chunk async for chunk in response.aiter_raw()])
+
+async def test_compresses_when_accepted(client):
+    response, body = await get_raw(client, "/large")
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert int(response.headers["content-length"]) == len(body) < len(LARGE)
+    assert gzip.decompress(body).decode() == LARGE
+    assert response.headers["x-encoding"] == "gzip"
+
+@pytest.mark.parametrize("accept", ["identity", "identity;q=0", "gzip;q=0", "br", ""])
+async def test_sends_identity_when_nothing_usable_is_accepted(client, accept):
+    response, body = await get_raw(client, "/large", accept)
+    assert "content-encoding" not in response.headers
+    assert body.decode() == LARGE
+    assert response.headers["x-encoding"] == ""
+
+async def test_identity_refused_alongside_an_accepted_coding(client):
+    response, body = await get_raw(client, "/large", "gzip;q=0.5, identity;q=0")
+    assert response.headers["content-encoding"] == "gzip"
+    assert gzip.decompress(body).decode() == LARGE
+
+async def test_small_bodies_are_left_alone(client, monkeypatch):
+    response, body = await get_raw(client, "/small")
+    assert "content-encoding" not in response.headers
+    assert body.decode() == SMALL
+    # The decision depends on the request's encoding, so caches must still vary
+    assert response.headers["vary"] == "Accept-Encoding"
+
+    monkeypatch.setattr(settings, "COMPRESSION_MIN_SIZE", 0)
+    response, body = await get_raw(client, "/small")
+    assert response.headers["content-encoding"] == "gzip"
+    assert gzip.decompress(body).decode() == SMALL
+
+async def test_passthrough_responses(client):
+    response, body = await get_raw(client, "/encoded")
+    assert response.headers["content-encoding"] == "gzip"
+    assert gzip.decompress(body).decode() == LARGE
+
+    response, body = await get_raw(client, "/binary")
+    assert "content-encoding" not in response.headers and "vary" not in response.headers
+    assert body == b"\0" * 4096
+
+    response, body = await get_raw(client, "/missing")
+    assert response.status_code == 404
+    assert "content-encoding" not in response.headers
+    assert body.decode() == LARGE
+
+    response, body = await get_raw(client, "/events")
+    assert "content-encoding" not in response.headers
+    assert body == b"data: one\n\ndata: two\n\n"
+
+async def test_streams_are_compressed_chunk_by_chunk():
+    app = make_app()
+    scope = {
+        "type": "http", "method": "GET", "path": "/stream", "root_path": "", "query_string": b"",
+        "headers": [(b"accept-encoding", b"gzip")],
+    }
+    messages = []
+    requests = [{"type": "http.request", "body": b"", "more_body": False}]
+
+    async def receive():
+        if requests:
+            return requests.pop()
+        # Still connected: the response's disconnect listener waits here
+        await anyio.sleep_forever()
+
+    async def send(message):
+        messages.append(message)
+
+    await app(scope, receive, send)
+    start, *bodies = messages
+    headers = Headers(raw=start["headers"])
+    assert headers["content-encoding"] == "gzip"
+    assert headers["vary"] == "Accept-Encoding"
+    assert "content-length" not in headers
+
+    # Every chunk is flushed: each message decodes to the line that produced it
+    decompressor = zlib.decompressobj(31)
+    decoded = [decompressor.decompress(message["body"]).decode() for message in bodies]
+    assert decoded[:len(CHUNKS)] == CHUNKS
+    assert "".join(decoded) == "".join(CHUNKS)
+    assert bodies[-1]["more_body"] is False
+    assert decompressor.eof
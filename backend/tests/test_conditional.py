@@ -0,0 +1,131 @@
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from app.core.compression import CompressionMiddleware
+from app.core.conditional import ConditionalGetMiddleware, body_etag
+from app.core.config import settings
+
+pytestmark = pytest.mark.anyio
+
+BODY = {"items": ["conditional"] * 200}
+LAST_MODIFIED = "Mon, 01 Jan 2024 00:00:00 GMT"
+
+def make_app(compression: bool = False) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/doc")
+    @app.post("/doc")
+    async def doc():
+        return JSONResponse(BODY)
+
+    @app.get("/dated")
+    async def dated():
+        return PlainTextResponse("dated", headers={"Last-Modified": LAST_MODIFIED})
+
+    @app.get("/missing")
+    async def missing():
+        return JSONResponse({"detail": "Not found"}, status_code=404)
+
+    @app.get("/stream")
+    async def stream():
+        async def chunks():
+            for index in range(3):
+                yield f"chunk {index}\n".encode()
+        return StreamingResponse(chunks(), media_type="text/plain")
+
+    app.add_middleware(ConditionalGetMiddleware)
+    if compression:
+        app.add_middleware(CompressionMiddleware)
+    return app
+
+@pytest.fixture
+async def request_app():
+    clients = []
+
+    async def make(compression: bool = False) -> httpx.AsyncClient:
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=make_app(compression)), base_url="http://test")
+        clients.append(client)
+        return client
+
+    yield make
+    for client in clients:
+        await client.aclose()
+
+async def test_get_gets_a_strong_etag_and_cache_control(request_app):
+    client = await request_app()
+    response = await client.get("/doc")
+    assert response.status_code == 200
+    assert response.headers["etag"] == body_etag(response.content)
+    assert not response.headers["etag"].startswith("W/")
+    assert response.headers["cache-control"] == settings.CACHE_CONTROL
+    authorized = await client.get("/doc", headers={"Authorization": "Bearer x"})
+    assert authorized.headers["cache-control"] == settings.CACHE_CONTROL_PRIVATE
+
+@pytest.mark.parametrize("header", ["{etag}", "W/{etag}", '"other", {etag}', "*"])
+async def test_matching_if_none_match_is_a_bodiless_304(request_app, header):
+    client = await request_app()
+    etag = (await client.get("/doc")).headers["etag"]
+    response = await client.get("/doc", headers={"If-None-Match": header.format(etag=etag)})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+    for name in ("content-length", "content-type", "content-encoding"):
+        assert name not in response.headers
+
+async def test_other_etags_get_the_full_body(request_app):
+    client = await request_app()
+    response = await client.get("/doc", headers={"If-None-Match": '"other", W/"stale"'})
+    assert response.status_code == 200
+    assert response.json() == BODY
+
+async def test_if_modified_since_applies_without_if_none_match(request_app):
+    client = await request_app()
+    assert (await client.get("/dated", headers={"If-Modified-Since": LAST_MODIFIED})).status_code == 304
+    assert (await client.get("/dated", headers={"If-Modified-Since": "Sun, 31 Dec 2023 00:00:00 GMT"})).status_code == 200
+    # If-None-Match takes precedence
+    response = await client.get("/dated", headers={"If-None-Match": '"other"', "If-Modified-Since": LAST_MODIFIED})
+    assert response.status_code == 200
+
+async def test_non_get_and_non_200_responses_pass_through(request_app):
+    client = await request_app()
+    etag = (await client.get("/doc")).headers["etag"]
+    posted = await client.post("/doc", headers={"If-None-Match": etag})
+    assert posted.status_code == 200 and posted.json() == BODY
+    assert "etag" not in posted.headers
+
+    missing = await client.get("/missing", headers={"If-None-Match": "*"})
+    assert missing.status_code == 404
+    assert "etag" not in missing.headers and "cache-control" not in missing.headers
+
+async def test_streamed_bodies_are_not_buffered_for_an_etag(request_app):
+    client = await request_app()
+    response = await client.get("/stream", headers={"If-None-Match": "*"})
+    assert response.status_code == 200
+    assert response.text == "chunk 0\nchunk 1\nchunk 2\n"
+    assert "etag" not in response.headers
+
+async def test_each_encoding_has_its_own_etag_and_all_revalidate(request_app):
+    client = await request_app(compression=True)
+    identity = await client.get("/doc", headers={"Accept-Encoding": "identity"})
+    gzipped = await client.get("/doc", headers={"Accept-Encoding": "gzip"})
+    assert gzipped.headers["content-encoding"] == "gzip"
+    assert identity.headers["etag"] != gzipped.headers["etag"]
+    assert gzipped.headers["etag"] == identity.headers["etag"][:-1] + '-gzip"'
+    assert gzipped.json() == identity.json() == BODY
+
+    for etag in (identity.headers["etag"], gzipped.headers["etag"]):
+        for accept in ("gzip", "identity"):
+            response = await client.get("/doc", headers={"Accept-Encoding": accept, "If-None-Match": etag})
+            assert response.status_code == 304
+            assert response.content == b""
+            assert "content-encoding" not in response.headers
+            if accept == "gzip":
+                # The validator the client revalidated, compressed copy or not
+                assert response.headers["etag"] == etag
+
+async def test_api_responses_revalidate(client):
+    response = await client.get("/api/categories/")
+    assert response.status_code == 200
+    etag = response.headers["etag"]
+    assert (await client.get("/api/categories/", headers={"If-None-Match": etag})).status_code == 304
@@ -0,0 +1,55 @@
+import asyncio
+import pytest
+from app.core.counters import CounterBuffer
+
+pytestmark = pytest.mark.anyio
+
+class SlowSink:
+    """Records what was written; each write takes a while"""
+
+    def __init__(self, delay: float = 0.05):
+        self.delay = delay
+        self.writes = []
+        self.started = asyncio.Event()
+
+    async def __call__(self, deltas):
+        self.started.set()
+        await asyncio.sleep(self.delay)
+        self.writes.append({field: dict(counts) for field, counts in deltas.items()})
+
+    def total(self, field: str, entity_id: int) -> int:
+        return sum(write.get(field, {}).get(entity_id, 0) for write in self.writes)
+
+async def test_pending_deltas_overlay_reads():
+    buffer = CounterBuffer(flush_interval=60)
+    sink = SlowSink(0)
+    await buffer.start(sink)
+    buffer.add(1, "view_count")
+    buffer.add(1, "view_count", 2)
+    assert buffer.overlay({"id": 1, "view_count": 10})["view_count"] == 13
+    await buffer.stop()
+    assert sink.writes == [{"view_count": {1: 3}}]
+
+async def test_stop_waits_for_a_running_flush():
+    buffer = CounterBuffer(flush_interval=0.01)
+    sink = SlowSink()
+    await buffer.start(sink)
+    buffer.add(1, "like_count", 5)
+    await sink.started.wait()
+    buffer.add(1, "like_count", 2)
+    await buffer.stop()
+    assert sink.total("like_count", 1) == 7
+
+async def test_cancelled_flush_keeps_its_deltas():
+    buffer = CounterBuffer(flush_interval=60)
+    sink = SlowSink()
+    await buffer.start(sink)
+    buffer.add(2, "share_count", 4)
+    flush = asyncio.ensure_future(buffer.flush())
+    await sink.started.wait()
+    flush.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await flush
+    assert buffer.pending(2, "share_count") == 4
+    await buffer.stop()
+    assert sink.total("share_count", 2) == 4
@@ -0,0 +1,116 @@
+from datetime import datetime
+import pytest
+from app.core.pagination import NEXT_CURSOR_HEADER, decode_cursor, encode_cursor
+from app.stores.posts import PostStore, sort_key
+from tests.test_post_store import make_posts
+
+def expected(posts, **filters):
+    """The matching posts in (created_at, id) order, by brute force"""
+    categories = filters.pop("category_ids", None)
+    since = filters.pop("updated_since", None)
+    matching = [
+        post for post in posts
+        if all(post[field] == value for field, value in filters.items())
+        and (categories is None or post["category_id"] in categories)
+        and (since is None or post["updated_at"] >= since)
+    ]
+    return [post["id"] for post in sorted(matching, key=sort_key)]
+
+def walk(store: PostStore, limit: int, after=None, **filters):
+    """Every post after the cursor, following it one page at a time"""
+    ids = []
+    while True:
+        page = store.page(after=after, limit=limit, **filters)
+        ids.extend(post["id"] for post in page)
+        if len(page) < limit:
+            return ids
+        after = sort_key(page[-1])
+
+FILTERS = [
+    {},
+    {"status": "published"},
+    {"category_id": 2},
+    {"featured": True},
+    {"status": "draft", "category_id": 1},
+    {"category_ids": [1, 3]},
+    {"status": "published", "updated_since": datetime(2024, 1, 2)},
+]
+
+@pytest.mark.parametrize("filters", FILTERS)
+@pytest.mark.parametrize("limit", [1, 7, 500])
+def test_cursor_pages_cover_every_post_once(filters, limit):
+    posts = make_posts()
+    store = PostStore(posts)
+    brute = dict(filters)
+    if "featured" in brute:
+        brute["is_featured"] = brute.pop("featured")
+    assert walk(store, limit, **filters) == expected(posts, **brute)
+
+def test_cursor_survives_changes_between_pages():
+    posts = make_posts()
+    store = PostStore(posts)
+    first = store.page(limit=20)
+    after = sort_key(first[-1])
+
+    # Removing the cursor's own post does not lose the position
+    store.remove(first[-1]["id"])
+    store.remove(first[0]["id"])
+    added = store.add(dict(posts[0], id=store.next_id(), slug="late", created_at=datetime(2030, 1, 1)))
+
+    rest = walk(store, 13, after)
+    assert rest == [post["id"] for post in sorted(store, key=sort_key) if sort_key(post) > after]
+    assert len(rest) == len(store) - 18
+    assert rest[-1] == added["id"]
+
+def test_skip_applies_after_the_cursor():
+    store = PostStore(make_posts())
+    all_ids = [post["id"] for post in store.page(status="published")]
+    after = sort_key(store.get(all_ids[9]))
+    page = store.page(status="published", after=after, skip=5, limit=3)
+    assert [post["id"] for post in page] == all_ids[15:18]
+
+def test_unknown_filter_values_give_empty_pages():
+    store = PostStore(make_posts())
+    assert store.page(status="archived") == []
+    assert store.page(category_id=99) == []
+    assert store.page(category_ids=[98, 99]) == []
+
+async def follow(client, url: str, **kwargs) -> list:
+    """Every record of a listing, following X-Next-Cursor"""
+    records, cursor = [], None
+    while True:
+        response = await client.get(url, params={"after": cursor} if cursor else None, **kwargs)
+        assert response.status_code == 200
+        records.extend(response.json())
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if cursor is None:
+            return records
+        assert decode_cursor(cursor) == (datetime.fromisoformat(records[-1]["created_at"]), records[-1]["id"])
+
+@pytest.mark.anyio
+async def test_post_listing_follows_next_cursor(client):
+    everything = (await client.get("/api/posts/?limit=100")).json()
+    assert NEXT_CURSOR_HEADER not in (await client.get("/api/posts/?limit=100")).headers
+    assert [post["id"] for post in await follow(client, "/api/posts/?limit=1")] == [post["id"] for post in everything]
+
+@pytest.mark.anyio
+async def test_user_listing_follows_next_cursor(client, make_user):
+    _, headers = await make_user("admin")
+    for _ in range(3):
+        await make_user()
+    everything = (await client.get("/api/users/?limit=100", headers=headers)).json()
+    paged = await follow(client, "/api/users/?limit=2", headers=headers)
+    assert [user["id"] for user in paged] == [user["id"] for user in everything]
+
+@pytest.mark.anyio
+async def test_comment_listing_follows_next_cursor(client):
+    everything = (await client.get("/api/comments/?limit=100&approved_only=false")).json()
+    paged = await follow(client, "/api/comments/?limit=1&approved_only=false")
+    assert [comment["id"] for comment in paged] == [comment["id"] for comment in everything]
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("cursor", ["not-a-cursor", encode_cursor({"created_at": datetime(2024, 1, 1), "id": 1})[:-3]])
+async def test_invalid_cursor_is_a_400(client, cursor):
+    response = await client.get("/api/posts/", params={"after": cursor})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
@@ -0,0 +1,44 @@
+import pytest
+from app.api import auth
+from app.core import passwords
+from app.core.config import settings
+
+pytestmark = pytest.mark.anyio
+
+@pytest.fixture(autouse=True)
+def fast_hashing(monkeypatch):
+    monkeypatch.setattr(settings, "PASSWORD_HASH_WORKERS", 0)
+    monkeypatch.setattr(passwords, "pwd_context", passwords.pwd_context.copy(bcrypt__rounds=4, bcrypt__min_rounds=4))
+
+async def test_hashes_verify_and_reject():
+    stored = await passwords.hash_password("s3cret")
+    assert passwords.is_hashed(stored)
+    assert await passwords.verify_password("s3cret", stored) == (True, None)
+    assert (await passwords.verify_password("wrong", stored))[0] is False
+
+async def test_plaintext_only_accepted_while_migrating(monkeypatch):
+    assert await passwords.verify_password("legacy", "legacy") == (False, None)
+
+    monkeypatch.setattr(settings, "LEGACY_PLAINTEXT_PASSWORDS", True)
+    valid, new_hash = await passwords.verify_password("legacy", "legacy")
+    assert valid and passwords.is_hashed(new_hash)
+    assert (await passwords.verify_password("other", "legacy"))[0] is False
+
+async def test_seed_admin_is_hashed_before_login(client):
+    await auth.hash_seed_passwords()
+    assert passwords.is_hashed(auth.mock_users_db["admin@blog.com"]["password"])
+    response = await client.post("/api/auth/login", json={"email": "admin@blog.com", "password": "admin123"})
+    assert response.status_code == 200
+
+async def test_unknown_email_still_checks_a_hash(client, monkeypatch):
+    checked = []
+    verify = passwords.verify_password
+
+    async def spy(password, stored):
+        checked.append(stored)
+        return await verify(password, stored)
+
+    monkeypatch.setattr(auth, "verify_password", spy)
+    response = await client.post("/api/auth/login", json={"email": "nobody@test.invalid", "password": "guess"})
+    assert response.status_code == 401
+    assert checked == [await passwords.dummy_hash()]
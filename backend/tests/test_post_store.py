@@ -0,0 +1,93 @@
+import random
+from datetime import datetime, timedelta
+import pytest
+from app.stores.posts import PostStore, sort_key
+
+def make_posts(count: int = 200):
+    """Posts with colliding created_at values, so pages have to break ties by id"""
+    rng = random.Random(1)
+    start = datetime(2024, 1, 1)
+    posts = []
+    for post_id in rng.sample(range(1, count * 2), count):
+        created_at = start + timedelta(minutes=rng.randrange(count // 4))
+        posts.append({
+            "id": post_id,
+            "slug": f"post-{post_id}",
+            "status": rng.choice(("published", "published", "draft")),
+            "author_id": rng.randint(1, 3),
+            "category_id": rng.choice((1, 2, 3, None)),
+            "is_featured": rng.random() < 0.2,
+            "published_at": created_at,
+            "created_at": created_at,
+            "updated_at": created_at + timedelta(days=rng.randrange(3))
+        })
+    return posts
+
+def test_lookups_by_id_and_slug():
+    posts = make_posts()
+    store = PostStore(posts)
+    assert len(store) == len(posts)
+    for post in posts:
+        assert store.get(post["id"]) is post
+        assert store.get_by_slug(post["slug"]) is post
+        assert post["id"] in store
+    assert store.get(0) is None
+    assert store.get_by_slug("missing") is None
+
+def test_slugs_and_ids_are_unique():
+    store = PostStore(make_posts())
+    post = next(iter(store))
+    with pytest.raises(ValueError):
+        store.add(dict(post, id=store.next_id()))
+    with pytest.raises(ValueError):
+        store.add(dict(post, slug="fresh"))
+    with pytest.raises(ValueError):
+        store.add_many([dict(post, id=store.next_id(), slug="twice"), dict(post, id=store.next_id() + 1, slug="twice")])
+    other = next(p for p in store if p["id"] != post["id"])
+    with pytest.raises(ValueError):
+        store.update(other["id"], {"slug": post["slug"]})
+    assert store.slug_taken(post["slug"]) and not store.slug_taken(post["slug"], exclude_id=post["id"])
+
+def test_update_moves_the_post_between_indexes():
+    store = PostStore(make_posts())
+    post = next(p for p in store if p["status"] == "draft" and p["category_id"] == 1)
+    old_slug = post["slug"]
+    store.update(post["id"], {"status": "published", "category_id": 2, "slug": "moved"})
+    assert post["id"] not in {p["id"] for p in store.filter(status="draft")}
+    assert post["id"] not in {p["id"] for p in store.filter(category_id=1)}
+    assert post["id"] in {p["id"] for p in store.filter(status="published", category_id=2)}
+    assert store.get_by_slug("moved") is post and store.get_by_slug(old_slug) is None
+
+def test_filters_match_a_scan():
+    posts = make_posts()
+    store = PostStore(posts)
+    for status in ("published", "draft"):
+        for category_id in (1, 2, 3, None):
+            for featured in (True, False, None):
+                found = store.filter(status=status, category_id=category_id, featured=featured)
+                scanned = [
+                    p for p in sorted(posts, key=sort_key)
+                    if p["status"] == status
+                    and (category_id is None or p["category_id"] == category_id)
+                    and (featured is None or p["is_featured"] == featured)
+                ]
+                assert found == scanned
+
+def test_remove_drops_every_index_entry_and_keeps_ids_fresh():
+    store = PostStore(make_posts())
+    last = max(store, key=lambda post: post["id"])
+    assert store.remove(last["id"]) is last
+    assert store.remove(last["id"]) is None
+    assert store.get_by_slug(last["slug"]) is None
+    assert all(post["id"] != last["id"] for post in store.filter())
+    assert last["id"] not in {post["id"] for post in store.recent(len(store) + 1)}
+    # Ids of deleted posts are not reused
+    assert store.next_id() == last["id"] + 1
+
+def test_recent_returns_latest_published_first():
+    posts = make_posts()
+    store = PostStore(posts)
+    published = sorted((p for p in posts if p["status"] == "published"), key=lambda p: (p["published_at"], p["id"]), reverse=True)
+    assert store.recent(10) == published[:10]
+    featured = [p for p in published if p["is_featured"] and p["category_id"] == 2]
+    assert store.recent(5, category_id=2, featured=True) == featured[:5]
@@ -0,0 +1,99 @@
+import asyncio
+import time
+import fakeredis.aioredis
+import pytest
+from app.core.revocation import BloomFilter, MemoryRevocationBackend, RedisRevocationBackend, RevocationList
+
+pytestmark = pytest.mark.anyio
+
+async def wait_for(condition, timeout: float = 2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not reached"
+        await asyncio.sleep(0.01)
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(capacity=1000)
+    items = [f"jti-{i}" for i in range(1000)]
+    for item in items:
+        bloom.add(item)
+    assert all(item in bloom for item in items)
+    assert sum(f"other-{i}" in bloom for i in range(1000)) < 20
+
+async def test_memory_revocations_expire_and_survive_rebuilds():
+    revocations = RevocationList(MemoryRevocationBackend(), capacity=2)
+    await revocations.start()
+    assert revocations.synced
+    await revocations.revoke("expired", time.time() - 1)
+    for i in range(3):
+        await revocations.revoke(f"live-{i}", time.time() + 60)
+    assert not await revocations.is_revoked("expired")
+    assert all([await revocations.is_revoked(f"live-{i}") for i in range(3)])
+    assert not await revocations.is_revoked("never")
+
+@pytest.fixture
+async def redis_server():
+    server = fakeredis.FakeServer()
+    clients = []
+
+    def connect():
+        client = fakeredis.aioredis.FakeRedis(server=server)
+        clients.append(client)
+        return client
+
+    yield server, connect
+    for client in clients:
+        await client.aclose()
+
+async def test_revocations_reach_other_workers(redis_server):
+    _, connect = redis_server
+    first = RevocationList(RedisRevocationBackend(connect()))
+    second = RevocationList(RedisRevocationBackend(connect()))
+    await first.revoke("before-start", time.time() + 60)
+    await first.start()
+    await second.start()
+    await wait_for(lambda: first.synced and second.synced)
+
+    assert await second.is_revoked("before-start")
+    await first.revoke("after-start", time.time() + 60)
+    await wait_for(lambda: "after-start" in second._bloom)
+    assert await second.is_revoked("after-start")
+    await first.stop()
+    await second.stop()
+
+class DroppableBackend(RedisRevocationBackend):
+    """Redis backend whose subscription can be cut from the test"""
+
+    def __init__(self, client):
+        super().__init__(client)
+        self.drop = asyncio.Event()
+
+    async def listen(self, on_revoked, on_subscribed):
+        listener = asyncio.ensure_future(super().listen(on_revoked, on_subscribed))
+        dropped = asyncio.ensure_future(self.drop.wait())
+        await asyncio.wait({listener, dropped}, return_when=asyncio.FIRST_COMPLETED)
+        listener.cancel()
+        dropped.cancel()
+        self.drop.clear()
+        raise ConnectionError("Connection lost")
+
+async def test_lost_subscription_falls_back_to_exact_lookups(redis_server, monkeypatch):
+    _, connect = redis_server
+    monkeypatch.setattr(RevocationList, "RECONNECT_DELAY", 0.3)
+    backend = DroppableBackend(connect())
+    watcher = RevocationList(backend)
+    other = RedisRevocationBackend(connect())
+    await watcher.start()
+    await wait_for(lambda: watcher.synced)
+
+    backend.drop.set()
+    await wait_for(lambda: not watcher.synced)
+    # Published while this worker was not listening, so its filter never saw it
+    await other.add("missed", time.time() + 60)
+    assert "missed" not in watcher._bloom
+    assert await watcher.is_revoked("missed")
+
+    # Reconnecting rebuilds the filter from Redis
+    await wait_for(lambda: watcher.synced)
+    assert "missed" in watcher._bloom
+    await watcher.stop()
@@ -0,0 +1,102 @@
+import pytest
+from app.repositories.posts import MemoryPostRepository
+from app.stores.posts import PostStore
+from app.stores.search import SearchIndex, normalize, stem, tokenize
+from tests.test_post_store import make_posts
+
+pytestmark = pytest.mark.anyio
+
+def ids(index: SearchIndex, query: str) -> list:
+    return [doc_id for doc_id, _ in index.search(query)]
+
+@pytest.mark.parametrize("text,normalized", [
+    ("أحمد إبراهيم آمال ٱلله", "احمد ابراهيم امال الله"),
+    ("مستشفى", "مستشفي"),
+    ("مدرسة", "مدرسه"),
+    ("مُدَرِّسَةٌ", "مدرسه"),
+    ("عـــربي", "عربي"),
+    ("Python FASTAPI", "python fastapi"),
+])
+def test_normalize_folds_letter_variants_and_diacritics(text, normalized):
+    assert normalize(text) == normalized
+
+@pytest.mark.parametrize("word,stemmed", [
+    ("كتاب", "كتاب"),
+    ("والكتاب", "كتاب"),
+    ("بالمدرسه", "مدرس"),
+    ("المعلمون", "معلم"),
+    ("المعلمين", "معلم"),
+    ("تطبيقات", "تطبيق"),
+    ("development", "development"),
+])
+def test_light_stemming(word, stemmed):
+    assert stem(word) == stemmed
+
+def test_short_words_keep_their_letters():
+    # Stripping would leave too little of the word to mean anything
+    assert stem("الحب") == "الحب"
+    assert stem("بها") == "بها"
+    assert stem("ون") == "ون"
+
+def test_variant_spellings_match_each_other():
+    assert tokenize("المدرسة") == tokenize("مدرسه") == tokenize("المَدْرَسَة")
+    assert tokenize("مستشفى") == tokenize("المستشفي")
+
+@pytest.fixture
+def index():
+    index = SearchIndex({"title": 3.0, "content": 1.0})
+    index.add(1, {"title": "مقدمة في الذكاء الاصطناعي", "content": "تطبيقات الذكاء الاصطناعي في التعليم"})
+    index.add(2, {"title": "تطوير تطبيقات الويب", "content": "أفضل الممارسات في البرمجة والتطوير"})
+    index.add(3, {"title": "Web development basics", "content": "Developers build web applications"})
+    index.add(4, {"title": "Cooking", "content": "The web of flavours, artificial or not"})
+    return index
+
+def test_every_query_word_must_match(index):
+    assert ids(index, "الذكاء الاصطناعي") == [1]
+    assert ids(index, "web development") == [3]
+    assert ids(index, "web nowhere") == []
+    assert ids(index, "") == []
+
+def test_title_hits_rank_first(index):
+    assert ids(index, "web") == [3, 4]
+    assert ids(index, "تطبيقات") == [2, 1]
+
+def test_query_spelling_and_affixes_are_normalized(index):
+    assert ids(index, "ذكاء") == [1]
+    assert ids(index, "والتطبيقات") == [2, 1]
+    assert ids(index, "الذَّكَاء") == [1]
+
+def test_prefix_queries(index):
+    assert ids(index, "develop*") == [3]
+    assert ids(index, "تطو*") == [2]
+    # The last word may be unfinished, with or without its article
+    assert ids(index, "web devel") == [3]
+    assert ids(index, "الاصطنا") == [1]
+    # Only the last word is treated as a prefix
+    assert ids(index, "devel web") == []
+
+def test_add_replaces_and_remove_forgets(index):
+    index.add(4, {"title": "Cooking", "content": "Spices only"})
+    assert ids(index, "web") == [3]
+    index.remove(3)
+    index.remove(3)
+    assert ids(index, "web") == []
+    assert ids(index, "develop*") == []
+    assert len(index) == 3
+
+async def test_post_edits_and_deletes_update_the_index():
+    posts = make_posts(10)
+    for post in posts:
+        post.update(title=f"Post {post['id']}", excerpt=None, content="plain text")
+    repository = MemoryPostRepository(PostStore(posts))
+    post_id = posts[0]["id"]
+
+    await repository.update(post_id, {"title": "Quantum gardening"})
+    assert [post["id"] for post in await repository.list(search="quantum")] == [post_id]
+    assert await repository.list(search=f"post {post_id}") == []
+
+    created = await repository.create(dict(posts[1], slug="fresh", title="Quantum cooking"))
+    assert {post["id"] for post in await repository.list(search="quantum")} == {post_id, created["id"]}
+
+    await repository.delete(post_id)
+    assert [post["id"] for post in await repository.list(search="quantum")] == [created["id"]]
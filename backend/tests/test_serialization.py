@@ -0,0 +1,41 @@
+from typing import List
+import orjson
+import pytest
+from pydantic import TypeAdapter
+from app.api.auth import mock_users_db
+from app.api.posts import post_store
+from app.core.serialization import build_projector
+from app.repositories.comments import MemoryCommentRepository
+from app.schemas.comment import CommentTreeResponse
+from app.schemas.media import MediaFileResponse
+from app.schemas.post import PostListResponse, PostResponse
+from app.schemas.user import UserResponse
+from tests.test_comment_thread import make_comments
+
+pytestmark = pytest.mark.anyio
+
+def same_json(annotation, value):
+    """The FAST_JSON projection encodes to the same JSON as validating"""
+    project = build_projector(annotation)
+    assert project is not None
+    validated = TypeAdapter(annotation).dump_python(TypeAdapter(annotation).validate_python(value), mode="json")
+    assert orjson.loads(orjson.dumps(project(value))) == validated
+
+def test_post_records_project_like_validation():
+    posts = list(post_store)
+    same_json(List[PostListResponse], posts)
+    for post in posts:
+        same_json(PostResponse, post)
+
+def test_user_projection_drops_the_password():
+    user = dict(next(iter(mock_users_db.values())), password_hash="secret")
+    same_json(UserResponse, user)
+    assert "password_hash" not in build_projector(UserResponse)(user)
+    assert "password" not in build_projector(UserResponse)(user)
+
+async def test_comment_tree_projects_like_validation():
+    comments, next_cursor = await MemoryCommentRepository(make_comments()).thread(1, limit=10, depth=3, replies_limit=2)
+    same_json(CommentTreeResponse, {"comments": comments, "next_cursor": next_cursor})
+
+def test_models_with_computed_fields_keep_validation():
+    assert build_projector(MediaFileResponse) is None
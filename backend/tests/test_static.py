@@ -0,0 +1,152 @@
+import gzip
+import hashlib
+import httpx
+import pytest
+from starlette.applications import Starlette
+from starlette.exceptions import HTTPException
+from starlette.routing import Mount
+from app.core.config import settings
+from app.core.static import ZEROCOPY, MediaFiles, parse_range
+
+pytestmark = pytest.mark.anyio
+
+CONTENT = bytes(range(256)) * 40
+HASHED = hashlib.sha256(CONTENT).hexdigest()
+
+@pytest.mark.parametrize("header,expected", [
+    ("bytes=0-99", (0, 99)),
+    ("bytes=100-", (100, 999)),
+    ("bytes=900-5000", (900, 999)),
+    ("bytes=-100", (900, 999)),
+    ("bytes=-5000", (0, 999)),
+    ("BYTES = 5-5", (5, 5)),
+])
+def test_parse_range(header, expected):
+    assert parse_range(header, 1000) == expected
+
+@pytest.mark.parametrize("header", ["items=0-10", "bytes=0-10,20-30", "bytes=10", "bytes=a-b", "bytes=10-5", "bytes=-"])
+def test_ranges_to_ignore(header):
+    assert parse_range(header, 1000) is None
+
+@pytest.mark.parametrize("header", ["bytes=1000-", "bytes=2000-3000", "bytes=-0"])
+def test_unsatisfiable_ranges(header):
+    with pytest.raises(HTTPException) as error:
+        parse_range(header, 1000)
+    assert error.value.status_code == 416
+    assert error.value.headers == {"Content-Range": "bytes */1000"}
+
+@pytest.fixture
+def media_dir(tmp_path):
+    (tmp_path / "images").mkdir()
+    (tmp_path / "images" / f"{HASHED}.png").write_bytes(CONTENT)
+    (tmp_path / "images" / f"{HASHED}_320.webp").write_bytes(CONTENT[:100])
+    (tmp_path / "logo.css").write_bytes(b"body { color: red }" * 50)
+    (tmp_path / "logo.css.gz").write_bytes(gzip.compress((tmp_path / "logo.css").read_bytes()))
+    (tmp_path / "logo.css.br").write_bytes(b"pretend brotli")
+    (tmp_path / "tmp").mkdir()
+    (tmp_path / "tmp" / "partial").write_bytes(b"in progress")
+    return tmp_path
+
+@pytest.fixture
+async def client(media_dir):
+    app = Starlette(routes=[Mount("/uploads", MediaFiles(directory=str(media_dir), hidden=("tmp",)))])
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        yield client
+
+async def get_raw(client, path: str, **headers):
+    """The response with its body as sent, not decoded"""
+    async with client.stream("GET", path, headers=headers) as response:
+        return response, b"".join([chunk async for chunk in response.aiter_raw()])
+
+async def test_whole_file(client):
+    response = await client.get(f"/uploads/images/{HASHED}.png")
+    assert response.status_code == 200
+    assert response.content == CONTENT
+    assert response.headers["accept-ranges"] == "bytes"
+    assert response.headers["content-type"] == "image/png"
+
+async def test_byte_ranges_are_partial_content(client):
+    path = f"/uploads/images/{HASHED}.png"
+    response = await client.get(path, headers={"Range": "bytes=10-19"})
+    assert response.status_code == 206
+    assert response.content == CONTENT[10:20]
+    assert response.headers["content-range"] == f"bytes 10-19/{len(CONTENT)}"
+    assert response.headers["content-length"] == "10"
+
+    suffix = await client.get(path, headers={"Range": "bytes=-300"})
+    assert suffix.status_code == 206
+    assert suffix.content == CONTENT[-300:]
+    assert suffix.headers["content-range"] == f"bytes {len(CONTENT) - 300}-{len(CONTENT) - 1}/{len(CONTENT)}"
+
+    ignored = await client.get(path, headers={"Range": "bytes=0-1,5-6"})
+    assert ignored.status_code == 200 and ignored.content == CONTENT
+
+async def test_unsatisfiable_range_is_416(client):
+    response = await client.get(f"/uploads/images/{HASHED}.png", headers={"Range": f"bytes={len(CONTENT)}-"})
+    assert response.status_code == 416
+    assert response.headers["content-range"] == f"bytes */{len(CONTENT)}"
+
+async def test_if_range_only_honours_a_current_validator(client):
+    path = f"/uploads/images/{HASHED}.png"
+    full = await client.get(path)
+    for validator in (full.headers["etag"], full.headers["last-modified"]):
+        current = await client.get(path, headers={"Range": "bytes=0-9", "If-Range": validator})
+        assert current.status_code == 206 and current.content == CONTENT[:10]
+    for validator in ('"stale"', "Mon, 01 Jan 2001 00:00:00 GMT"):
+        stale = await client.get(path, headers={"Range": "bytes=0-9", "If-Range": validator})
+        assert stale.status_code == 200 and stale.content == CONTENT
+
+async def test_precompressed_siblings(client, media_dir):
+    original = (media_dir / "logo.css").read_bytes()
+    response, body = await get_raw(client, "/uploads/logo.css", **{"Accept-Encoding": "gzip, br"})
+    assert response.headers["content-encoding"] == "br"
+    assert body == b"pretend brotli"
+    assert response.headers["content-type"].startswith("text/css")
+    assert response.headers["vary"] == "Accept-Encoding"
+
+    response, body = await get_raw(client, "/uploads/logo.css", **{"Accept-Encoding": "gzip, br;q=0"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert gzip.decompress(body) == original
+
+    response, body = await get_raw(client, "/uploads/logo.css", **{"Accept-Encoding": "identity"})
+    assert "content-encoding" not in response.headers
+    assert body == original
+
+    # Ranges are served from the original
+    response, body = await get_raw(client, "/uploads/logo.css", **{"Accept-Encoding": "gzip", "Range": "bytes=0-3"})
+    assert response.status_code == 206
+    assert "content-encoding" not in response.headers
+    assert body == original[:4]
+
+async def test_cache_control_by_name(client):
+    for path in (f"/uploads/images/{HASHED}.png", f"/uploads/images/{HASHED}_320.webp"):
+        assert (await client.get(path)).headers["cache-control"] == settings.MEDIA_IMMUTABLE_CACHE_CONTROL
+    response, _ = await get_raw(client, "/uploads/logo.css", **{"Accept-Encoding": "gzip"})
+    assert response.headers["cache-control"] == settings.MEDIA_CACHE_CONTROL
+
+async def test_hidden_directory_is_not_found(client):
+    assert (await client.get("/uploads/tmp/partial")).status_code == 404
+    assert (await client.get("/uploads/tmp/")).status_code == 404
+    assert (await client.get("/uploads/missing.png")).status_code == 404
+
+async def test_zero_copy_send_gets_the_range_offset(media_dir):
+    app = MediaFiles(directory=str(media_dir))
+    scope = {
+        "type": "http", "method": "GET", "path": f"/images/{HASHED}.png", "root_path": "",
+        "headers": [(b"range", b"bytes=100-199")], "query_string": b"", "extensions": {ZEROCOPY: {}},
+    }
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == ZEROCOPY:
+            message = dict(message, file=message["file"].read())
+        messages.append(message)
+
+    await app(scope, receive, send)
+    assert messages[0]["status"] == 206
+    assert messages[1]["type"] == ZEROCOPY
+    assert (messages[1]["offset"], messages[1]["count"]) == (100, 100)
+    assert messages[1]["file"] == CONTENT
@@ -0,0 +1,30 @@
+import time
+from app.core.token_cache import TokenCache
+
+def user(user_id: int) -> dict:
+    return {"id": user_id, "email": f"user{user_id}@test.invalid"}
+
+def test_entries_expire_with_the_token():
+    cache = TokenCache(ttl=300)
+    cache.set("expired", {"exp": time.time() - 1}, user(1))
+    cache.set("valid", {"exp": time.time() + 60}, user(1))
+    assert cache.get("expired") is None
+    assert cache.get("valid").user == user(1)
+
+def test_least_recently_used_entry_is_evicted():
+    cache = TokenCache(max_entries=2)
+    cache.set("a", {}, user(1))
+    cache.set("b", {}, user(2))
+    cache.get("a")
+    cache.set("c", {}, user(3))
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+
+def test_invalidate_user_drops_only_their_tokens():
+    cache = TokenCache()
+    cache.set("a1", {}, user(1))
+    cache.set("a2", {}, user(1))
+    cache.set("b", {}, user(2))
+    cache.invalidate_user(1)
+    assert cache.get("a1") is None and cache.get("a2") is None
+    assert cache.get("b") is not None
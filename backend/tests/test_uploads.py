@@ -0,0 +1,114 @@
+import hashlib
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+import pytest
+from PIL import Image
+from app.api import media as media_module
+from app.core import images
+from app.core.config import settings
+from app.core.uploads import MEDIA_DIRS, MULTIPART_OVERHEAD
+from app.repositories.media import MemoryMediaRepository
+
+pytestmark = pytest.mark.anyio
+
+MAX_SIZE = 4096
+
+@pytest.fixture
+async def uploads(tmp_path, monkeypatch):
+    """A fresh UPLOAD_DIR and media repository, with a one-process derivative pool"""
+    for directory in [*MEDIA_DIRS.values(), "tmp"]:
+        (tmp_path / directory).mkdir()
+    monkeypatch.setattr(settings, "UPLOAD_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "MAX_FILE_SIZE", MAX_SIZE)
+    monkeypatch.setattr(settings, "MEDIA_WORKERS", 1)
+    monkeypatch.setattr(media_module, "TMP_DIR", str(tmp_path / "tmp"))
+    monkeypatch.setattr(media_module, "memory_media_repository", MemoryMediaRepository())
+    monkeypatch.setattr(images, "_executor", None)
+    yield tmp_path
+    await images.shutdown()
+
+@pytest.fixture
+async def headers(make_user):
+    _, headers = await make_user("author")
+    return headers
+
+def png(color: str = "red", size=(640, 480)) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", size, color).save(buffer, "PNG")
+    return buffer.getvalue()
+
+async def upload(client, headers, name: str, content: bytes, **fields):
+    return await client.post("/api/media/upload", headers=headers, files={"file": (name, content)}, data=fields)
+
+async def test_upload_is_stored_under_its_hash(client, headers, uploads):
+    content = b"ID3" + b"\0" * 100
+    response = await upload(client, headers, "clip.mp3", content, caption="A clip")
+    assert response.status_code == 200
+    record = response.json()
+    sha256 = hashlib.sha256(content).hexdigest()
+    assert record["file_path"] == f"audio/{sha256}.mp3"
+    assert record["content_hash"] == sha256
+    assert record["file_size"] == len(content)
+    assert record["original_filename"] == "clip.mp3"
+    assert record["caption"] == "A clip"
+    assert (uploads / record["file_path"]).read_bytes() == content
+    assert os.listdir(uploads / "tmp") == []
+
+async def test_oversized_uploads_are_rejected_mid_stream(client, headers, uploads):
+    # Within the Content-Length allowance, so the limit trips while streaming
+    response = await upload(client, headers, "big.mp3", b"x" * (MAX_SIZE + 1))
+    assert response.status_code == 413
+    assert os.listdir(uploads / "tmp") == []
+    assert os.listdir(uploads / "audio") == []
+
+    exact = await upload(client, headers, "exact.mp3", b"x" * MAX_SIZE)
+    assert exact.status_code == 200
+
+async def test_oversized_content_length_is_rejected_before_reading(client, headers, uploads):
+    response = await upload(client, headers, "huge.mp3", b"x" * (MAX_SIZE + MULTIPART_OVERHEAD + 1))
+    assert response.status_code == 413
+    assert os.listdir(uploads / "tmp") == []
+
+async def test_unsupported_types_leave_nothing_behind(client, headers, uploads):
+    response = await upload(client, headers, "script.exe", b"MZ")
+    assert response.status_code == 415
+    assert os.listdir(uploads / "tmp") == []
+
+async def test_same_content_returns_the_existing_record(client, headers, uploads):
+    first = (await upload(client, headers, "one.mp3", b"same bytes")).json()
+    second = await upload(client, headers, "two.mp3", b"same bytes", caption="Ignored")
+    assert second.status_code == 200
+    assert second.json() == first
+    assert os.listdir(uploads / "audio") == [os.path.basename(first["file_path"])]
+    assert os.listdir(uploads / "tmp") == []
+
+    other = (await upload(client, headers, "three.mp3", b"other bytes")).json()
+    assert other["id"] != first["id"]
+
+async def test_image_derivatives_come_from_the_process_pool(client, headers, uploads, monkeypatch):
+    executors = []
+    get_executor = images._get_executor
+    monkeypatch.setattr(images, "_get_executor", lambda: executors.append(get_executor()) or executors[-1])
+
+    record = (await upload(client, headers, "photo.png", png())).json()
+    assert record["variants"] is None
+    await images.shutdown()
+    assert len(executors) == 1 and isinstance(executors[0], ProcessPoolExecutor)
+
+    stored = (await client.get(f"/api/media/{record['id']}")).json()
+    assert (stored["width"], stored["height"]) == (640, 480)
+    assert set(stored["variants"]) == {"webp", "thumbnail"}
+    assert stored["urls"]["thumbnail"] == f"/uploads/{stored['variants']['thumbnail']}"
+    with Image.open(uploads / stored["variants"]["thumbnail"]) as thumbnail:
+        assert thumbnail.format == "WEBP"
+        assert max(thumbnail.size) == settings.IMAGE_THUMBNAIL_SIZE
+    with Image.open(uploads / stored["variants"]["webp"]) as webp:
+        assert webp.size == (640, 480)
+
+async def test_undecodable_images_get_no_variants(client, headers, uploads):
+    record = (await upload(client, headers, "broken.png", b"not really a png")).json()
+    await images.shutdown()
+    stored = (await client.get(f"/api/media/{record['id']}")).json()
+    assert stored["variants"] == {}
+    assert stored["urls"] == {"original": f"/uploads/{record['file_path']}"}
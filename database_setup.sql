@@ -29,7 +29,8 @@ CREATE TABLE IF NOT EXISTS users (
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     INDEX idx_email (email),
     INDEX idx_username (username),
-    INDEX idx_role (role)
+    INDEX idx_role (role),
+    INDEX idx_created (created_at, id)
 );
 
 -- Categories table
@@ -82,6 +83,8 @@ CREATE TABLE IF NOT EXISTS posts (
     INDEX idx_status (status),
     INDEX idx_published (published_at),
     INDEX idx_featured (is_featured),
+    INDEX idx_created (created_at, id),
+    INDEX idx_category_status_created (category_id, status, created_at, id),
     FULLTEXT idx_content (title, content, excerpt)
 );
 
@@ -102,7 +105,12 @@ CREATE TABLE IF NOT EXISTS comments (
     INDEX idx_post (post_id),
     INDEX idx_user (user_id),
     INDEX idx_parent (parent_id),
-    INDEX idx_approved (is_approved)
+    INDEX idx_approved (is_approved),
+    INDEX idx_created (created_at, id),
+    INDEX idx_post_approved_created (post_id, is_approved, created_at, id),
+    INDEX idx_approved_created (is_approved, created_at, id),
+    INDEX idx_user_created (user_id, created_at, id),
+    INDEX idx_post_parent_created (post_id, parent_id, created_at, id)
 );
 
 -- Likes table
@@ -131,15 +139,18 @@ CREATE TABLE IF NOT EXISTS media_files (
     file_type ENUM('image', 'video', 'audio', 'document') NOT NULL,
     mime_type VARCHAR(100) NOT NULL,
     file_size BIGINT NOT NULL,
+    content_hash CHAR(64) NOT NULL, -- sha256 of the content, for deduplication
     width INT,
     height INT,
     duration INT, -- for video/audio files in seconds
     alt_text VARCHAR(255),
     caption TEXT,
+    variants JSON, -- derived files (webp, thumbnail), filled in after upload
     uploaded_by INT NOT NULL,
     is_ai_generated BOOLEAN DEFAULT FALSE,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY (uploaded_by) REFERENCES users(id) ON DELETE CASCADE,
+    UNIQUE INDEX idx_content_hash (content_hash),
     INDEX idx_type (file_type),
     INDEX idx_uploaded_by (uploaded_by),
     INDEX idx_ai_generated (is_ai_generated)
@@ -169,13 +180,16 @@ CREATE TABLE IF NOT EXISTS ai_interactions (
     output_data JSON,
     model_used VARCHAR(100),
     tokens_used INT,
-    cost DECIMAL(10, 4),
+    cost DECIMAL(12, 6),
     processing_time INT, -- in milliseconds
+    success BOOLEAN DEFAULT TRUE,
+    cached BOOLEAN DEFAULT FALSE, -- answered without a provider call of its own
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE SET NULL,
     INDEX idx_user (user_id),
     INDEX idx_type (interaction_type),
-    INDEX idx_created (created_at)
+    INDEX idx_created (created_at),
+    INDEX idx_type_created (interaction_type, created_at)
 );
 
 -- Analytics table